@@ -0,0 +1,70 @@
+import os
+import shutil
+import sqlite3
+import time
+
+
+class CrawlCheckpoint:
+    """
+    Progress of a crawlall run that can be resumed after it's interrupted, kept in a
+    directory with a SQLite file of the spiders that have finished and a JOBDIR for
+    each spider that hasn't. Scrapy persists a spider's pending requests (including
+    their meta, like items passed on to detail pages) and the requests it's already
+    seen in its JOBDIR, so a spider that's stopped picks up where it left off.
+    Shared by every crawlall process using the same directory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(
+            os.path.join(directory, "checkpoint.db"), timeout=30
+        )
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS run (started_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS finished (
+                    spider TEXT PRIMARY KEY,
+                    finished_at REAL NOT NULL
+                )
+                """
+            )
+            if self.conn.execute("SELECT COUNT(*) FROM run").fetchone()[0] == 0:
+                self.conn.execute("INSERT INTO run VALUES (?)", (time.time(),))
+
+    def close(self):
+        self.conn.close()
+
+    def started_at(self):
+        return self.conn.execute("SELECT started_at FROM run").fetchone()[0]
+
+    def finished(self):
+        """Return the names of the spiders that have finished in this run"""
+        return {
+            spider for (spider,) in self.conn.execute("SELECT spider FROM finished")
+        }
+
+    def spider_jobdir(self, spider_name):
+        return os.path.join(self.directory, "jobs", spider_name)
+
+    def mark_finished(self, spider_name):
+        """Record that a spider finished so it isn't run again when resuming, and
+        remove its JOBDIR"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO finished (spider, finished_at) VALUES (?, ?)",
+                (spider_name, time.time()),
+            )
+        self.reset_spider(spider_name)
+
+    def reset_spider(self, spider_name):
+        """Remove a spider's JOBDIR so that it starts from the beginning next time"""
+        shutil.rmtree(self.spider_jobdir(spider_name), ignore_errors=True)
+
+    def clear(self):
+        """Remove the checkpoint, so that the next run starts over"""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
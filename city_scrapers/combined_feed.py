@@ -0,0 +1,203 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from operator import itemgetter
+from urllib.parse import urlparse
+
+from scrapy.utils.project import data_path
+
+# Spiders whose latest results are older than this many days are left out of the
+# combined feeds, like the window combinefeeds searches for recent feeds
+MAX_SEGMENT_AGE_DAYS = 3
+
+
+def get_combined_feed(settings):
+    return CombinedFeed(
+        combined_feed_dir(settings),
+        start_key=feed_start_key(settings),
+        max_age_days=settings.getint(
+            "CITY_SCRAPERS_COMBINED_FEED_MAX_AGE", MAX_SEGMENT_AGE_DAYS
+        ),
+    )
+
+
+def combined_feed_dir(settings):
+    """Return the combined feed directory, defaulting to .scrapy/combined"""
+    return settings.get("CITY_SCRAPERS_COMBINED_FEED_DIR") or data_path("combined")
+
+
+def feed_start_key(settings):
+    """Key of the meeting start in feed output, which depends on the pipelines"""
+    pipelines = settings.getdict("ITEM_PIPELINES")
+    if "city_scrapers_core.pipelines.OpenCivicDataPipeline" in pipelines:
+        return "start_time"
+    return "start"
+
+
+def write_atomic(path, text):
+    """Write a file by renaming a temporary file over it so that readers never see
+    a partially written file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class CombinedFeed:
+    """
+    Combined latest.json and upcoming.json feeds built up on disk as each spider
+    finishes. Each spider's results are written to a segment file, and a manifest
+    keeps track of the latest segment for every spider. The combined feeds are rebuilt
+    from the segments whenever one changes, so once the last spider finishes all
+    that's left is sealing the manifest and uploading the feeds.
+    """
+
+    def __init__(self, directory, start_key="start", max_age_days=MAX_SEGMENT_AGE_DAYS):
+        self.directory = directory
+        self.start_key = start_key
+        self.max_age = timedelta(days=max_age_days)
+        os.makedirs(os.path.join(directory, "segments"), exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, "manifest.json")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def lock(self):
+        """Hold an exclusive lock on the feed, shared with other processes"""
+        with open(self.path("manifest.lock"), "w") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {"spiders": {}, "sealed": None}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def add_spider(self, spider_name, lines, now=None):
+        """Replace a spider's segment with serialized meetings (one JSON object per
+        line) and rebuild the combined feeds"""
+        now = now or datetime.now()
+        segment = os.path.join("segments", f"{spider_name}.json")
+        with self.lock():
+            write_atomic(self.path(segment), "".join(lines))
+            manifest = self.read_manifest()
+            manifest["spiders"][spider_name] = {
+                "segment": segment,
+                "items": len(lines),
+                "finished": now.isoformat(),
+            }
+            manifest["sealed"] = None
+            self.build(manifest, now)
+            write_atomic(self.manifest_path, json.dumps(manifest, indent=2))
+
+    def current_spiders(self, manifest, now):
+        """Return the spiders in a manifest with recent enough results"""
+        oldest = (now - self.max_age).isoformat()
+        return sorted(
+            name
+            for name, entry in manifest["spiders"].items()
+            if entry["finished"] >= oldest
+        )
+
+    def build(self, manifest, now):
+        meetings = []
+        for spider_name in self.current_spiders(manifest, now):
+            with open(self.path(manifest["spiders"][spider_name]["segment"])) as f:
+                meetings.extend(json.loads(line) for line in f if line.strip())
+        meetings.sort(key=itemgetter(self.start_key))
+        yesterday_iso = (now - timedelta(days=1)).isoformat()[:19]
+        upcoming = [
+            meeting
+            for meeting in meetings
+            if meeting[self.start_key][:19] > yesterday_iso
+        ]
+        write_atomic(
+            self.path("latest.json"), "\n".join(json.dumps(m) for m in meetings)
+        )
+        write_atomic(
+            self.path("upcoming.json"), "\n".join(json.dumps(m) for m in upcoming)
+        )
+
+    def has_current_spiders(self, now=None):
+        """Check whether any spider has recent enough results in the feeds"""
+        return bool(self.current_spiders(self.read_manifest(), now or datetime.now()))
+
+    def seal(self, now=None):
+        """
+        Mark the feeds as complete, returning a dictionary of the files to publish
+        mapped to their local paths: the combined feeds along with the latest results
+        of each spider that finished since the last time the feeds were sealed.
+        """
+        now = now or datetime.now()
+        with self.lock():
+            manifest = self.read_manifest()
+            previous_seal = manifest.get("last_sealed") or ""
+            files = {
+                "latest.json": self.path("latest.json"),
+                "upcoming.json": self.path("upcoming.json"),
+            }
+            for spider_name in self.current_spiders(manifest, now):
+                entry = manifest["spiders"][spider_name]
+                if entry["finished"] > previous_seal:
+                    files[f"{spider_name}.json"] = self.path(entry["segment"])
+            manifest["sealed"] = manifest["last_sealed"] = now.isoformat()
+            write_atomic(self.manifest_path, json.dumps(manifest, indent=2))
+        return files
+
+
+def publish_files(settings, files):
+    """Upload local files to the feed storage configured in FEED_URI"""
+    storages = settings.getdict("FEED_STORAGES")
+    feed_uri = settings.get("FEED_URI")
+    contents = {}
+    for name, path in files.items():
+        with open(path, "rb") as f:
+            contents[name] = f.read()
+
+    if "s3" in storages:
+        import boto3
+
+        client = boto3.client(
+            "s3",
+            aws_access_key_id=settings.get("AWS_ACCESS_KEY_ID"),
+            aws_secret_access_key=settings.get("AWS_SECRET_ACCESS_KEY"),
+        )
+        for name, body in contents.items():
+            client.put_object(
+                Body=body,
+                Bucket=urlparse(feed_uri).netloc,
+                CacheControl="no-cache",
+                Key=name,
+            )
+    elif "azure" in storages:
+        from azure.storage.blob import ContainerClient, ContentSettings
+
+        account_name, account_key = feed_uri[8::].split("@")[0].split(":")
+        container_client = ContainerClient(
+            f"{account_name}.blob.core.windows.net",
+            feed_uri.split("@")[1].split("/")[0],
+            credential=account_key,
+        )
+        for name, body in contents.items():
+            container_client.upload_blob(
+                name,
+                body,
+                content_settings=ContentSettings(cache_control="no-cache"),
+                overwrite=True,
+            )
+    elif "gcs" in storages:
+        from google.cloud import storage
+
+        bucket = storage.Client().bucket(urlparse(feed_uri).netloc)
+        for name, body in contents.items():
+            bucket.blob(name).upload_from_string(body)
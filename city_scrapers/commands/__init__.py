@@ -0,0 +1,3 @@
+# Scrapy only reads commands from a single COMMANDS_MODULE, so the commands from
+# city_scrapers_core are subclassed here to keep them available alongside the ones
+# specific to this project.
@@ -0,0 +1,38 @@
+import os
+
+from city_scrapers_core.commands.combinefeeds import Command as CombineFeedsCommand
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.combined_feed import (
+    combined_feed_dir,
+    get_combined_feed,
+    publish_files,
+)
+
+
+class Command(CombineFeedsCommand):
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "--full",
+            dest="full",
+            action="store_true",
+            help="combine feeds by reading every spider's latest feed from storage "
+            "instead of sealing the feeds built as spiders finished",
+        )
+
+    def run(self, args, opts):
+        directory = combined_feed_dir(self.settings)
+        if opts.full or not os.path.exists(os.path.join(directory, "manifest.json")):
+            return super().run(args, opts)
+        if not {"s3", "azure", "gcs"} & set(self.settings.getdict("FEED_STORAGES")):
+            raise UsageError(
+                "Either 's3', 'azure', or 'gcs' must be in FEED_STORAGES "
+                "to combine past feeds"
+            )
+        feed = get_combined_feed(self.settings)
+        if not feed.has_current_spiders():
+            # Nothing recent was added (like when the extension was disabled)
+            return super().run(args, opts)
+        publish_files(self.settings, feed.seal())
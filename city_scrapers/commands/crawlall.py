@@ -0,0 +1,752 @@
+import logging
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.log import failure_to_exc_info
+from scrapy.utils.project import data_path
+from twisted.internet.defer import DeferredList, DeferredSemaphore, maybeDeferred
+from twisted.internet.task import deferLater
+
+from city_scrapers.checkpoint import CrawlCheckpoint
+from city_scrapers.history import RunHistory, history_path
+from city_scrapers.middleware.shared_cache import SharedResponseStore, shared_cache_path
+from city_scrapers.middleware.unchanged import code_version
+from city_scrapers.probe import (
+    CHANGED,
+    UNCHANGED,
+    UNREACHABLE,
+    ProbeStore,
+    probe_store_path,
+    select_spiders,
+)
+from city_scrapers.resolver import start_hosts
+from city_scrapers.scheduling import (
+    estimate_runtimes,
+    estimate_timeouts,
+    fit_budget,
+    lpt_shards,
+    prioritize,
+)
+
+logger = logging.getLogger(__name__)
+
+# Finish reasons of spiders that shouldn't be retried: they were stopped on purpose or
+# hit their timeout, so running them again would only take time from the others
+NO_RETRY_REASONS = {"shutdown", "closespider_timeout"}
+# Settings passed on to the processes running each lane
+LANE_SETTINGS = [
+    "CITY_SCRAPERS_HOST_RATE_FILE",
+    "CITY_SCRAPERS_CRAWLALL_DEADLINE",
+    "CITY_SCRAPERS_CRAWLALL_JOBDIR",
+    "CITY_SCRAPERS_CRAWLALL_PROBE",
+    "CITY_SCRAPERS_SHARED_CACHE_RUN",
+]
+# Settings for the lane process that runs every spider that uses Playwright
+PLAYWRIGHT_LANE_SETTINGS = {
+    "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+    "DOWNLOAD_HANDLERS": {
+        "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+        "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
+    },
+    "PLAYWRIGHT_BROWSER_PROVIDER": "city_scrapers.handlers.SharedBrowserProvider",
+}
+
+
+def uses_playwright(spider_cls):
+    """Check whether a spider's custom_settings configure Playwright"""
+    custom_settings = spider_cls.custom_settings or {}
+    handlers = custom_settings.get("DOWNLOAD_HANDLERS") or {}
+    return any(key.startswith("PLAYWRIGHT_") for key in custom_settings) or any(
+        "playwright" in str(handler).lower() for handler in handlers.values()
+    )
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options] [<spider> ...]"
+
+    def short_desc(self):
+        return "Run all spiders (or the ones listed) concurrently"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "-c",
+            "--concurrency",
+            dest="concurrency",
+            type=int,
+            help="maximum number of spiders running at once "
+            "(default: CITY_SCRAPERS_CRAWLALL_CONCURRENCY), per process",
+        )
+        parser.add_argument(
+            "-P",
+            "--processes",
+            dest="processes",
+            type=int,
+            help="number of processes to split spiders across based on previous "
+            "runtimes (default: CITY_SCRAPERS_CRAWLALL_PROCESSES)",
+        )
+        parser.add_argument(
+            "-b",
+            "--budget",
+            dest="budget",
+            type=float,
+            help="seconds available to run spiders in, running the most valuable "
+            "ones first and stopping each after a timeout based on its previous "
+            "runtimes (default: CITY_SCRAPERS_CRAWLALL_BUDGET, 0 for no limit)",
+        )
+        parser.add_argument(
+            "--jobdir",
+            dest="jobdir",
+            help="directory to keep the run's progress in so that it can be resumed "
+            "if it's interrupted (default: CITY_SCRAPERS_CRAWLALL_JOBDIR)",
+        )
+        parser.add_argument(
+            "--probe",
+            dest="probe",
+            action="store_true",
+            help="check spiders' start pages first and only crawl the ones that "
+            "changed or have upcoming meetings (default: CITY_SCRAPERS_CRAWLALL_PROBE)",
+        )
+        parser.add_argument(
+            "--plan",
+            dest="plan",
+            action="store_true",
+            help="print how spiders would be split across processes and exit",
+        )
+        parser.add_argument(
+            "--playwright-lane",
+            dest="playwright_lane",
+            action="store_true",
+            help="run spiders with one browser shared between them (set by crawlall "
+            "when starting the process for spiders that use Playwright)",
+        )
+
+        parser.add_argument(
+            "--lane",
+            dest="lane",
+            action="store_true",
+            help="run spiders as one lane of a run split across processes (set by "
+            "crawlall when starting lane processes)",
+        )
+
+    def process_options(self, args, opts):
+        ScrapyCommand.process_options(self, args, opts)
+        if opts.concurrency is not None:
+            if opts.concurrency < 1:
+                raise UsageError("--concurrency must be at least 1", print_help=False)
+            self.settings.set(
+                "CITY_SCRAPERS_CRAWLALL_CONCURRENCY",
+                opts.concurrency,
+                priority="cmdline",
+            )
+        if opts.processes is not None:
+            if opts.processes < 1:
+                raise UsageError("--processes must be at least 1", print_help=False)
+            self.settings.set(
+                "CITY_SCRAPERS_CRAWLALL_PROCESSES", opts.processes, priority="cmdline"
+            )
+        if opts.budget is not None:
+            if opts.budget < 0:
+                raise UsageError("--budget can't be negative", print_help=False)
+            self.settings.set(
+                "CITY_SCRAPERS_CRAWLALL_BUDGET", opts.budget, priority="cmdline"
+            )
+        if opts.probe:
+            self.settings.set("CITY_SCRAPERS_CRAWLALL_PROBE", True, priority="cmdline")
+        if opts.jobdir:
+            self.settings.set(
+                "CITY_SCRAPERS_CRAWLALL_JOBDIR", opts.jobdir, priority="cmdline"
+            )
+
+    def run(self, args, opts):
+        spider_loader = self.crawler_process.spider_loader
+        spider_names = self._select_spiders(args, spider_loader.list())
+        if opts.playwright_lane:
+            self.settings.setdict(PLAYWRIGHT_LANE_SETTINGS, priority="cmdline")
+            self._run_in_process(spider_names)
+            return
+
+        selected = spider_names
+        checkpoint = None
+        if self.settings.get("CITY_SCRAPERS_CRAWLALL_JOBDIR") and not opts.plan:
+            checkpoint = self._open_checkpoint()
+            finished = checkpoint.finished()
+            spider_names = [name for name in spider_names if name not in finished]
+            if len(spider_names) < len(selected):
+                logger.info(
+                    "Resuming run started %s, skipping %d finished spiders",
+                    datetime.fromtimestamp(checkpoint.started_at()).isoformat(
+                        " ", "seconds"
+                    ),
+                    len(selected) - len(spider_names),
+                )
+
+        if (
+            self.settings.getbool("CITY_SCRAPERS_CRAWLALL_PROBE")
+            and not opts.plan
+            and not opts.lane
+        ):
+            # Lanes are started with spiders that were already probed
+            spider_names = self._probe(spider_names, opts)
+        if (
+            self.settings.getbool("CITY_SCRAPERS_SHARED_CACHE_ENABLED")
+            and not opts.plan
+        ):
+            self._start_shared_cache()
+
+        processes = self.settings.getint("CITY_SCRAPERS_CRAWLALL_PROCESSES", 1)
+        history = RunHistory(history_path(self.settings))
+        runtimes = history.runtimes()
+        budget = self.settings.getfloat("CITY_SCRAPERS_CRAWLALL_BUDGET")
+        skipped = []
+        if budget > 0 and not self.settings.get("CITY_SCRAPERS_CRAWLALL_DEADLINE"):
+            spider_names, skipped = self._fit_budget(
+                spider_names, history, runtimes, budget, processes
+            )
+            self.settings.set(
+                "CITY_SCRAPERS_CRAWLALL_DEADLINE",
+                time.time() + budget,
+                priority="cmdline",
+            )
+        history.close()
+
+        lanes = self._plan_lanes(spider_names, processes, runtimes, ordered=budget > 0)
+        if opts.plan:
+            self._print_plan(lanes, skipped)
+        else:
+            if skipped:
+                logger.warning(
+                    "Skipping %d spiders that don't fit in the %.0fs budget: %s",
+                    len(skipped),
+                    budget,
+                    ", ".join(skipped),
+                )
+            self._run_lanes(lanes, opts)
+        if checkpoint is not None:
+            # Only the process that started the run knows when all of its lanes
+            # are finished
+            if not opts.lane and checkpoint.finished().issuperset(selected):
+                logger.info("All spiders finished, removing the run's checkpoint")
+                checkpoint.clear()
+            else:
+                checkpoint.close()
+
+    def _open_checkpoint(self):
+        """
+        Open the checkpoint of a previous run that was interrupted, or start a new one.
+        A checkpoint started more than CITY_SCRAPERS_CRAWLALL_RESUME_HOURS hours ago
+        is removed rather than resumed, so that spiders that keep failing don't stop
+        the next scheduled run from starting over.
+        """
+        jobdir = self.settings.get("CITY_SCRAPERS_CRAWLALL_JOBDIR")
+        checkpoint = CrawlCheckpoint(jobdir)
+        max_age = self.settings.getfloat("CITY_SCRAPERS_CRAWLALL_RESUME_HOURS") * 3600
+        if time.time() - checkpoint.started_at() > max_age:
+            logger.info("Not resuming run older than %.0fs, starting over", max_age)
+            checkpoint.clear()
+            checkpoint = CrawlCheckpoint(jobdir)
+        return checkpoint
+
+    def _start_shared_cache(self):
+        """Scope the pages shared between spiders to this run (and its lanes),
+        removing the ones from earlier runs"""
+        run = self.settings.get("CITY_SCRAPERS_SHARED_CACHE_RUN")
+        if not run:
+            run = uuid4().hex
+            self.settings.set("CITY_SCRAPERS_SHARED_CACHE_RUN", run, priority="cmdline")
+        store = SharedResponseStore(shared_cache_path(self.settings))
+        store.prune(run)
+        store.close()
+
+    def _probe(self, spider_names, opts):
+        """
+        Run the probe command for the spiders in its own process, and return the
+        spiders that need a full crawl: the ones whose start pages changed, couldn't
+        be reached or weren't probed, whose code changed, that haven't been crawled in
+        CITY_SCRAPERS_PROBE_MAX_AGE days, or that have meetings in the next
+        CITY_SCRAPERS_UPCOMING_DAYS days whose status might change.
+        """
+        started = time.time()
+        if subprocess.call(self._command_args("probe", opts) + spider_names) != 0:
+            logger.warning("Probing start pages failed, crawling every spider")
+            return spider_names
+        store = ProbeStore(probe_store_path(self.settings))
+        statuses = store.statuses(started)
+        last_crawled = store.last_crawled()
+        store.close()
+        history = RunHistory(history_path(self.settings))
+        next_meetings = history.next_meetings()
+        history.close()
+
+        spider_loader = self.crawler_process.spider_loader
+        crawl, skip = select_spiders(
+            spider_names,
+            statuses,
+            last_crawled,
+            {name: code_version(spider_loader.load(name)) for name in spider_names},
+            next_meetings,
+            datetime.now()
+            + timedelta(days=self.settings.getint("CITY_SCRAPERS_UPCOMING_DAYS")),
+            self.settings.getfloat("CITY_SCRAPERS_PROBE_MAX_AGE") * 86400,
+        )
+        counts = {
+            status: sum(value == status for value in statuses.values())
+            for status in (CHANGED, UNCHANGED, UNREACHABLE)
+        }
+        logger.info(
+            "Probed %d spiders: %d changed, %d unchanged, %d unreachable. Skipping %d "
+            "spiders that don't need a crawl%s",
+            len(statuses),
+            counts[CHANGED],
+            counts[UNCHANGED],
+            counts[UNREACHABLE],
+            len(skip),
+            f": {', '.join(skip)}" if skip else "",
+        )
+        return crawl
+
+    def _run_in_process(self, spider_names):
+        spider_loader = self.crawler_process.spider_loader
+        spider_classes = [spider_loader.load(name) for name in spider_names]
+        self._set_reactor(spider_classes)
+        # Resolved by the DNS resolver as soon as the reactor starts
+        self.settings.set(
+            "CITY_SCRAPERS_DNS_PREFETCH",
+            sorted(set().union(*map(start_hosts, spider_classes))),
+            priority="cmdline",
+        )
+        self.results = {}
+        self.deadline = self.settings.getfloat("CITY_SCRAPERS_CRAWLALL_DEADLINE")
+        self.timeouts = {}
+        if self.deadline:
+            history = RunHistory(history_path(self.settings))
+            self.timeouts = estimate_timeouts(
+                spider_names,
+                history.runtimes(),
+                self.settings.getfloat("CITY_SCRAPERS_TIMEOUT_FACTOR"),
+                self.settings.getfloat("CITY_SCRAPERS_MIN_TIMEOUT"),
+            )
+            history.close()
+
+        concurrency = max(
+            self.settings.getint("CITY_SCRAPERS_CRAWLALL_CONCURRENCY", 1), 1
+        )
+        logger.info(
+            "Running %d spiders, up to %d at a time", len(spider_names), concurrency
+        )
+        self.semaphore = DeferredSemaphore(concurrency)
+        jobdir = self.settings.get("CITY_SCRAPERS_CRAWLALL_JOBDIR")
+        self.checkpoint = CrawlCheckpoint(jobdir) if jobdir else None
+        self.probe_store = None
+        if self.settings.getbool("CITY_SCRAPERS_CRAWLALL_PROBE"):
+            self.probe_store = ProbeStore(probe_store_path(self.settings))
+        finished = self._run_attempt(spider_names, 1)
+        if not finished.called:
+            finished.addBoth(self._stop_reactor)
+            self.crawler_process.start(stop_after_crawl=False)
+        if self.checkpoint is not None:
+            self.checkpoint.close()
+        if self.probe_store is not None:
+            self.probe_store.close()
+
+        self._log_summary()
+        if any(result["failed"] for result in self.results.values()):
+            self.exitcode = 1
+
+    def _run_attempt(self, spider_names, attempt):
+        d = DeferredList(
+            [self.semaphore.run(self._crawl, name, attempt) for name in spider_names]
+        )
+        d.addCallback(lambda _: self._retry_failed(attempt))
+        return d
+
+    def _retry_failed(self, attempt):
+        """
+        Run spiders that failed again at the end of the pass, waiting a delay that
+        doubles with each attempt so that transient problems (like the VPN dropping)
+        have time to clear up.
+        """
+        retry_names = sorted(
+            name for name, res in self.results.items() if self._should_retry(res)
+        )
+        if not retry_names:
+            return
+        if attempt > self.settings.getint("CITY_SCRAPERS_CRAWLALL_RETRIES"):
+            logger.warning(
+                "Not retrying %d failed spiders after %d attempts: %s",
+                len(retry_names),
+                attempt,
+                ", ".join(retry_names),
+            )
+            return
+        delay = self.settings.getfloat("CITY_SCRAPERS_CRAWLALL_RETRY_DELAY") * 2 ** (
+            attempt - 1
+        )
+        if self.deadline and time.time() + delay > self.deadline - 1:
+            logger.warning(
+                "Not enough time left to retry %d failed spiders: %s",
+                len(retry_names),
+                ", ".join(retry_names),
+            )
+            return
+        logger.info(
+            "Retrying %d failed spiders in %.0fs (attempt %d): %s",
+            len(retry_names),
+            delay,
+            attempt + 1,
+            ", ".join(retry_names),
+        )
+        from twisted.internet import reactor
+
+        return deferLater(reactor, delay, self._run_attempt, retry_names, attempt + 1)
+
+    def _should_retry(self, result):
+        """Whether a spider failed, or logged errors without scraping anything, for a
+        reason that might go away if it's run again"""
+        if result["skipped"] or result["reason"] in NO_RETRY_REASONS:
+            return False
+        return result["failed"] or (result["errors"] > 0 and not result["items"])
+
+    def _select_spiders(self, args, spider_list):
+        """Return the spiders named in args in order, or all spiders if none are"""
+        if not args:
+            return sorted(spider_list)
+        unknown = [name for name in args if name not in spider_list]
+        if unknown:
+            raise UsageError(f"Unknown spiders: {', '.join(unknown)}", print_help=False)
+        return list(dict.fromkeys(args))
+
+    def _set_reactor(self, spider_classes):
+        """
+        Spiders can request a reactor in custom_settings, but only one reactor can be
+        installed per process. If the project doesn't set one, use the reactor the
+        spiders ask for so that they can run alongside everything else. The asyncio
+        reactor can run any spider, so this doesn't affect spiders that don't ask.
+        """
+        if self.settings.get("TWISTED_REACTOR"):
+            return
+        reactors = sorted(
+            {
+                (spider_cls.custom_settings or {}).get("TWISTED_REACTOR")
+                for spider_cls in spider_classes
+            }
+            - {None}
+        )
+        if len(reactors) > 1:
+            logger.warning(
+                "Spiders requested more than one reactor (%s), using %s",
+                ", ".join(reactors),
+                reactors[0],
+            )
+        if reactors:
+            self.settings.set("TWISTED_REACTOR", reactors[0], priority="cmdline")
+
+    def _crawl(self, spider_name, attempt=1):
+        """
+        Run a single spider, recording how it finished. Errors are logged and recorded
+        rather than raised so that one spider failing doesn't stop the others.
+        """
+        result = {
+            "failed": False,
+            "skipped": False,
+            "reason": None,
+            "items": 0,
+            "errors": 0,
+            "elapsed": 0,
+            "attempts": attempt,
+        }
+        self.results[spider_name] = result
+        if self.deadline and self.deadline - time.time() < 1:
+            result["skipped"] = True
+            result["reason"] = "out of time"
+            return
+
+        def crawl(crawler):
+            crawler.settings.set(
+                "CITY_SCRAPERS_CRAWL_ATTEMPT", attempt, priority="cmdline"
+            )
+            if self.deadline:
+                self._set_timeout(crawler)
+            if self.checkpoint is not None:
+                self._set_jobdir(crawler)
+            return self.crawler_process.crawl(crawler).addCallback(lambda _: crawler)
+
+        def crawl_finished(crawler):
+            stats = crawler.stats.get_stats()
+            result["reason"] = stats.get("finish_reason")
+            result["items"] = stats.get("item_scraped_count", 0)
+            result["errors"] = stats.get("log_count/ERROR", 0)
+            result["elapsed"] = stats.get("elapsed_time_seconds", 0)
+            result["failed"] = result["reason"] != "finished"
+            if self.checkpoint is not None:
+                self._save_progress(spider_name, result)
+            if self.probe_store is not None and not (
+                result["failed"] or self._should_retry(result)
+            ):
+                # Later probes are compared to the pages as they were for this crawl
+                self.probe_store.mark_crawled(
+                    spider_name, code_version(crawler.spidercls)
+                )
+
+        def crawl_failed(failure):
+            result["failed"] = True
+            result["reason"] = failure.getErrorMessage() or failure.type.__name__
+            logger.error(
+                "Spider %s failed to run",
+                spider_name,
+                exc_info=failure_to_exc_info(failure),
+            )
+
+        d = maybeDeferred(self.crawler_process.create_crawler, spider_name)
+        d.addCallback(crawl)
+        d.addCallbacks(crawl_finished, crawl_failed)
+        return d
+
+    def _set_timeout(self, crawler):
+        """
+        Stop a spider once it's taken much longer than it usually does, or when the
+        budget runs out, so that a hung site can't use up the time for the others.
+        """
+        remaining = self.deadline - time.time()
+        timeout = min(self.timeouts.get(crawler.spidercls.name, remaining), remaining)
+        crawler.settings.setdict(
+            {
+                # Added to the project's extensions rather than replacing them
+                "EXTENSIONS": {
+                    **crawler.settings.getdict("EXTENSIONS"),
+                    "scrapy.extensions.closespider.CloseSpider": 0,
+                },
+                "CLOSESPIDER_TIMEOUT": max(int(timeout), 1),
+                # Only enabled for the timeout, errors shouldn't stop spiders
+                "CLOSESPIDER_ERRORCOUNT": 0,
+            },
+            priority="cmdline",
+        )
+
+    def _set_jobdir(self, crawler):
+        """
+        Persist a spider's scheduler queue and the requests it's seen in its own
+        directory in the run's checkpoint, so that it resumes from where it stopped.
+        Requests that can't be pickled are kept in memory instead, which is logged
+        with SCHEDULER_DEBUG since they'd be lost if the run is interrupted.
+        """
+        crawler.settings.setdict(
+            {
+                "JOBDIR": self.checkpoint.spider_jobdir(crawler.spidercls.name),
+                "SCHEDULER_DEBUG": True,
+            },
+            priority="cmdline",
+        )
+
+    def _save_progress(self, spider_name, result):
+        """
+        Record a spider that finished so that it's skipped when the run is resumed.
+        Spiders that will be retried start over, since the requests that failed are
+        already marked as seen, while ones that were stopped keep their JOBDIR.
+        """
+        if self._should_retry(result):
+            self.checkpoint.reset_spider(spider_name)
+        elif not result["failed"]:
+            self.checkpoint.mark_finished(spider_name)
+
+    def _fit_budget(self, spider_names, history, runtimes, budget, processes):
+        """
+        Order spiders by value (upcoming meetings first, then the longest since their
+        last successful run) and keep the ones expected to start within the budget.
+        """
+        upcoming_until = datetime.now() + timedelta(
+            days=self.settings.getint("CITY_SCRAPERS_UPCOMING_DAYS")
+        )
+        ordered = prioritize(
+            spider_names,
+            history.last_finished(),
+            history.next_meetings(),
+            upcoming_until,
+        )
+        slots = processes * self.settings.getint("CITY_SCRAPERS_CRAWLALL_CONCURRENCY")
+        return fit_budget(
+            ordered, estimate_runtimes(spider_names, runtimes), budget, slots
+        )
+
+    def _plan_lanes(self, spider_names, processes, runtimes, ordered=False):
+        """
+        Group spiders into lanes that each run in their own crawlall process. Spiders
+        that render pages with Playwright all run in one lane so that they can share a
+        browser, and the rest are split into shards balanced by previous runtimes. If
+        there's only one process for the rest, it's run in this process. If ordered,
+        spiders keep their order within each lane.
+        """
+        spider_loader = self.crawler_process.spider_loader
+        playwright_names = [
+            name for name in spider_names if uses_playwright(spider_loader.load(name))
+        ]
+        estimates = estimate_runtimes(spider_names, runtimes)
+        shards = lpt_shards(
+            {
+                name: estimate
+                for name, estimate in estimates.items()
+                if name not in playwright_names
+            },
+            processes,
+        )
+        lanes = [
+            {
+                "name": f"shard {idx}",
+                "spiders": names,
+                "estimate": estimate,
+                "args": [],
+                "subprocess": processes > 1,
+            }
+            for idx, (estimate, names) in enumerate(shards)
+            if names
+        ]
+        if ordered:
+            rank = {name: idx for idx, name in enumerate(spider_names)}
+            for lane in lanes:
+                lane["spiders"].sort(key=rank.get)
+        if playwright_names:
+            lanes.append(
+                {
+                    "name": "playwright",
+                    "spiders": playwright_names,
+                    "estimate": sum(estimates[name] for name in playwright_names),
+                    "args": ["--playwright-lane"],
+                    "subprocess": True,
+                }
+            )
+        return lanes
+
+    def _print_plan(self, lanes, skipped):
+        for lane in lanes:
+            print(
+                "{} ({}): {} spiders, estimated {:.1f}s".format(
+                    lane["name"].capitalize(),
+                    "separate process" if lane["subprocess"] else "this process",
+                    len(lane["spiders"]),
+                    lane["estimate"],
+                )
+            )
+            for name in lane["spiders"]:
+                print(f"  {name}")
+        makespan = max((lane["estimate"] for lane in lanes), default=0)
+        print(f"Estimated makespan: {makespan:.1f}s")
+        if skipped:
+            print(f"Skipped to fit budget: {len(skipped)} spiders")
+            for name in skipped:
+                print(f"  {name}")
+
+    def _command_args(self, command, opts):
+        """Command line for running a scrapy command with the same settings"""
+        args = [sys.executable, "-m", "scrapy.cmdline", command]
+        for setting in opts.set:
+            args.extend(["-s", setting])
+        for setting in LANE_SETTINGS:
+            if self.settings.get(setting):
+                args.extend(["-s", f"{setting}={self.settings[setting]}"])
+        if opts.loglevel:
+            args.extend(["-L", opts.loglevel])
+        if opts.nolog:
+            args.append("--nolog")
+        return args
+
+    def _lane_args(self, lane, opts):
+        """Command line for running a lane of spiders in its own crawlall process"""
+        args = self._command_args("crawlall", opts) + ["-P", "1", "--lane"]
+        if opts.concurrency:
+            args.extend(["-c", str(opts.concurrency)])
+        return args + lane["args"] + lane["spiders"]
+
+    def _run_lanes(self, lanes, opts):
+        """
+        Start each lane that needs its own process, run the remaining lane (if any) in
+        this process, and wait for the rest to finish. Reports the estimated and
+        actual makespan of each lane so that the number of processes can be tuned.
+        """
+        if any(lane["subprocess"] for lane in lanes) and not self.settings.get(
+            "CITY_SCRAPERS_HOST_RATE_FILE"
+        ):
+            # Share per-host rate limits between the lane processes
+            self.settings.set(
+                "CITY_SCRAPERS_HOST_RATE_FILE",
+                data_path("host_rate.db"),
+                priority="cmdline",
+            )
+        start = time.monotonic()
+        running = {}
+        for idx, lane in enumerate(lanes):
+            if lane["subprocess"]:
+                logger.info(
+                    "Starting %s lane with %d spiders, estimated %.1fs",
+                    lane["name"],
+                    len(lane["spiders"]),
+                    lane["estimate"],
+                )
+                running[idx] = subprocess.Popen(self._lane_args(lane, opts))
+
+        elapsed = {}
+        for idx, lane in enumerate(lanes):
+            if not lane["subprocess"]:
+                self._run_in_process(lane["spiders"])
+                elapsed[idx] = time.monotonic() - start
+        while running:
+            for idx, proc in list(running.items()):
+                if proc.poll() is not None:
+                    elapsed[idx] = time.monotonic() - start
+                    del running[idx]
+                    if proc.returncode != 0:
+                        self.exitcode = 1
+            if running:
+                time.sleep(1)
+
+        if len(lanes) < 2:
+            return
+        for idx, lane in enumerate(lanes):
+            logger.info(
+                "%s lane: %d spiders, estimated %.1fs, actual %.1fs",
+                lane["name"].capitalize(),
+                len(lane["spiders"]),
+                lane["estimate"],
+                elapsed[idx],
+            )
+        logger.info(
+            "Finished %d lanes, estimated makespan %.1fs, actual %.1fs",
+            len(lanes),
+            max(lane["estimate"] for lane in lanes),
+            time.monotonic() - start,
+        )
+
+    def _stop_reactor(self, _=None):
+        from twisted.internet import reactor
+
+        try:
+            reactor.stop()
+        except RuntimeError:  # raised if already stopped or in shutdown stage
+            pass
+
+    def _log_summary(self):
+        failed = sorted(name for name, res in self.results.items() if res["failed"])
+        skipped = sum(res["skipped"] for res in self.results.values())
+        for name, res in sorted(self.results.items()):
+            logger.info(
+                "%s: %s, %d items in %.1fs%s",
+                name,
+                res["reason"],
+                res["items"],
+                res["elapsed"] or 0,
+                f" (attempt {res['attempts']})" if res["attempts"] > 1 else "",
+            )
+        logger.info(
+            "Finished %d spiders, %d failed%s%s",
+            len(self.results) - skipped,
+            len(failed),
+            f": {', '.join(failed)}" if failed else "",
+            f", {skipped} skipped when out of time" if skipped else "",
+        )
@@ -0,0 +1,10 @@
+from city_scrapers_core.commands.genspider import Command as GenSpiderCommand
+
+from city_scrapers.spider_loader import build_manifest, manifest_path, write_manifest
+
+
+class Command(GenSpiderCommand):
+    def run(self, args, opts):
+        super().run(args, opts)
+        # Add the new spider to the manifest so that it can be loaded
+        write_manifest(manifest_path(self.settings), build_manifest(self.settings))
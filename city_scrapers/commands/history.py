@@ -0,0 +1,97 @@
+from statistics import median
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.history import RunHistory, history_path
+from city_scrapers.scheduling import RUNTIME_SAMPLE_SIZE
+
+COLUMNS = [
+    ("spider", "Spider", "{}"),
+    ("finish_time", "Finished", "{:.19}"),
+    ("wall_time", "Time (s)", "{:.1f}"),
+    ("request_count", "Requests", "{}"),
+    ("response_bytes", "Bytes", "{}"),
+    ("item_count", "Items", "{}"),
+    ("error_count", "Errors", "{}"),
+    ("finish_reason", "Reason", "{}"),
+    ("attempt", "Attempt", "{}"),
+    ("peak_memory", "Memory (MB)", "{:.0f}"),
+]
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] [<spider>]"
+
+    def short_desc(self):
+        return "Show recorded stats from previous spider runs"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "-n",
+            "--limit",
+            dest="limit",
+            type=int,
+            default=10,
+            help="number of runs to show for a spider (default: 10)",
+        )
+        parser.add_argument(
+            "--slower",
+            dest="slower",
+            type=float,
+            metavar="FACTOR",
+            help="only show spiders whose latest run took at least FACTOR times the "
+            "median of their previous runs",
+        )
+
+    def run(self, args, opts):
+        if len(args) > 1:
+            raise UsageError("Only one spider can be shown at a time")
+        history = RunHistory(history_path(self.settings))
+        try:
+            if opts.slower:
+                self._print_slower(history, opts.slower)
+            elif args:
+                self._print_runs(history.runs(args[0], limit=opts.limit))
+            else:
+                self._print_runs(self._latest_runs(history))
+        finally:
+            history.close()
+
+    def _latest_runs(self, history):
+        """Return the most recent run of each spider"""
+        latest = {}
+        for run in history.runs():
+            latest.setdefault(run["spider"], run)
+        return [latest[name] for name in sorted(latest)]
+
+    def _print_runs(self, runs):
+        rows = [[header for _, header, _ in COLUMNS]]
+        for run in runs:
+            row = []
+            for key, _, fmt in COLUMNS:
+                value = run[key]
+                if key == "peak_memory" and value is not None:
+                    value = value / (1024 * 1024)
+                row.append("" if value is None else fmt.format(value))
+            rows.append(row)
+        widths = [max(len(row[idx]) for row in rows) for idx in range(len(COLUMNS))]
+        for row in rows:
+            print("  ".join(val.ljust(width) for val, width in zip(row, widths)))
+
+    def _print_slower(self, history, factor):
+        for name, runtimes in sorted(history.runtimes().items()):
+            previous = runtimes[-RUNTIME_SAMPLE_SIZE - 1 : -1]
+            if not previous:
+                continue
+            baseline = median(previous)
+            if runtimes[-1] >= baseline * factor:
+                print(
+                    f"{name}: {runtimes[-1]:.1f}s, "
+                    f"{runtimes[-1] / baseline:.1f}x the median of {baseline:.1f}s"
+                )
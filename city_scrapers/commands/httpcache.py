@@ -0,0 +1,52 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.misc import load_object
+
+from city_scrapers.httpcache import ContentAddressedCacheStorage
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Show the size and dedupe ratio of the HTTP cache"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "--gc",
+            dest="gc",
+            type=float,
+            metavar="DAYS",
+            help="remove responses stored more than DAYS days ago first",
+        )
+
+    def run(self, args, opts):
+        storage_cls = load_object(self.settings["HTTPCACHE_STORAGE"])
+        if not issubclass(storage_cls, ContentAddressedCacheStorage):
+            raise UsageError("HTTPCACHE_STORAGE isn't ContentAddressedCacheStorage")
+        storage = storage_cls(self.settings)
+        storage.connect()
+        try:
+            if opts.gc is not None:
+                removed = storage.gc(opts.gc * 86400)
+                print(f"Removed {removed} bodies")
+            stats = storage.stats()
+        finally:
+            storage.conn.close()
+        print(
+            f"{stats['responses']} responses with {stats['bodies']} unique bodies in "
+            f"{storage.cachedir}"
+        )
+        print(
+            f"{stats['size']} bytes of responses, {stats['unique_size']} unique, "
+            f"{stats['stored_size']} stored"
+        )
+        print(
+            f"Dedupe ratio {stats['dedupe_ratio']}, "
+            f"compression ratio {stats['compression_ratio']}"
+        )
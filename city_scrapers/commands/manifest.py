@@ -0,0 +1,47 @@
+from scrapy.commands import ScrapyCommand
+
+from city_scrapers.spider_loader import (
+    build_manifest,
+    manifest_path,
+    read_manifest,
+    write_manifest,
+)
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Generate the manifest mapping spider names to their modules"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "--check",
+            dest="check",
+            action="store_true",
+            help="exit with an error if the manifest is out of date instead of "
+            "writing it",
+        )
+
+    def run(self, args, opts):
+        path = manifest_path(self.settings)
+        manifest = build_manifest(self.settings)
+        current = read_manifest(path) or {}
+        if opts.check:
+            changed = sorted(
+                name
+                for name in set(manifest) | set(current)
+                if manifest.get(name) != current.get(name)
+            )
+            if changed:
+                print(f"Spider manifest is out of date for: {', '.join(changed)}")
+                print("Run `scrapy manifest` to update it")
+                self.exitcode = 1
+            return
+        write_manifest(path, manifest)
+        print(f"Wrote {len(manifest)} spiders to {path}")
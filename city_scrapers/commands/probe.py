@@ -0,0 +1,57 @@
+import time
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.probe import ProbeSpider, ProbeStore, probe_store_path
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options] [<spider> ...]"
+
+    def short_desc(self):
+        return "Check whether spiders' start pages changed since they were last crawled"
+
+    def long_desc(self):
+        return (
+            "Request the start_urls of every spider (or the ones listed), "
+            "conditionally when possible, and print whether each spider's start pages "
+            "are unchanged, changed or unreachable since it was last crawled by "
+            "crawlall with probing enabled. Spiders without start_urls can't be "
+            "probed."
+        )
+
+    def run(self, args, opts):
+        spider_loader = self.crawler_process.spider_loader
+        spider_list = spider_loader.list()
+        unknown = [name for name in args if name not in spider_list]
+        if unknown:
+            raise UsageError(f"Unknown spiders: {', '.join(unknown)}", print_help=False)
+        spider_names = args or sorted(spider_list)
+        targets = {}
+        for name in spider_names:
+            start_urls = getattr(spider_loader.load(name), "start_urls", None)
+            if start_urls:
+                targets[name] = list(start_urls)
+
+        started = time.time()
+        self.crawler_process.crawl(ProbeSpider, targets=targets)
+        self.crawler_process.start()
+        if self.crawler_process.bootstrap_failed:
+            self.exitcode = 1
+            return
+
+        store = ProbeStore(probe_store_path(self.settings))
+        statuses = store.statuses(started)
+        store.close()
+        counts = {}
+        for name in spider_names:
+            status = statuses.get(name, "not probed")
+            counts[status] = counts.get(status, 0) + 1
+            print(f"{name}: {status}")
+        print(
+            ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        )
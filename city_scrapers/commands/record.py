@@ -0,0 +1,61 @@
+import os
+
+from scrapy.commands import BaseRunSpiderCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.crawl_archive import RECORD_SETTINGS, CrawlArchive
+
+
+class Command(BaseRunSpiderCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options] <spider> <archive>"
+
+    def short_desc(self):
+        return "Run a spider, recording every response to a crawl archive"
+
+    def long_desc(self):
+        return (
+            "Run a spider, recording every response to a crawl archive that "
+            "`scrapy replay` can serve the same crawl from offline. Caches, "
+            "conditional requests and replaying unchanged pages are turned off so "
+            "that every page (including robots.txt) is downloaded in full."
+        )
+
+    def add_options(self, parser):
+        BaseRunSpiderCommand.add_options(self, parser)
+        parser.add_argument(
+            "--overwrite",
+            dest="overwrite",
+            action="store_true",
+            help="replace the archive if it already exists",
+        )
+
+    def run(self, args, opts):
+        if len(args) != 2:
+            raise UsageError()
+        spider_name, path = args
+        if os.path.exists(path):
+            if not opts.overwrite:
+                raise UsageError(
+                    f"{path} already exists, use --overwrite to replace it"
+                )
+            os.remove(path)
+        self.settings.setdict(
+            {**RECORD_SETTINGS, "CITY_SCRAPERS_RECORD_PATH": path}, priority="cmdline"
+        )
+        self.crawler_process.crawl(spider_name, **opts.spargs)
+        self.crawler_process.start()
+        if self.crawler_process.bootstrap_failed:
+            self.exitcode = 1
+        if not os.path.exists(path):
+            return
+        archive = CrawlArchive(path)
+        stats = archive.stats()
+        archive.close()
+        print(
+            f"Recorded {stats['records']} responses with {stats['contents']} unique "
+            f"bodies to {path} ({stats['raw_size']} bytes of bodies stored in "
+            f"{stats['file_size']} bytes)"
+        )
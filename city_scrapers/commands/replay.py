@@ -0,0 +1,50 @@
+import os
+
+from scrapy.commands import BaseRunSpiderCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.crawl_archive import REPLAY_SETTINGS
+
+
+class Command(BaseRunSpiderCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options] <spider> <archive>"
+
+    def short_desc(self):
+        return "Run a spider offline with responses from a crawl archive"
+
+    def long_desc(self):
+        return (
+            "Run a spider with every request served from a crawl archive made with "
+            "`scrapy record` instead of the network, and print how long it took. "
+            "Throttling is turned off so that the time is spent on the spider and "
+            "Scrapy, which makes replays useful as performance baselines."
+        )
+
+    def run(self, args, opts):
+        if len(args) != 2:
+            raise UsageError()
+        spider_name, path = args
+        if not os.path.exists(path):
+            raise UsageError(f"No crawl archive at {path}")
+        self.settings.setdict(
+            {**REPLAY_SETTINGS, "CITY_SCRAPERS_REPLAY_PATH": path}, priority="cmdline"
+        )
+        crawler = self.crawler_process.create_crawler(spider_name)
+        self.crawler_process.crawl(crawler, **opts.spargs)
+        self.crawler_process.start()
+        if self.crawler_process.bootstrap_failed:
+            self.exitcode = 1
+            return
+        stats = crawler.stats.get_stats()
+        missing = stats.get("replay/missing", 0)
+        print(
+            f"Replayed {stats.get('replay/responses', 0)} responses and scraped "
+            f"{stats.get('item_scraped_count', 0)} items in "
+            f"{stats.get('elapsed_time_seconds', 0):.2f}s ({missing} requests "
+            "weren't in the archive)"
+        )
+        if missing or stats.get("finish_reason") != "finished":
+            self.exitcode = 1
@@ -0,0 +1,72 @@
+import pprint
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.utils.conf import arglist_to_dict
+
+from city_scrapers.worker import submit_job, worker_socket_path
+
+# Stats shown while a job is running
+PROGRESS_STATS = {
+    "downloader/request_count": "requests",
+    "response_received_count": "responses",
+    "item_scraped_count": "items",
+    "log_count/ERROR": "errors",
+}
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <spider>"
+
+    def short_desc(self):
+        return "Crawl a spider in a running `scrapy worker` and stream its stats"
+
+    def long_desc(self):
+        return (
+            "Crawl a spider in a running `scrapy worker` and stream its stats. "
+            "Settings passed with -s are applied to the crawl in the worker."
+        )
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "--socket",
+            dest="socket",
+            help="path of the worker's Unix socket "
+            "(default: CITY_SCRAPERS_WORKER_SOCKET or .scrapy/worker.sock)",
+        )
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        path = opts.socket or worker_socket_path(self.settings)
+        self.exitcode = 1
+        try:
+            for message in submit_job(path, args[0], arglist_to_dict(opts.set)):
+                self._print_message(message)
+        except OSError as e:
+            raise UsageError(f"Could not reach a worker at {path}: {e}", False)
+
+    def _print_message(self, message):
+        event = message.get("event")
+        if event == "started":
+            print(f"Started {message['spider']} in process {message['pid']}")
+        elif event == "stats":
+            stats = message["stats"]
+            print(
+                ", ".join(
+                    f"{stats.get(stat, 0)} {label}"
+                    for stat, label in PROGRESS_STATS.items()
+                )
+            )
+        elif event == "finished":
+            print(f"Finished {message['spider']}: {message['reason']}")
+            pprint.pprint(message["stats"])
+            if message["reason"] == "finished":
+                self.exitcode = 0
+        elif event == "error":
+            print(f"Error: {message['message']}")
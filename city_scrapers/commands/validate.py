@@ -0,0 +1,5 @@
+from city_scrapers_core.commands.validate import Command as ValidateCommand
+
+
+class Command(ValidateCommand):
+    pass
@@ -0,0 +1,60 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.worker import CrawlWorker, worker_socket_path
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+
+    def syntax(self):
+        return "[options]"
+
+    def short_desc(self):
+        return "Run a worker that crawls spiders for jobs sent with `scrapy submit`"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "--socket",
+            dest="socket",
+            help="path of the Unix socket to listen on "
+            "(default: CITY_SCRAPERS_WORKER_SOCKET or .scrapy/worker.sock)",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            dest="jobs",
+            type=int,
+            help="maximum number of jobs running at once "
+            "(default: CITY_SCRAPERS_CRAWLALL_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--stats-interval",
+            dest="stats_interval",
+            type=float,
+            default=10,
+            help="seconds between stats sent back while a job runs (default: 10)",
+        )
+
+    def process_options(self, args, opts):
+        ScrapyCommand.process_options(self, args, opts)
+        if opts.jobs is not None and opts.jobs < 1:
+            raise UsageError("--jobs must be at least 1", print_help=False)
+        if opts.stats_interval <= 0:
+            raise UsageError("--stats-interval must be positive", print_help=False)
+
+    def run(self, args, opts):
+        worker = CrawlWorker(
+            self.settings,
+            self.crawler_process.spider_loader,
+            opts.socket or worker_socket_path(self.settings),
+            max_jobs=opts.jobs
+            or self.settings.getint("CITY_SCRAPERS_CRAWLALL_CONCURRENCY", 1),
+            stats_interval=opts.stats_interval,
+        )
+        worker.preload()
+        try:
+            worker.serve()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.request import fingerprint
+from twisted.internet import defer
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+REPLAY_HANDLER = "city_scrapers.crawl_archive.ReplayDownloadHandler"
+
+# Settings for recording a complete crawl, where every request goes to the network
+RECORD_SETTINGS = {
+    "CITY_SCRAPERS_CONDITIONAL_GET_ENABLED": False,
+    "CITY_SCRAPERS_DETAIL_CACHE_ENABLED": False,
+    "CITY_SCRAPERS_LEGISTAR_INCREMENTAL": False,
+    "CITY_SCRAPERS_LINK_PROBE_CACHE_ENABLED": False,
+    "CITY_SCRAPERS_ROBOTSTXT_CACHE_ENABLED": False,
+    "CITY_SCRAPERS_SHARED_CACHE_ENABLED": False,
+    "CITY_SCRAPERS_UNCHANGED_ENABLED": False,
+    "HTTPCACHE_ENABLED": False,
+}
+# Settings for replaying a crawl from an archive as fast as it can be parsed
+REPLAY_SETTINGS = {
+    **RECORD_SETTINGS,
+    "DOWNLOAD_HANDLERS": {"http": REPLAY_HANDLER, "https": REPLAY_HANDLER},
+    "AUTOTHROTTLE_ENABLED": False,
+    "DOWNLOAD_DELAY": 0,
+    "CITY_SCRAPERS_HOST_RATE_LIMIT": 0,
+}
+
+
+class CrawlArchive:
+    """
+    Compressed archive of the requests and responses of a crawl in a single SQLite
+    file, similar to a WARC file. Each response is stored as a record in the order it
+    was received, and its body is stored once per content hash so that identical
+    responses (like the same calendar page reached from different links) only take
+    up space once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS contents (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    body BLOB NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS records (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    fingerprint TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    request_headers BLOB NOT NULL,
+                    request_body BLOB NOT NULL,
+                    response_url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers BLOB NOT NULL,
+                    content_hash TEXT NOT NULL REFERENCES contents (hash),
+                    recorded_at REAL NOT NULL
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS records_fingerprint
+                ON records (fingerprint, id)
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def add(self, request, response):
+        content_hash = hashlib.sha256(response.body).hexdigest()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO contents (hash, size, body) VALUES (?, ?, ?)",
+                (content_hash, len(response.body), zlib.compress(response.body, 9)),
+            )
+            self.conn.execute(
+                """
+                INSERT INTO records
+                (fingerprint, method, url, request_headers, request_body,
+                 response_url, status, headers, content_hash, recorded_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    fingerprint(request).hex(),
+                    request.method,
+                    request.url,
+                    headers_dict_to_raw(request.headers),
+                    request.body,
+                    response.url,
+                    response.status,
+                    headers_dict_to_raw(response.headers),
+                    content_hash,
+                    time.time(),
+                ),
+            )
+
+    def add_file(self, request, path, status=200, headers=None):
+        """Add a local file as the response to a request, like the HTML fixtures
+        used in tests"""
+        with open(path, "rb") as f:
+            body = f.read()
+        headers = Headers(headers or {})
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        self.add(
+            request,
+            respcls(url=request.url, status=status, headers=headers, body=body),
+        )
+
+    def get(self, request):
+        """Return every response recorded for a request in the order they were
+        received"""
+        rows = self.conn.execute(
+            """
+            SELECT records.response_url, records.status, records.headers,
+                contents.body
+            FROM records JOIN contents ON records.content_hash = contents.hash
+            WHERE records.fingerprint = ?
+            ORDER BY records.id
+            """,
+            (fingerprint(request).hex(),),
+        ).fetchall()
+        return [
+            {
+                "url": url,
+                "status": status,
+                "headers": headers_raw_to_dict(headers),
+                "body": zlib.decompress(body),
+            }
+            for url, status, headers, body in rows
+        ]
+
+    def stats(self):
+        """Return the number of records and unique bodies in the archive, along with
+        the uncompressed and stored size of the bodies"""
+        records, raw_size = self.conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(contents.size), 0)
+            FROM records JOIN contents ON records.content_hash = contents.hash
+            """
+        ).fetchone()
+        contents, stored_size = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM contents"
+        ).fetchone()
+        return {
+            "records": records,
+            "contents": contents,
+            "raw_size": raw_size,
+            "stored_size": stored_size,
+            "file_size": os.path.getsize(self.path),
+        }
+
+
+class ReplayDownloadHandler:
+    """
+    Download handler that serves every request from a crawl archive instead of the
+    network, so that a recorded crawl can be repeated exactly and offline. Requests
+    are matched by method, URL and body, and a request recorded several times gets
+    each of its responses in turn (and the last one after that). Requests that
+    weren't recorded are ignored. Enabled for http and https in DOWNLOAD_HANDLERS
+    with the archive in CITY_SCRAPERS_REPLAY_PATH.
+    """
+
+    lazy = False
+
+    def __init__(self, crawler, archive):
+        self.crawler = crawler
+        self.archive = archive
+        self.served = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get("CITY_SCRAPERS_REPLAY_PATH")
+        if not path:
+            raise NotConfigured("CITY_SCRAPERS_REPLAY_PATH isn't set")
+        if not os.path.exists(path):
+            raise NotConfigured(f"No crawl archive at {path}")
+        return cls(crawler, CrawlArchive(path))
+
+    def download_request(self, request, spider):
+        responses = self.archive.get(request)
+        if not responses:
+            self.crawler.stats.inc_value("replay/missing", spider=spider)
+            logger.warning("No recorded response for %s", request)
+            return defer.fail(IgnoreRequest(f"{request} isn't in the crawl archive"))
+        key = fingerprint(request)
+        index = self.served.get(key, 0)
+        self.served[key] = index + 1
+        recorded = responses[min(index, len(responses) - 1)]
+        self.crawler.stats.inc_value("replay/responses", spider=spider)
+        headers = Headers(recorded["headers"])
+        respcls = responsetypes.from_args(
+            headers=headers, url=recorded["url"], body=recorded["body"]
+        )
+        return defer.succeed(
+            respcls(
+                url=recorded["url"],
+                status=recorded["status"],
+                headers=headers,
+                body=recorded["body"],
+                request=request,
+                flags=["replayed"],
+            )
+        )
+
+    def close(self):
+        self.archive.close()
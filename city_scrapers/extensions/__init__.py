@@ -0,0 +1,2 @@
+from .combined_feed import CombinedFeedExtension  # noqa
+from .run_history import RunHistoryExtension  # noqa
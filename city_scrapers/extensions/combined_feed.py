@@ -0,0 +1,51 @@
+import io
+import logging
+
+from scrapy import signals
+from scrapy.exporters import JsonLinesItemExporter
+
+from ..combined_feed import get_combined_feed
+
+logger = logging.getLogger(__name__)
+
+
+class CombinedFeedExtension:
+    """
+    Adds each spider's items to the combined latest.json and upcoming.json feeds as
+    soon as it closes instead of waiting for every spider to finish, so that the
+    combinefeeds command only needs to seal and upload them. A run that didn't finish
+    and scraped nothing doesn't replace the spider's previous results.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.feed = get_combined_feed(settings)
+        self.buffer = io.BytesIO()
+        self.exporter = JsonLinesItemExporter(
+            self.buffer, encoding=settings.get("FEED_EXPORT_ENCODING")
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def item_scraped(self, item):
+        self.exporter.export_item(item)
+
+    def spider_closed(self, spider, reason):
+        lines = self.buffer.getvalue().decode("utf-8").splitlines(keepends=True)
+        if not lines and reason != "finished":
+            logger.info(
+                "Keeping previous results for %s in combined feeds (%s)",
+                spider.name,
+                reason,
+            )
+            return
+        try:
+            self.feed.add_spider(spider.name, lines)
+        except Exception:
+            logger.exception("Failed to add %s to combined feeds", spider.name)
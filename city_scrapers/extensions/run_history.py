@@ -0,0 +1,68 @@
+import logging
+import resource
+import sys
+from datetime import datetime
+
+from itemadapter import ItemAdapter
+from scrapy import signals
+
+from ..history import RunHistory, history_path
+
+logger = logging.getLogger(__name__)
+
+
+class RunHistoryExtension:
+    """
+    Records stats from each spider run (wall time, requests, response bytes, items,
+    errors, finish reason and peak memory) in the run history database so that they
+    outlast the process and can be compared across runs. The start of the next
+    upcoming meeting scraped is recorded as well for scheduling crawls, along with the
+    attempt number when crawlall retries a spider.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.path = history_path(crawler.settings)
+        self.next_meeting = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def item_scraped(self, item):
+        start = ItemAdapter(item).get("start") if ItemAdapter.is_item(item) else None
+        if not isinstance(start, datetime):
+            return
+        # Meeting times are naive local times, like datetime.now()
+        start = start.replace(tzinfo=None)
+        if start < datetime.now():
+            return
+        if self.next_meeting is None or start < self.next_meeting:
+            self.next_meeting = start
+
+    def spider_closed(self, spider, reason):
+        stats = dict(self.crawler.stats.get_stats())
+        stats.setdefault("finish_reason", reason)
+        if "memusage/max" not in stats:
+            stats["memusage/max"] = self.peak_memory()
+        history = RunHistory(self.path)
+        try:
+            history.record(
+                spider.name,
+                stats,
+                self.next_meeting,
+                self.crawler.settings.getint("CITY_SCRAPERS_CRAWL_ATTEMPT", 1),
+            )
+        except Exception:
+            logger.exception("Failed to record run history for %s", spider.name)
+        finally:
+            history.close()
+
+    def peak_memory(self):
+        """Peak memory of the process in bytes, used if MemoryUsage is disabled"""
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+
+from playwright.async_api import async_playwright
+from scrapy.utils.defer import deferred_from_coro
+from scrapy_playwright.provider import PlaywrightBrowserProvider
+
+logger = logging.getLogger(__name__)
+
+
+class SharedBrowserPool:
+    """Starts at most one Playwright driver and one browser of each type per process
+    and keeps them running until the reactor shuts down"""
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.playwright = None
+        self.browsers = {}
+
+    async def start(self):
+        """Return the process's Playwright driver, starting it if needed"""
+        async with self.lock:
+            return await self._start()
+
+    async def get_browser(self, browser_type_name, launch_options):
+        """Return a connected browser of the given type, launching it if needed"""
+        async with self.lock:
+            browser = self.browsers.get(browser_type_name)
+            if browser is not None and browser.is_connected():
+                return browser
+            playwright = await self._start()
+            logger.info("Launching shared browser %s", browser_type_name)
+            browser = await getattr(playwright, browser_type_name).launch(
+                **launch_options
+            )
+            self.browsers[browser_type_name] = browser
+            return browser
+
+    async def _start(self):
+        if self.playwright is None:
+            from twisted.internet import reactor
+
+            self.playwright = await async_playwright().start()
+            reactor.addSystemEventTrigger(
+                "before", "shutdown", lambda: deferred_from_coro(self.close())
+            )
+        return self.playwright
+
+    async def close(self):
+        for browser in self.browsers.values():
+            if browser.is_connected():
+                await browser.close()
+        self.browsers.clear()
+        if self.playwright is not None:
+            await self.playwright.stop()
+            self.playwright = None
+
+
+shared_browsers = SharedBrowserPool()
+
+
+class SharedBrowser:
+    """A crawler's handle on a shared browser. Closing it only removes the listeners
+    the crawler added and leaves the browser running for the others."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.listeners = []
+
+    def __getattr__(self, name):
+        return getattr(self.browser, name)
+
+    def on(self, event, f):
+        self.listeners.append((event, f))
+        self.browser.on(event, f)
+
+    async def close(self, **kwargs):
+        for event, f in self.listeners:
+            self.browser.remove_listener(event, f)
+        self.listeners.clear()
+
+
+class SharedBrowserProvider(PlaywrightBrowserProvider):
+    """
+    PLAYWRIGHT_BROWSER_PROVIDER that shares a single Playwright driver and browser
+    between all of the crawlers in a process instead of starting them for each
+    spider. Every crawler still creates its own browser contexts, so cookies and
+    storage stay isolated between spiders, and only those contexts are closed when
+    a spider finishes.
+
+    Remote browsers (PLAYWRIGHT_CDP_URL and PLAYWRIGHT_CONNECT_URL) aren't shared.
+    """
+
+    @property
+    def shares_browser(self):
+        return not (self.config.cdp_url or self.config.connect_url)
+
+    async def start(self):
+        if not self.shares_browser:
+            return await super().start()
+        playwright = await shared_browsers.start()
+        self.browser_type = getattr(playwright, self.config.browser_type_name)
+
+    async def launch_browser(self):
+        if not self.shares_browser:
+            return await super().launch_browser()
+        browser = await shared_browsers.get_browser(
+            self.config.browser_type_name, self.config.launch_options
+        )
+        return SharedBrowser(browser)
+
+    async def close(self):
+        # The shared driver is stopped when the reactor shuts down
+        if not self.shares_browser:
+            await super().close()
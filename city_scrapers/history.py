@@ -0,0 +1,150 @@
+import sqlite3
+from datetime import datetime
+
+from scrapy.utils.project import data_path
+
+# Columns added after the runs table was created, along with their types
+ADDED_COLUMNS = {"next_meeting": "TEXT", "attempt": "INTEGER"}
+# Columns recorded for each spider run, along with the stats they're taken from
+STAT_COLUMNS = {
+    "wall_time": "elapsed_time_seconds",
+    "request_count": "downloader/request_count",
+    "response_bytes": "downloader/response_bytes",
+    "item_count": "item_scraped_count",
+    "error_count": "log_count/ERROR",
+    "finish_reason": "finish_reason",
+    "peak_memory": "memusage/max",
+}
+
+
+def history_path(settings):
+    """Return the run history database path, defaulting to .scrapy/history.db"""
+    return settings.get("CITY_SCRAPERS_HISTORY_PATH") or data_path("history.db")
+
+
+class RunHistory:
+    """SQLite store of stats from each spider run"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    spider TEXT NOT NULL,
+                    start_time TEXT,
+                    finish_time TEXT,
+                    wall_time REAL,
+                    request_count INTEGER,
+                    response_bytes INTEGER,
+                    item_count INTEGER,
+                    error_count INTEGER,
+                    finish_reason TEXT,
+                    peak_memory INTEGER,
+                    next_meeting TEXT,
+                    attempt INTEGER
+                )
+                """
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(runs)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if column not in columns:
+                    self.conn.execute(
+                        f"ALTER TABLE runs ADD COLUMN {column} {column_type}"
+                    )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS runs_spider ON runs (spider, finish_time)"
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def record(self, spider_name, stats, next_meeting=None, attempt=1):
+        """Record a spider run from its final crawler stats, along with the start of
+        the next upcoming meeting it scraped if there was one and which attempt at
+        running the spider it was"""
+        start_time = stats.get("start_time")
+        finish_time = stats.get("finish_time") or datetime.now()
+        row = {
+            column: stats.get(stat_name) for column, stat_name in STAT_COLUMNS.items()
+        }
+        if row["wall_time"] is None and start_time:
+            row["wall_time"] = (
+                finish_time.replace(tzinfo=None) - start_time.replace(tzinfo=None)
+            ).total_seconds()
+        row.update(
+            {
+                "spider": spider_name,
+                "start_time": start_time.isoformat() if start_time else None,
+                "finish_time": finish_time.isoformat(),
+                "next_meeting": next_meeting.isoformat() if next_meeting else None,
+                "attempt": attempt,
+            }
+        )
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO runs ({}) VALUES ({})".format(
+                    ", ".join(row), ", ".join("?" for _ in row)
+                ),
+                list(row.values()),
+            )
+
+    def runs(self, spider_name=None, limit=None):
+        """Return recorded runs, most recent first"""
+        query = "SELECT * FROM runs"
+        params = []
+        if spider_name:
+            query += " WHERE spider = ?"
+            params.append(spider_name)
+        query += " ORDER BY finish_time DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def runtimes(self):
+        """Return a dictionary mapping spider names to the wall times of their
+        successful runs, oldest first"""
+        runtimes = {}
+        for spider_name, wall_time in self.conn.execute(
+            """
+            SELECT spider, wall_time FROM runs
+            WHERE finish_reason = 'finished' AND wall_time > 0
+            ORDER BY finish_time, id
+            """
+        ):
+            runtimes.setdefault(spider_name, []).append(wall_time)
+        return runtimes
+
+    def last_finished(self):
+        """Return a dictionary mapping spider names to when their most recent
+        successful run finished"""
+        return {
+            spider_name: parse_time(finish_time)
+            for spider_name, finish_time in self.conn.execute(
+                """
+                SELECT spider, MAX(finish_time) FROM runs
+                WHERE finish_reason = 'finished' GROUP BY spider
+                """
+            )
+        }
+
+    def next_meetings(self):
+        """Return a dictionary mapping spider names to the start of the next upcoming
+        meeting found in their most recent run that found one"""
+        next_meetings = {}
+        for spider_name, next_meeting in self.conn.execute(
+            """
+            SELECT spider, next_meeting FROM runs
+            WHERE next_meeting IS NOT NULL ORDER BY finish_time, id
+            """
+        ):
+            next_meetings[spider_name] = parse_time(next_meeting)
+        return next_meetings
+
+
+def parse_time(value):
+    """Parse a stored timestamp as a naive datetime so that they can be compared"""
+    return datetime.fromisoformat(value).replace(tzinfo=None)
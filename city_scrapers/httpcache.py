@@ -0,0 +1,205 @@
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Bodies that aren't referenced anymore are only removed once they haven't been used
+# for this many seconds, so a spider storing the same body in another process while
+# the cache is being cleaned up doesn't lose it
+GC_GRACE_SECS = 3600
+
+
+class ContentAddressedCacheStorage:
+    """
+    HTTPCACHE_STORAGE backend that stores each response body once by its SHA-256
+    hash as a gzipped file, shared by every spider and run using the same
+    HTTPCACHE_DIR. A SQLite index maps each request fingerprint and the time it was
+    stored to the response's status, headers and body hash, so repeated crawls that
+    get the same pages only add a row to the index. The latest response for a request
+    is served, subject to HTTPCACHE_EXPIRATION_SECS.
+
+    When a spider closes, responses stored more than CITY_SCRAPERS_HTTPCACHE_GC_DAYS
+    days ago are removed along with bodies nothing refers to anymore, and the cache's
+    size and dedupe ratio are added to the spider's stats.
+    """
+
+    def __init__(self, settings):
+        self.cachedir = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.gc_secs = settings.getfloat("CITY_SCRAPERS_HTTPCACHE_GC_DAYS") * 86400
+        self.conn = None
+
+    def open_spider(self, spider):
+        self.connect()
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        logger.debug(
+            "Using content-addressed cache storage in %(cachedir)s",
+            {"cachedir": self.cachedir},
+            extra={"spider": spider},
+        )
+
+    def close_spider(self, spider):
+        try:
+            if self.gc_secs > 0:
+                self.gc(self.gc_secs)
+            stats = spider.crawler.stats
+            for key, value in self.stats().items():
+                stats.set_value(f"httpcache/storage/{key}", value, spider=spider)
+        finally:
+            self.conn.close()
+
+    def connect(self):
+        """Open the index, creating it if needed"""
+        self.conn = sqlite3.connect(os.path.join(self.cachedir, "index.db"), timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    fingerprint TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    spider TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers BLOB NOT NULL,
+                    body_hash TEXT NOT NULL,
+                    PRIMARY KEY (fingerprint, stored_at)
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bodies (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    stored_size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+
+    def body_path(self, body_hash):
+        return os.path.join(self.cachedir, "bodies", body_hash[:2], f"{body_hash}.gz")
+
+    def retrieve_response(self, spider, request):
+        row = self.conn.execute(
+            """
+            SELECT url, status, headers, body_hash, stored_at FROM responses
+            WHERE fingerprint = ? ORDER BY stored_at DESC LIMIT 1
+            """,
+            (self._fingerprinter.fingerprint(request).hex(),),
+        ).fetchone()
+        if row is None:
+            return  # not cached
+        url, status, raw_headers, body_hash, stored_at = row
+        if 0 < self.expiration_secs < time.time() - stored_at:
+            return  # expired
+        try:
+            with gzip.open(self.body_path(body_hash), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        body_hash = hashlib.sha256(response.body).hexdigest()
+        path = self.body_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wb") as f:
+                f.write(response.body)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO bodies (hash, size, stored_size, last_used)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (hash) DO UPDATE SET last_used = excluded.last_used
+                """,
+                (body_hash, len(response.body), os.path.getsize(path), now),
+            )
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (fingerprint, stored_at, spider, url, status, headers, body_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    self._fingerprinter.fingerprint(request).hex(),
+                    now,
+                    spider.name,
+                    response.url,
+                    response.status,
+                    headers_dict_to_raw(response.headers),
+                    body_hash,
+                ),
+            )
+
+    def gc(self, max_age):
+        """Remove responses stored more than max_age seconds ago and the bodies that
+        no response refers to anymore, returning the number of bodies removed"""
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM responses WHERE stored_at < ?", (now - max_age,)
+            )
+            unused = [
+                body_hash
+                for (body_hash,) in self.conn.execute(
+                    """
+                    SELECT hash FROM bodies
+                    WHERE last_used < ?
+                    AND hash NOT IN (SELECT body_hash FROM responses)
+                    """,
+                    (now - GC_GRACE_SECS,),
+                )
+            ]
+            self.conn.executemany(
+                "DELETE FROM bodies WHERE hash = ?", [(h,) for h in unused]
+            )
+        for body_hash in unused:
+            try:
+                os.remove(self.body_path(body_hash))
+            except FileNotFoundError:
+                pass
+        return len(unused)
+
+    def stats(self):
+        """Return the number of responses and unique bodies in the cache, the total
+        size of the responses' bodies, the size of the unique bodies before and after
+        compression, and the ratios between those sizes"""
+        responses, size = self.conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(bodies.size), 0)
+            FROM responses JOIN bodies ON responses.body_hash = bodies.hash
+            """
+        ).fetchone()
+        bodies, unique_size, stored_size = self.conn.execute(
+            """
+            SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0)
+            FROM bodies
+            """
+        ).fetchone()
+        return {
+            "responses": responses,
+            "bodies": bodies,
+            "size": size,
+            "unique_size": unique_size,
+            "stored_size": stored_size,
+            "dedupe_ratio": round(size / unique_size, 2) if unique_size else 0,
+            "compression_ratio": (
+                round(unique_size / stored_size, 2) if stored_size else 0
+            ),
+        }
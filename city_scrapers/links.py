@@ -0,0 +1,176 @@
+import logging
+import sqlite3
+import time
+
+from scrapy import Request, signals
+from scrapy.http.request import NO_CALLBACK
+from scrapy.utils.project import data_path
+from twisted.internet import defer
+from twisted.python.failure import Failure
+
+logger = logging.getLogger(__name__)
+
+# Statuses that mean a URL doesn't exist, rather than that it doesn't support HEAD
+MISSING_STATUSES = {404, 410}
+# Answers older than this many days are removed from the store
+LINK_MAX_AGE_DAYS = 30
+
+
+def link_store_path(settings):
+    """Return the link store path, defaulting to .scrapy/links.db"""
+    return settings.get("CITY_SCRAPERS_LINK_PROBE_PATH") or data_path("links.db")
+
+
+def link_exists(status):
+    """Whether a link's status means it exists"""
+    return status is not None and 200 <= status < 300
+
+
+def link_missing(status):
+    """Whether a link's status means it definitely doesn't exist"""
+    return status in MISSING_STATUSES
+
+
+def transient_status(status):
+    """Whether a status (None if the link couldn't be reached) could be different
+    when the link is checked again, so that it shouldn't be kept"""
+    return status is None or status == 429 or status >= 500
+
+
+class LinkStore:
+    """SQLite store of the status each URL returned when it was last checked, or
+    NULL if it couldn't be reached"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS links (
+                    url TEXT PRIMARY KEY,
+                    status INTEGER,
+                    checked_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, url):
+        return self.conn.execute(
+            "SELECT status, checked_at FROM links WHERE url = ?", (url,)
+        ).fetchone()
+
+    def set(self, url, status):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO links (url, status, checked_at) "
+                "VALUES (?, ?, ?)",
+                (url, status, time.time()),
+            )
+
+    def prune(self, max_age):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM links WHERE checked_at < ?", (time.time() - max_age,)
+            )
+
+
+class LinkProber:
+    """
+    Checks whether URLs exist without blocking the reactor, by sending HEAD requests
+    through the crawler's engine (so they go through the usual middlewares, throttling
+    and robots.txt rules) and sending a GET instead when the HEAD request fails. URLs
+    are checked once while their answer is less than CITY_SCRAPERS_LINK_PROBE_TTL
+    hours old, and checks of a URL that's already being checked wait for it. With
+    CITY_SCRAPERS_LINK_PROBE_CACHE_ENABLED, answers are kept on disk across runs.
+    Answers that could be different later, like timeouts and server errors, aren't
+    kept. Probers can share their answers and pending checks by being created with
+    the same statuses and pending dictionaries.
+    """
+
+    def __init__(self, crawler, store=None, ttl=None, statuses=None, pending=None):
+        self.crawler = crawler
+        self.store = store
+        if ttl is None:
+            ttl = crawler.settings.getfloat("CITY_SCRAPERS_LINK_PROBE_TTL") * 3600
+        self.ttl = ttl
+        self.statuses = {} if statuses is None else statuses
+        self.pending = {} if pending is None else pending
+        # URLs this prober is checking, which other probers might be waiting for
+        self.owned = set()
+
+    @classmethod
+    def from_crawler(cls, crawler, store=None, ttl=None, statuses=None, pending=None):
+        if store is None and crawler.settings.getbool(
+            "CITY_SCRAPERS_LINK_PROBE_CACHE_ENABLED"
+        ):
+            store = LinkStore(link_store_path(crawler.settings))
+        prober = cls(crawler, store, ttl, statuses, pending)
+        crawler.signals.connect(prober.spider_closed, signal=signals.spider_closed)
+        return prober
+
+    def spider_closed(self, spider):
+        # Checks cut short by the spider closing couldn't reach their URLs
+        for url in list(self.owned):
+            self._checked(None, url)
+        if self.store is not None:
+            try:
+                self.store.prune(LINK_MAX_AGE_DAYS * 86400)
+            finally:
+                self.store.close()
+                self.store = None
+
+    def check(self, url):
+        """Return a Deferred firing with the status of a URL after any redirects, or
+        None if it couldn't be reached"""
+        cached = self.statuses.get(url)
+        if cached is None and self.store is not None:
+            cached = self.store.get(url)
+        if (
+            cached is not None
+            and not transient_status(cached[0])
+            and time.time() - cached[1] < self.ttl
+        ):
+            self.statuses[url] = cached
+            self.crawler.stats.inc_value("link_probe/cached")
+            return defer.succeed(cached[0])
+        waiting = defer.Deferred()
+        if url in self.pending:
+            self.pending[url].append(waiting)
+        else:
+            self.pending[url] = [waiting]
+            self.owned.add(url)
+            d = self._download(Request(url, method="HEAD", callback=NO_CALLBACK))
+            d.addBoth(self._head_done, url)
+            d.addBoth(self._checked, url)
+        return waiting
+
+    def _download(self, request):
+        self.crawler.stats.inc_value(f"link_probe/{request.method.lower()}")
+        d = self.crawler.engine.download(request)
+        d.addCallback(lambda response: response.status)
+        return d
+
+    def _head_done(self, result, url):
+        if isinstance(result, Failure) or (
+            result >= 400 and result not in MISSING_STATUSES
+        ):
+            return self._download(Request(url, callback=NO_CALLBACK))
+        return result
+
+    def _checked(self, result, url):
+        if url not in self.owned:
+            # Already answered when the spider closed
+            return
+        self.owned.discard(url)
+        if isinstance(result, Failure):
+            logger.debug("Error checking %s: %s", url, result.value)
+            result = None
+        if not transient_status(result):
+            self.statuses[url] = (result, time.time())
+            if self.store is not None:
+                self.store.set(url, result)
+        for d in self.pending.pop(url, []):
+            d.callback(result)
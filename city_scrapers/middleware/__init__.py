@@ -0,0 +1,9 @@
+from .coalesce import RequestCoalescingMiddleware  # noqa
+from .conditional import ConditionalGetMiddleware  # noqa
+from .detail_cache import DetailPageCacheMiddleware  # noqa
+from .ratelimit import HostRateLimitMiddleware  # noqa
+from .recorder import CrawlRecorderMiddleware  # noqa
+from .robotstxt import CachedRobotsTxtMiddleware  # noqa
+from .shared_cache import SharedResponseCacheMiddleware  # noqa
+from .unchanged import UnchangedPageMiddleware  # noqa
+from .wayback import CityScrapersWaybackMiddleware  # noqa
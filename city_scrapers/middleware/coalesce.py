@@ -0,0 +1,88 @@
+import logging
+
+from twisted.internet.defer import Deferred
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCoalescingMiddleware:
+    """
+    Downloader middleware that downloads requests with the same "coalesce_key" in
+    their meta once, for requests that get the same response even though they're
+    different (like form requests whose bodies differ, which the dupefilter can't
+    see). A request whose key is already being downloaded waits for that download,
+    and a request whose key was already downloaded gets a copy of its response
+    without being downloaded again. If the first request with a key fails or gets
+    an error status, the requests waiting for it are downloaded themselves.
+    Requests without a key are left alone. Successful responses are kept until the
+    spider closes, so keys should be limited to the handful of pages a spider
+    requests many times rather than given to every request.
+
+    This needs to come before the retry and redirect middlewares so that it only
+    sees the final response of each request.
+    """
+
+    owner_meta = "coalesce_owner"
+    stats_prefix = "coalesce"
+    flag = "coalesced"
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.responses = {}
+        self.pending = {}
+        self.owned = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def get_key(self, request):
+        return request.meta.get("coalesce_key")
+
+    def get_response(self, key):
+        return self.responses.get(key)
+
+    def set_response(self, key, response):
+        # Failed pages are requested again by the requests waiting for them
+        if response.status != 200:
+            return
+        self.responses[key] = response
+
+    def process_request(self, request, spider):
+        key = self.get_key(request)
+        if key is None or self.owner_meta in request.meta:
+            return
+        response = self.get_response(key)
+        if response is not None:
+            self.stats.inc_value(f"{self.stats_prefix}/hits", spider=spider)
+            return response.replace(request=request, flags=response.flags + [self.flag])
+        if key in self.pending:
+            logger.debug("Waiting for %s to download %r", request, key)
+            waiting = Deferred()
+            self.pending[key].append(waiting)
+            waiting.addCallback(lambda _: self.process_request(request, spider))
+            return waiting
+        # The key is kept in meta so that retries and redirects keep owning it
+        request.meta[self.owner_meta] = key
+        self.pending[key] = []
+        self.owned.add(key)
+        self.stats.inc_value(f"{self.stats_prefix}/downloads", spider=spider)
+
+    def process_response(self, request, response, spider):
+        if self.owner_meta in request.meta:
+            key = request.meta[self.owner_meta]
+            self.set_response(key, response)
+            self._release(key)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        if self.owner_meta in request.meta:
+            self._release(request.meta[self.owner_meta])
+
+    def _release(self, key):
+        """Let requests waiting for a key continue, either with its response or to
+        download it themselves"""
+        self.owned.discard(key)
+        for waiting in self.pending.pop(key, []):
+            waiting.callback(None)
@@ -0,0 +1,214 @@
+import logging
+import sqlite3
+import time
+import zlib
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def conditional_cache_path(settings):
+    """Return the conditional GET store path, defaulting to .scrapy/conditional.db"""
+    return settings.get("CITY_SCRAPERS_CONDITIONAL_GET_PATH") or data_path(
+        "conditional.db"
+    )
+
+
+class ValidatorStore:
+    """SQLite store of responses with ETag or Last-Modified validators, keyed by
+    request fingerprint"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    fingerprint TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers BLOB NOT NULL,
+                    body BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, fingerprint):
+        row = self.conn.execute(
+            """
+            SELECT url, status, headers, body, etag, last_modified FROM responses
+            WHERE fingerprint = ?
+            """,
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return
+        url, status, headers, body, etag, last_modified = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": headers_raw_to_dict(headers),
+            "body": zlib.decompress(body),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+
+    def set(self, fingerprint, response, etag, last_modified):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (fingerprint, url, status, headers, body, etag, last_modified,
+                 stored_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    fingerprint,
+                    response.url,
+                    response.status,
+                    headers_dict_to_raw(response.headers),
+                    zlib.compress(response.body),
+                    etag,
+                    last_modified,
+                    time.time(),
+                ),
+            )
+
+    def delete(self, fingerprint):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM responses WHERE fingerprint = ?", (fingerprint,)
+            )
+
+
+class ConditionalGetMiddleware:
+    """
+    Downloader middleware that revalidates pages downloaded in previous runs instead
+    of downloading them again. Responses with an ETag or Last-Modified header are
+    stored on disk, later requests for them are sent with If-None-Match and
+    If-Modified-Since, and a 304 Not Modified response is replaced with the stored
+    response before anything else sees it.
+
+    Only GET requests without their own conditional headers are revalidated,
+    requests with dont_cache in meta are left alone, and responses flagged as
+    "cached" aren't stored. Enabled with CITY_SCRAPERS_CONDITIONAL_GET_ENABLED.
+    """
+
+    def __init__(self, crawler, store):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store = store
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CITY_SCRAPERS_CONDITIONAL_GET_ENABLED"):
+            raise NotConfigured
+        store = ValidatorStore(conditional_cache_path(crawler.settings))
+        mw = cls(crawler, store)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_closed(self, spider):
+        requests = self.stats.get_value("conditional_get/requests", 0, spider=spider)
+        if requests:
+            hits = self.stats.get_value("conditional_get/hits", 0, spider=spider)
+            self.stats.set_value(
+                "conditional_get/hit_rate", round(hits / requests, 3), spider=spider
+            )
+        self.store.close()
+
+    def fingerprint(self, request):
+        return self.crawler.request_fingerprinter.fingerprint(request).hex()
+
+    def is_conditional(self, request):
+        return (
+            request.method == "GET"
+            and not request.meta.get("dont_cache")
+            and b"If-None-Match" not in request.headers
+            and b"If-Modified-Since" not in request.headers
+        )
+
+    def process_request(self, request, spider):
+        cached = request.meta.get("conditional_get_cached")
+        if cached is not None and cached["fingerprint"] != self.fingerprint(request):
+            # Redirected, so the validators are for the page it was redirected from
+            del request.meta["conditional_get_cached"]
+            request.headers.pop("If-None-Match", None)
+            request.headers.pop("If-Modified-Since", None)
+        if not self.is_conditional(request):
+            return
+        fingerprint = self.fingerprint(request)
+        cached = self.store.get(fingerprint)
+        if cached is None:
+            return
+        cached["fingerprint"] = fingerprint
+        if cached["etag"]:
+            request.headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            request.headers["If-Modified-Since"] = cached["last_modified"]
+        request.meta["conditional_get_cached"] = cached
+        self._inc_stats("requests", request, spider)
+
+    def process_response(self, request, response, spider):
+        cached = request.meta.pop("conditional_get_cached", None)
+        if cached is not None and response.status == 304:
+            self._inc_stats("hits", request, spider)
+            self._inc_stats("bytes_saved", request, spider, len(cached["body"]))
+            return self._cached_response(request, response, cached)
+
+        if not self.is_conditional(request) and cached is None:
+            return response
+        # Responses served from a cache (like the detail page cache) weren't
+        # downloaded, so their validators can't be newer than the stored ones
+        if response.status != 200 or "cached" in response.flags:
+            return response
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        fingerprint = self.fingerprint(request)
+        if etag or last_modified:
+            self.store.set(
+                fingerprint,
+                response,
+                etag and etag.decode("latin1"),
+                last_modified and last_modified.decode("latin1"),
+            )
+        elif cached is not None:
+            self.store.delete(fingerprint)
+        return response
+
+    def _cached_response(self, request, response, cached):
+        """Build the response for a 304 from the stored one, updating its headers
+        with the ones sent with the 304 as described in RFC 9111"""
+        headers = Headers(cached["headers"])
+        for name in response.headers:
+            if name.lower() not in (b"content-length", b"content-encoding"):
+                headers.setlist(name, response.headers.getlist(name))
+        respcls = responsetypes.from_args(
+            headers=headers, url=cached["url"], body=cached["body"]
+        )
+        return respcls(
+            url=response.url,
+            status=cached["status"],
+            headers=headers,
+            body=cached["body"],
+            request=request,
+            flags=response.flags + ["revalidated"],
+        )
+
+    def _inc_stats(self, key, request, spider, count=1):
+        host = urlparse(request.url).hostname or ""
+        self.stats.inc_value(f"conditional_get/{key}", count, spider=spider)
+        self.stats.inc_value(f"conditional_get/{key}/{host}", count, spider=spider)
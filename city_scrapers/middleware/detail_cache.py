@@ -0,0 +1,180 @@
+import sqlite3
+import time
+import zlib
+from datetime import date, datetime
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+
+def detail_cache_path(settings):
+    """Return the detail page cache path, defaulting to .scrapy/detail_cache.db"""
+    return settings.get("CITY_SCRAPERS_DETAIL_CACHE_PATH") or data_path(
+        "detail_cache.db"
+    )
+
+
+def meeting_cache_ttl(start, now, factor, max_ttl):
+    """
+    Seconds that the detail page of a meeting can be cached for. Pages for meetings
+    that haven't happened yet are always fetched, and after that the time grows with
+    the meeting's age (a factor of 0.25 caches a page for a week once the meeting is
+    four weeks old) up to max_ttl.
+    """
+    if not isinstance(start, datetime):
+        start = datetime.combine(start, datetime.min.time())
+    if start.tzinfo is not None:
+        now = datetime.now(start.tzinfo)
+    age = (now - start).total_seconds()
+    if age <= 0:
+        return 0
+    return min(age * factor, max_ttl)
+
+
+class DetailPageStore:
+    """SQLite store of detail page responses keyed by request fingerprint"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    fingerprint TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers BLOB NOT NULL,
+                    body BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, fingerprint):
+        row = self.conn.execute(
+            "SELECT url, status, headers, body, stored_at FROM pages "
+            "WHERE fingerprint = ?",
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return
+        url, status, headers, body, stored_at = row
+        return {
+            "url": url,
+            "status": status,
+            "headers": headers_raw_to_dict(headers),
+            "body": zlib.decompress(body),
+            "stored_at": stored_at,
+        }
+
+    def set(self, fingerprint, response):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO pages
+                (fingerprint, url, status, headers, body, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    fingerprint,
+                    response.url,
+                    response.status,
+                    headers_dict_to_raw(response.headers),
+                    zlib.compress(response.body),
+                    time.time(),
+                ),
+            )
+
+    def prune(self, max_age):
+        """Remove pages stored more than max_age seconds ago"""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM pages WHERE stored_at < ?", (time.time() - max_age,)
+            )
+
+
+class DetailPageCacheMiddleware:
+    """
+    Downloader middleware that caches meeting detail pages for longer the further in
+    the past the meeting is. Spiders opt in by setting "meeting_start" in a detail
+    request's meta to the meeting's start date or datetime. Pages for upcoming
+    meetings are always downloaded, while a page for a past meeting is served from
+    the cache (straight to the callback) while it's younger than the meeting's age
+    multiplied by CITY_SCRAPERS_DETAIL_CACHE_TTL_FACTOR, up to
+    CITY_SCRAPERS_DETAIL_CACHE_MAX_TTL days.
+
+    Requests with dont_cache in meta are left alone. Enabled with
+    CITY_SCRAPERS_DETAIL_CACHE_ENABLED.
+    """
+
+    def __init__(self, crawler, store):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store = store
+        self.factor = settings.getfloat("CITY_SCRAPERS_DETAIL_CACHE_TTL_FACTOR")
+        self.max_ttl = settings.getfloat("CITY_SCRAPERS_DETAIL_CACHE_MAX_TTL") * 86400
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CITY_SCRAPERS_DETAIL_CACHE_ENABLED"):
+            raise NotConfigured
+        mw = cls(crawler, DetailPageStore(detail_cache_path(crawler.settings)))
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_closed(self, spider):
+        try:
+            self.store.prune(self.max_ttl)
+        finally:
+            self.store.close()
+
+    def fingerprint(self, request):
+        return self.crawler.request_fingerprinter.fingerprint(request).hex()
+
+    def is_cacheable(self, request):
+        start = request.meta.get("meeting_start")
+        return isinstance(start, date) and not request.meta.get("dont_cache")
+
+    def process_request(self, request, spider):
+        if not self.is_cacheable(request):
+            return
+        ttl = meeting_cache_ttl(
+            request.meta["meeting_start"], datetime.now(), self.factor, self.max_ttl
+        )
+        if ttl <= 0:
+            return
+        cached = self.store.get(self.fingerprint(request))
+        if cached is None or time.time() - cached["stored_at"] >= ttl:
+            self.stats.inc_value("detail_cache/misses", spider=spider)
+            return
+        self.stats.inc_value("detail_cache/hits", spider=spider)
+        headers = Headers(cached["headers"])
+        respcls = responsetypes.from_args(
+            headers=headers, url=cached["url"], body=cached["body"]
+        )
+        return respcls(
+            url=cached["url"],
+            status=cached["status"],
+            headers=headers,
+            body=cached["body"],
+            request=request,
+            flags=["cached"],
+        )
+
+    def process_response(self, request, response, spider):
+        if (
+            self.is_cacheable(request)
+            and response.status == 200
+            and "cached" not in response.flags
+        ):
+            self.store.set(self.fingerprint(request), response)
+            self.stats.inc_value("detail_cache/stored", spider=spider)
+        return response
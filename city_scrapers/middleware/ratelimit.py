@@ -0,0 +1,121 @@
+import logging
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+from scrapy.exceptions import NotConfigured
+from twisted.internet.task import deferLater
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """
+    Token buckets for each host, implemented with the generic cell rate algorithm:
+    each host has a theoretical arrival time (TAT) for its next request, and a request
+    can go out once it's within the burst tolerance of that time.
+    """
+
+    def __init__(self):
+        self.tats = {}
+
+    def reserve(self, host, rate, burst, now=None):
+        """Reserve a slot for a request to a host, returning seconds to wait for it"""
+        now = time.time() if now is None else now
+        tat, delay = self._schedule(self.tats.get(host), rate, burst, now)
+        self.tats[host] = tat
+        return delay
+
+    def _schedule(self, tat, rate, burst, now):
+        interval = 1.0 / rate
+        tat = now if tat is None else max(tat, now)
+        allowed_at = max(now, tat - (burst - 1) * interval)
+        return tat + interval, allowed_at - now
+
+
+class SharedHostRateLimiter(HostRateLimiter):
+    """Host rate limiter with state kept in a SQLite file so that it's shared by all of
+    the processes using the same file"""
+
+    def __init__(self, path):
+        super().__init__()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS host_rate (host TEXT PRIMARY KEY, tat REAL)"
+        )
+
+    def reserve(self, host, rate, burst, now=None):
+        now = time.time() if now is None else now
+        # Rolls back the transaction if the reservation fails partway
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute(
+                "SELECT tat FROM host_rate WHERE host = ?", (host,)
+            ).fetchone()
+            tat, delay = self._schedule(row and row[0], rate, burst, now)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO host_rate (host, tat) VALUES (?, ?)",
+                (host, tat),
+            )
+        return delay
+
+
+# Limiters shared by every crawler in the process, keyed by state file path
+_limiters = {}
+
+
+def get_limiter(path=None):
+    if path not in _limiters:
+        _limiters[path] = SharedHostRateLimiter(path) if path else HostRateLimiter()
+    return _limiters[path]
+
+
+class HostRateLimitMiddleware:
+    """
+    Downloader middleware that limits the combined rate of requests to each host
+    across every spider in a process, or across processes if
+    CITY_SCRAPERS_HOST_RATE_FILE is set. AutoThrottle only sees a single spider's
+    requests, so this keeps shared hosts like www.chicago.gov polite when spiders run
+    concurrently while requests to other hosts continue without waiting.
+    """
+
+    def __init__(self, crawler, limiter):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.limiter = limiter
+        self.rate = settings.getfloat("CITY_SCRAPERS_HOST_RATE_LIMIT")
+        self.burst = max(settings.getint("CITY_SCRAPERS_HOST_RATE_BURST", 1), 1)
+        self.host_rates = settings.getdict("CITY_SCRAPERS_HOST_RATE_LIMITS")
+        self.domains = settings.getlist("CITY_SCRAPERS_HOST_RATE_DOMAINS")
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if crawler.settings.getfloat("CITY_SCRAPERS_HOST_RATE_LIMIT") <= 0:
+            raise NotConfigured
+        limiter = get_limiter(crawler.settings.get("CITY_SCRAPERS_HOST_RATE_FILE"))
+        return cls(crawler, limiter)
+
+    def get_host(self, request):
+        """Return the host a request counts against, grouping subdomains of any of the
+        domains in CITY_SCRAPERS_HOST_RATE_DOMAINS (like legistar.com) together"""
+        host = (urlparse(request.url).hostname or "").lower()
+        for domain in self.domains:
+            if host == domain or host.endswith("." + domain):
+                return domain
+        return host
+
+    def process_request(self, request, spider):
+        host = self.get_host(request)
+        rate = float(self.host_rates.get(host, self.rate))
+        if rate <= 0:
+            return
+        delay = self.limiter.reserve(host, rate, self.burst)
+        if delay <= 0:
+            return
+        stats = self.crawler.stats
+        stats.inc_value("host_rate/delayed_count", spider=spider)
+        stats.inc_value("host_rate/delay_seconds", delay, spider=spider)
+        logger.debug("Delaying %s by %.2fs for %s", request, delay, host)
+        from twisted.internet import reactor
+
+        return deferLater(reactor, delay, lambda: None)
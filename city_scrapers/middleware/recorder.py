@@ -0,0 +1,36 @@
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from city_scrapers.crawl_archive import CrawlArchive
+
+
+class CrawlRecorderMiddleware:
+    """
+    Downloader middleware that records every response a crawl downloads to the crawl
+    archive in CITY_SCRAPERS_RECORD_PATH, so that the crawl can be replayed offline
+    with ReplayDownloadHandler. It needs to be the downloader middleware closest to
+    the downloader so that responses are recorded as they came over the network,
+    before redirects, retries and decompression are handled.
+    """
+
+    def __init__(self, crawler, archive):
+        self.crawler = crawler
+        self.archive = archive
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get("CITY_SCRAPERS_RECORD_PATH")
+        if not path:
+            raise NotConfigured
+        mw = cls(crawler, CrawlArchive(path))
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_closed(self, spider):
+        self.archive.close()
+
+    def process_response(self, request, response, spider):
+        if "replayed" not in response.flags:
+            self.archive.add(request, response)
+            self.crawler.stats.inc_value("record/responses", spider=spider)
+        return response
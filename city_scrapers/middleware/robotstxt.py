@@ -0,0 +1,168 @@
+import logging
+import sqlite3
+import time
+
+from scrapy import signals
+from scrapy.downloadermiddlewares.robotstxt import RobotsTxtMiddleware
+from scrapy.http import Request
+from scrapy.http.request import NO_CALLBACK
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.project import data_path
+
+logger = logging.getLogger(__name__)
+
+
+def robotstxt_cache_path(settings):
+    """Return the robots.txt cache path, defaulting to .scrapy/robotstxt.db"""
+    return settings.get("CITY_SCRAPERS_ROBOTSTXT_CACHE_PATH") or data_path(
+        "robotstxt.db"
+    )
+
+
+class RobotsTxtStore:
+    """SQLite store of robots.txt files keyed by host, shared by every process using
+    the same file"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS robots (
+                    netloc TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    refresh_started REAL
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, netloc):
+        row = self.conn.execute(
+            "SELECT body, fetched_at FROM robots WHERE netloc = ?", (netloc,)
+        ).fetchone()
+        if row is None:
+            return
+        return {"body": row[0], "fetched_at": row[1]}
+
+    def set(self, netloc, body):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO robots
+                (netloc, body, fetched_at, refresh_started)
+                VALUES (?, ?, ?, NULL)
+                """,
+                (netloc, body, time.time()),
+            )
+
+    def claim_refresh(self, netloc, timeout):
+        """Mark a host's robots.txt as being refreshed, returning False if another
+        spider started refreshing it less than timeout seconds ago"""
+        now = time.time()
+        with self.conn:
+            cursor = self.conn.execute(
+                """
+                UPDATE robots SET refresh_started = ?
+                WHERE netloc = ? AND (refresh_started IS NULL OR refresh_started < ?)
+                """,
+                (now, netloc, now - timeout),
+            )
+        return cursor.rowcount == 1
+
+
+class CachedRobotsTxtMiddleware(RobotsTxtMiddleware):
+    """
+    RobotsTxtMiddleware that keeps robots.txt files on disk so that spiders don't
+    wait on a robots.txt request before their first request to a host, which adds up
+    when several spiders crawl the same host (like www.chicago.gov). A robots.txt
+    file fetched less than CITY_SCRAPERS_ROBOTSTXT_CACHE_TTL days ago is used as is.
+    An older one is still used, but it's fetched again in the background so the next
+    spider gets the new one. After CITY_SCRAPERS_ROBOTSTXT_CACHE_MAX_STALE days it's
+    fetched before any requests like it would be without the cache.
+
+    The cache is shared by all of the spiders using the same file, and only one of
+    them refreshes a host's robots.txt at a time. Responses with server errors
+    aren't cached. Enabled with CITY_SCRAPERS_ROBOTSTXT_CACHE_ENABLED.
+    """
+
+    def __init__(self, crawler, store=None):
+        super().__init__(crawler)
+        settings = crawler.settings
+        self.store = store
+        self.ttl = settings.getfloat("CITY_SCRAPERS_ROBOTSTXT_CACHE_TTL") * 86400
+        self.max_stale = (
+            settings.getfloat("CITY_SCRAPERS_ROBOTSTXT_CACHE_MAX_STALE") * 86400
+        )
+        self.refresh_timeout = settings.getfloat("DOWNLOAD_TIMEOUT", 180)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CITY_SCRAPERS_ROBOTSTXT_CACHE_ENABLED"):
+            return cls(crawler)
+        mw = cls(crawler, RobotsTxtStore(robotstxt_cache_path(crawler.settings)))
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_closed(self, spider):
+        self.store.close()
+
+    def robot_parser(self, request, spider):
+        netloc = urlparse_cached(request).netloc
+        if self.store is not None and netloc not in self._parsers:
+            self._load_cached(request, netloc, spider)
+        return super().robot_parser(request, spider)
+
+    def _load_cached(self, request, netloc, spider):
+        cached = self.store.get(netloc)
+        if cached is None:
+            return
+        age = time.time() - cached["fetched_at"]
+        if age >= self.max_stale:
+            return
+        self.crawler.stats.inc_value("robotstxt/cache_hits")
+        self._parsers[netloc] = self._parserimpl.from_crawler(
+            self.crawler, cached["body"]
+        )
+        if age >= self.ttl and self.store.claim_refresh(netloc, self.refresh_timeout):
+            self._refresh(request, netloc, spider)
+
+    def _refresh(self, request, netloc, spider):
+        """Fetch a host's robots.txt again without waiting for it"""
+        url = urlparse_cached(request)
+        robotsreq = Request(
+            f"{url.scheme}://{netloc}/robots.txt",
+            priority=self.DOWNLOAD_PRIORITY,
+            meta={"dont_obey_robotstxt": True},
+            callback=NO_CALLBACK,
+        )
+        self.crawler.stats.inc_value("robotstxt/refresh_count")
+        dfd = self.crawler.engine.download(robotsreq)
+        dfd.addCallback(self._refreshed, netloc)
+        dfd.addErrback(self._refresh_error, robotsreq, spider)
+
+    def _refreshed(self, response, netloc):
+        self.crawler.stats.inc_value("robotstxt/response_count")
+        if response.status >= 500:
+            return
+        self.store.set(netloc, response.body)
+        self._parsers[netloc] = self._parserimpl.from_crawler(
+            self.crawler, response.body
+        )
+
+    def _refresh_error(self, failure, request, spider):
+        # The cached robots.txt is still used, so this isn't an error
+        logger.warning(
+            "Error refreshing %(request)s: %(error)s",
+            {"request": request, "error": failure.value},
+            extra={"spider": spider},
+        )
+
+    def _parse_robots(self, response, netloc, spider):
+        super()._parse_robots(response, netloc, spider)
+        # Server errors aren't cached so that they're retried by the next spider
+        if self.store is not None and response.status < 500:
+            self.store.set(netloc, response.body)
@@ -0,0 +1,147 @@
+import sqlite3
+import time
+import zlib
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+from .coalesce import RequestCoalescingMiddleware
+
+# Responses and pending downloads of each run, shared by the crawlers in a process
+RUN_CACHES = {}
+
+
+def shared_cache_path(settings):
+    """Return the shared response store path, defaulting to .scrapy/shared_cache.db"""
+    return settings.get("CITY_SCRAPERS_SHARED_CACHE_PATH") or data_path(
+        "shared_cache.db"
+    )
+
+
+class SharedResponseStore:
+    """SQLite store of the responses downloaded during a run, shared by the
+    processes in it"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    run TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers BLOB NOT NULL,
+                    body BLOB NOT NULL,
+                    stored_at REAL NOT NULL,
+                    PRIMARY KEY (run, fingerprint)
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, run, fingerprint):
+        row = self.conn.execute(
+            "SELECT url, status, headers, body FROM responses "
+            "WHERE run = ? AND fingerprint = ?",
+            (run, fingerprint),
+        ).fetchone()
+        if row is None:
+            return
+        url, status, headers, body = row
+        headers = Headers(headers_raw_to_dict(headers))
+        body = zlib.decompress(body)
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, status=status, headers=headers, body=body)
+
+    def set(self, run, fingerprint, response):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (run, fingerprint, url, status, headers, body, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    run,
+                    fingerprint,
+                    response.url,
+                    response.status,
+                    headers_dict_to_raw(response.headers),
+                    zlib.compress(response.body),
+                    time.time(),
+                ),
+            )
+
+    def prune(self, run):
+        """Remove the responses of every other run"""
+        with self.conn:
+            self.conn.execute("DELETE FROM responses WHERE run != ?", (run,))
+
+
+class SharedResponseCacheMiddleware(RequestCoalescingMiddleware):
+    """
+    Downloader middleware that downloads GET requests with "shared_cache" in their
+    meta once per crawlall run, for pages that several spiders request (like the
+    Rogers Park Business Alliance calendar). Successful responses are kept in memory
+    for the spiders in the same process and on disk for the run's other lanes,
+    and a request for a page that another spider in the process is downloading
+    waits for it. Responses are keyed by request fingerprint and scoped to
+    CITY_SCRAPERS_SHARED_CACHE_RUN, which crawlall sets for each run. Enabled with
+    CITY_SCRAPERS_SHARED_CACHE_ENABLED.
+    """
+
+    owner_meta = "shared_cache_owner"
+    stats_prefix = "shared_cache"
+    flag = "shared"
+
+    def __init__(self, crawler, store, run):
+        super().__init__(crawler)
+        self.store = store
+        self.run = run
+        cache = RUN_CACHES.setdefault(run, {"responses": {}, "pending": {}})
+        self.responses = cache["responses"]
+        self.pending = cache["pending"]
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        run = settings.get("CITY_SCRAPERS_SHARED_CACHE_RUN")
+        if not settings.getbool("CITY_SCRAPERS_SHARED_CACHE_ENABLED") or not run:
+            raise NotConfigured
+        mw = cls(crawler, SharedResponseStore(shared_cache_path(settings)), run)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_closed(self, spider):
+        # Other spiders might be waiting for downloads that were cut short
+        for key in list(self.owned):
+            self._release(key)
+        self.store.close()
+
+    def get_key(self, request):
+        if not request.meta.get("shared_cache") or request.method != "GET":
+            return
+        return self.crawler.request_fingerprinter.fingerprint(request).hex()
+
+    def get_response(self, key):
+        response = self.responses.get(key)
+        if response is None:
+            response = self.store.get(self.run, key)
+            if response is not None:
+                self.responses[key] = response
+        return response
+
+    def set_response(self, key, response):
+        # Failed pages are requested again by the spiders waiting for them
+        if response.status != 200:
+            return
+        self.responses[key] = response
+        self.store.set(self.run, key, response)
@@ -0,0 +1,273 @@
+import copy
+import hashlib
+import inspect
+import logging
+import pickle
+import re
+import sqlite3
+import time
+
+from city_scrapers_core.constants import CANCELLED
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import TextResponse
+from scrapy.utils.project import data_path
+
+logger = logging.getLogger(__name__)
+
+# Parts of a page that can change without the content changing
+VOLATILE_RE = re.compile(r"<script\b.*?</script>|<!--.*?-->", flags=re.S | re.I)
+WHITESPACE_BETWEEN_TAGS_RE = re.compile(r">\s+<")
+
+
+def unchanged_store_path(settings):
+    """Return the unchanged page store path, defaulting to .scrapy/unchanged.db"""
+    return settings.get("CITY_SCRAPERS_UNCHANGED_PATH") or data_path("unchanged.db")
+
+
+def content_fingerprint(response):
+    """Fingerprint of a response's content, ignoring scripts, comments and
+    whitespace in text responses"""
+    body = response.body
+    if isinstance(response, TextResponse):
+        text = WHITESPACE_BETWEEN_TAGS_RE.sub("><", VOLATILE_RE.sub("", response.text))
+        body = " ".join(text.split()).encode()
+    return hashlib.sha256(response.url.encode() + b"\n" + body).hexdigest()
+
+
+def code_version(spider_cls):
+    """Fingerprint of the source of a spider class and the project classes (like
+    mixins and CityScrapersSpider) it inherits from"""
+    sha = hashlib.sha256()
+    for cls in spider_cls.__mro__:
+        if cls.__module__.split(".")[0] not in ("city_scrapers", "city_scrapers_core"):
+            continue
+        try:
+            sha.update(inspect.getsource(cls).encode())
+        except (OSError, TypeError):
+            pass
+    return sha.hexdigest()
+
+
+class UnchangedPageStore:
+    """SQLite store of the items scraped starting from each start page, along with
+    the page's content fingerprint and the spider's code version"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    key TEXT PRIMARY KEY,
+                    spider TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    content_fingerprint TEXT NOT NULL,
+                    code_version TEXT NOT NULL,
+                    items BLOB NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, key):
+        row = self.conn.execute(
+            """
+            SELECT content_fingerprint, code_version, items, stored_at FROM pages
+            WHERE key = ?
+            """,
+            (key,),
+        ).fetchone()
+        if row is None:
+            return
+        return {
+            "content_fingerprint": row[0],
+            "code_version": row[1],
+            "items": pickle.loads(row[2]),
+            "stored_at": row[3],
+        }
+
+    def set(self, key, spider_name, url, fingerprint, version, items):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO pages
+                (key, spider, url, content_fingerprint, code_version, items, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    key,
+                    spider_name,
+                    url,
+                    fingerprint,
+                    version,
+                    pickle.dumps(items),
+                    time.time(),
+                ),
+            )
+
+
+class UnchangedPageMiddleware:
+    """
+    Spider middleware that skips parsing start pages that haven't changed since the
+    last run. Each start page's content fingerprint is stored with every item scraped
+    from it and from the requests that followed from it. If a start page's content
+    and the spider's code are the same in a later run, the stored items are scraped
+    again with their status recomputed, and neither the callback nor the requests
+    it would have made are run.
+
+    Items are only stored when every request that followed from a start page got a
+    response (or was dropped by the scheduler, like duplicates) and the spider
+    finished, so a partial crawl is never replayed. Start pages whose requests never
+    finished, for example because a spider middleware filtered them, are logged.
+    Stored items older than CITY_SCRAPERS_UNCHANGED_MAX_AGE days are parsed again so
+    that changes to pages other than the start page are picked up eventually. Start
+    pages requested together with FanInMixin are always parsed, since their callback
+    needs every response. This needs to be the spider middleware closest to the
+    spider so that it sees the callback's output before it runs.
+    """
+
+    def __init__(self, crawler, store):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store = store
+        self.max_age = (
+            crawler.settings.getfloat("CITY_SCRAPERS_UNCHANGED_MAX_AGE") * 86400
+        )
+        self.roots = {}
+        self.version = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CITY_SCRAPERS_UNCHANGED_ENABLED"):
+            raise NotConfigured
+        mw = cls(crawler, UnchangedPageStore(unchanged_store_path(crawler.settings)))
+        crawler.signals.connect(mw.request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def process_spider_output(self, response, result, spider):
+        key, replay = self._start_output(response, spider)
+        if replay:
+            return self._replay(key, spider)
+        return self._record(key, result)
+
+    async def process_spider_output_async(self, response, result, spider):
+        """Same as process_spider_output for async callbacks, which aren't run when
+        their start page is replayed"""
+        key, replay = self._start_output(response, spider)
+        if replay:
+            for item in self._replay(key, spider):
+                yield item
+            return
+        async for output in result:
+            yield self._record_output(key, output)
+
+    def process_spider_exception(self, response, exception, spider):
+        key = response.request.meta.get("unchanged_root")
+        key = (
+            key
+            or self.crawler.request_fingerprinter.fingerprint(response.request).hex()
+        )
+        if key in self.roots:
+            self.roots[key]["failed"] = True
+
+    def request_dropped(self, request, spider):
+        key = request.meta.get("unchanged_root")
+        if key in self.roots:
+            self.roots[key]["pending"] -= 1
+
+    def spider_closed(self, spider, reason):
+        try:
+            if reason != "finished":
+                return
+            for key, root in self.roots.items():
+                if root["replayed"] or root["joined"] or root["failed"]:
+                    continue
+                if root["pending"] > 0:
+                    # Requests filtered by a spider middleware (like DepthMiddleware)
+                    # never reach the spider or the scheduler
+                    logger.warning(
+                        "Not storing items from %s since %d of its requests never "
+                        "finished",
+                        root["url"],
+                        root["pending"],
+                        extra={"spider": spider},
+                    )
+                    continue
+                self.store.set(
+                    key,
+                    spider.name,
+                    root["url"],
+                    root["fingerprint"],
+                    self.version,
+                    root["items"],
+                )
+        finally:
+            self.store.close()
+
+    def _replay_root(self, key, response, spider):
+        """Start tracking a start page, returning whether its items can be
+        replayed"""
+        if self.version is None:
+            self.version = code_version(self.crawler.spidercls)
+        fingerprint = content_fingerprint(response)
+        joined = "fan_in" in response.request.meta
+        stored = None if joined else self.store.get(key)
+        replay = (
+            stored is not None
+            and stored["content_fingerprint"] == fingerprint
+            and stored["code_version"] == self.version
+            and time.time() - stored["stored_at"] < self.max_age
+        )
+        self.roots[key] = {
+            "url": response.url,
+            "fingerprint": fingerprint,
+            "items": stored["items"] if replay else [],
+            "pending": 0,
+            "failed": False,
+            "replayed": replay,
+            "joined": joined,
+        }
+        if not replay:
+            self.stats.inc_value("unchanged/parsed_pages", spider=spider)
+        return replay
+
+    def _replay(self, key, spider):
+        items = self.roots[key]["items"]
+        self.stats.inc_value("unchanged/replayed_pages", spider=spider)
+        self.stats.inc_value("unchanged/replayed_items", len(items), spider=spider)
+        for item in items:
+            if hasattr(spider, "_get_status") and item.get("status") != CANCELLED:
+                # Cancellations come from the page's text, which hasn't changed, but
+                # other statuses depend on the time
+                item["status"] = spider._get_status(item)
+            yield item
+
+    def _start_output(self, response, spider):
+        """Return the key of the start page a response followed from, and whether
+        the start page's stored items are replayed instead of the callback's
+        output"""
+        key = response.request.meta.get("unchanged_root")
+        if key is None:
+            key = self.crawler.request_fingerprinter.fingerprint(response.request).hex()
+            return key, self._replay_root(key, response, spider)
+        self.roots[key]["pending"] -= 1
+        return key, False
+
+    def _record(self, key, result):
+        for output in result:
+            yield self._record_output(key, output)
+
+    def _record_output(self, key, output):
+        root = self.roots[key]
+        if isinstance(output, Request):
+            output.meta["unchanged_root"] = key
+            root["pending"] += 1
+        else:
+            # Copied since item pipelines can change items
+            root["items"].append(copy.deepcopy(output))
+        return output
@@ -1,2 +1,5 @@
 from .chi_mayors_advisory_councils import ChiMayorsAdvisoryCouncilsMixin  # noqa
 from .chi_rogers_park_ssa import ChiRogersParkSsaMixin  # noqa
+from .fan_in import FanInMixin  # noqa
+from .legistar import IncrementalLegistarMixin  # noqa
+from .link_probe import LinkProbeMixin  # noqa
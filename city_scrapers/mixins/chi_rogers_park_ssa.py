@@ -17,6 +17,8 @@ class ChiRogersParkSsaMixin:
             yield response.follow(
                 "https://business.rpba.org/events/calendar/{}-01/".format(month_str),
                 callback=self._parse_calendar,
+                # Shared with the other Rogers Park SSAs in the same run
+                meta={"shared_cache": True},
             )
 
     def _parse_links(self, response):
@@ -48,7 +50,11 @@ class ChiRogersParkSsaMixin:
         for item in response.css(".mn-cal-event a"):
             item_text = " ".join(item.css("*::text").extract())
             if ssa_num in item_text:
-                yield response.follow(item.attrib["href"], callback=self._parse_detail)
+                yield response.follow(
+                    item.attrib["href"],
+                    callback=self._parse_detail,
+                    meta={"shared_cache": True},
+                )
 
     def _parse_detail(self, response):
         start = self._parse_start(response)
@@ -0,0 +1,126 @@
+import logging
+from uuid import uuid4
+
+from scrapy import signals
+
+logger = logging.getLogger(__name__)
+
+
+class FanInMixin:
+    """
+    Mixin for spiders that combine several pages before scraping meetings. The
+    requests returned by fan_in are scheduled at once, and the merge callback is
+    called with all of their responses when the last one finishes, so the slowest
+    page sets how long it takes instead of the sum of all of them.
+
+    Requests dropped by the scheduler count as failed, and joins that still haven't
+    finished when the spider closes (because a spider middleware like
+    DepthMiddleware filtered one of their requests) are logged as errors.
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._fan_in_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(spider._fan_in_closed, signal=signals.spider_closed)
+        return spider
+
+    def fan_in(self, requests, callback, cb_kwargs=None, allow_failures=False):
+        """
+        Return copies of requests to yield that call callback with their responses,
+        in the same order as the requests and followed by cb_kwargs, once they've
+        all finished. Responses of requests that failed are passed as None if
+        allow_failures is set, otherwise callback isn't called if any failed. The
+        requests aren't filtered as duplicates, since callback waits for each of
+        them. If there aren't any requests, callback's output is returned instead.
+        """
+        requests = list(requests)
+        cb_kwargs = cb_kwargs or {}
+        if not requests:
+            return callback(**cb_kwargs) or []
+        if getattr(self, "_fan_ins", None) is None:
+            self._fan_ins = {}
+        # Random keys so that requests resumed from a JOBDIR never match a new join
+        key = uuid4().hex
+        self._fan_ins[key] = {
+            "callback": callback,
+            "cb_kwargs": cb_kwargs,
+            "allow_failures": allow_failures,
+            "responses": [None] * len(requests),
+            "failed": 0,
+            "pending": len(requests),
+        }
+        return [
+            request.replace(
+                callback=self._fan_in_response,
+                errback=self._fan_in_error,
+                dont_filter=True,
+                meta={**request.meta, "fan_in": (key, index)},
+            )
+            for index, request in enumerate(requests)
+        ]
+
+    def _fan_in_response(self, response):
+        return self._fan_in_finished(response.meta["fan_in"], response)
+
+    def _fan_in_error(self, failure):
+        request = failure.request
+        logger.error(
+            "Error downloading %s: %s", request, failure.value, extra={"spider": self}
+        )
+        return self._fan_in_finished(request.meta["fan_in"], None)
+
+    def _fan_in_dropped(self, request, spider):
+        if spider is not self or "fan_in" not in request.meta:
+            return
+        logger.error("Request %s was dropped", request, extra={"spider": self})
+        join = self._fan_in_count(request.meta["fan_in"], None)
+        if join is not None:
+            # Its callback's output has nowhere to go from a signal handler
+            self._fan_in_skip(join, "the last of its requests was dropped")
+
+    def _fan_in_closed(self, spider):
+        for join in (getattr(self, "_fan_ins", None) or {}).values():
+            self._fan_in_skip(
+                join,
+                f"{join['pending']} of {len(join['responses'])} requests never "
+                "finished",
+            )
+
+    def _fan_in_finished(self, fan_in_meta, response):
+        join = self._fan_in_count(fan_in_meta, response)
+        if join is None:
+            return []
+        if join["failed"] and not join["allow_failures"]:
+            self._fan_in_skip(
+                join,
+                f"{join['failed']} of {len(join['responses'])} requests failed",
+            )
+            return []
+        return join["callback"](*join["responses"], **join["cb_kwargs"]) or []
+
+    def _fan_in_count(self, fan_in_meta, response):
+        """Record the response of a join's request, returning the join if it was
+        the last one"""
+        key, index = fan_in_meta
+        join = (getattr(self, "_fan_ins", None) or {}).get(key)
+        if join is None:
+            # Requests resumed from a JOBDIR belong to a join from the earlier run,
+            # which the start requests have already started again
+            logger.debug("Dropping response of unknown join %s", key)
+            return
+        join["responses"][index] = response
+        join["failed"] += response is None
+        join["pending"] -= 1
+        if join["pending"] > 0:
+            return
+        del self._fan_ins[key]
+        return join
+
+    def _fan_in_skip(self, join, reason):
+        logger.error(
+            "Skipping %s since %s",
+            join["callback"].__name__,
+            reason,
+            extra={"spider": self},
+        )
@@ -0,0 +1,30 @@
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import DeferredList
+
+from city_scrapers.links import LinkProber, link_exists
+
+
+class LinkProbeMixin:
+    """
+    Mixin for spiders that only include links to documents once they exist, like
+    agendas and minutes posted at predictable URLs. Every link is checked at once
+    through Scrapy's downloader, so the spider's callback needs to be a coroutine
+    that awaits probe_links before yielding its meetings.
+    """
+
+    async def probe_links(self, links):
+        """Return the links whose href exists, checking each URL once"""
+        prober = self._get_link_prober()
+        hrefs = list(dict.fromkeys(link["href"] for link in links))
+        results = await maybe_deferred_to_future(
+            DeferredList([prober.check(href) for href in hrefs])
+        )
+        existing = {
+            href for href, (_, status) in zip(hrefs, results) if link_exists(status)
+        }
+        return [link for link in links if link["href"] in existing]
+
+    def _get_link_prober(self):
+        if getattr(self, "_link_prober", None) is None:
+            self._link_prober = LinkProber.from_crawler(self.crawler)
+        return self._link_prober
@@ -0,0 +1 @@
+from .link_health import LinkHealthPipeline  # noqa
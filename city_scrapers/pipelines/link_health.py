@@ -0,0 +1,122 @@
+import logging
+from urllib.parse import urlparse
+
+from itemadapter import ItemAdapter
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet.defer import DeferredList, DeferredSemaphore
+
+from ..links import LinkProber, LinkStore, link_missing, link_store_path
+
+logger = logging.getLogger(__name__)
+
+# Link answers, pending checks and per-host limits shared by the pipelines of every
+# spider in a process
+SHARED_CHECKS = {"statuses": {}, "pending": {}, "host_semaphores": {}}
+
+
+class LinkHealthPipeline:
+    """
+    Item pipeline that checks every link in each meeting's links. Each unique URL is
+    checked once across all of the spiders running in a process (and once across
+    runs until it's older than CITY_SCRAPERS_LINK_HEALTH_TTL days), with at most
+    CITY_SCRAPERS_LINK_HEALTH_HOST_CONCURRENCY checks of a host at a time. Links are
+    annotated with the status they returned (None if they couldn't be reached), or
+    links that don't exist (404 or 410) are dropped when
+    CITY_SCRAPERS_LINK_HEALTH_ACTION is "drop". Links that couldn't be reached or
+    returned a server error are kept, and checked again next time. The number of
+    links checked, dead and unreachable is added to the spider's stats. Enabled with
+    CITY_SCRAPERS_LINK_HEALTH_ENABLED.
+    """
+
+    def __init__(self, crawler, prober, host_semaphores=None):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.prober = prober
+        self.drop = settings.get("CITY_SCRAPERS_LINK_HEALTH_ACTION") == "drop"
+        self.host_concurrency = settings.getint(
+            "CITY_SCRAPERS_LINK_HEALTH_HOST_CONCURRENCY"
+        )
+        self.host_semaphores = {} if host_semaphores is None else host_semaphores
+        # Statuses of the URLs this spider's links were checked at, for its stats
+        self.checked = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("CITY_SCRAPERS_LINK_HEALTH_ENABLED"):
+            raise NotConfigured
+        prober = LinkProber.from_crawler(
+            crawler,
+            store=LinkStore(link_store_path(settings)),
+            ttl=settings.getfloat("CITY_SCRAPERS_LINK_HEALTH_TTL") * 86400,
+            statuses=SHARED_CHECKS["statuses"],
+            pending=SHARED_CHECKS["pending"],
+        )
+        pipeline = cls(crawler, prober, SHARED_CHECKS["host_semaphores"])
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def spider_closed(self, spider):
+        dead = sorted(
+            url for url, status in self.checked.items() if link_missing(status)
+        )
+        if dead:
+            logger.info(
+                "Found %d dead links: %s",
+                len(dead),
+                ", ".join(dead),
+                extra={"spider": spider},
+            )
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        links = [
+            link
+            for link in adapter.get("links") or []
+            if urlparse(link.get("href") or "").scheme in ("http", "https")
+        ]
+        if not links:
+            return item
+        hrefs = list(dict.fromkeys(link["href"] for link in links))
+        d = DeferredList([self._check(href) for href in hrefs])
+        d.addCallback(self._annotate, adapter, hrefs)
+        d.addCallback(lambda _: item)
+        return d
+
+    def _check(self, url):
+        host = urlparse(url).netloc
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = DeferredSemaphore(self.host_concurrency)
+        d = self.host_semaphores[host].run(self.prober.check, url)
+        d.addCallback(self._checked, url)
+        return d
+
+    def _checked(self, status, url):
+        if url not in self.checked:
+            self.checked[url] = status
+            self.stats.inc_value("link_health/checked")
+            if link_missing(status):
+                self.stats.inc_value("link_health/dead")
+            elif status is None:
+                self.stats.inc_value("link_health/unreachable")
+            else:
+                self.stats.inc_value("link_health/ok")
+        return status
+
+    def _annotate(self, results, adapter, hrefs):
+        statuses = {href: status for href, (_, status) in zip(hrefs, results)}
+        links = []
+        for link in adapter["links"]:
+            if link.get("href") not in statuses:
+                links.append(link)
+                continue
+            status = statuses[link["href"]]
+            if link_missing(status):
+                self.stats.inc_value("link_health/dead_links")
+                if self.drop:
+                    self.stats.inc_value("link_health/dropped")
+                    continue
+            links.append({**link, "status": status})
+        adapter["links"] = links
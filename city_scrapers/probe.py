@@ -0,0 +1,255 @@
+import sqlite3
+import time
+from datetime import datetime
+
+from scrapy import Request, Spider
+from scrapy.utils.project import data_path
+
+from city_scrapers.crawl_archive import RECORD_SETTINGS
+from city_scrapers.middleware.unchanged import content_fingerprint
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+UNREACHABLE = "unreachable"
+
+
+def probe_store_path(settings):
+    """Return the probe store path, defaulting to .scrapy/probe.db"""
+    return settings.get("CITY_SCRAPERS_PROBE_PATH") or data_path("probe.db")
+
+
+class ProbeStore:
+    """
+    SQLite store of the latest probe of each spider's start pages, and of the probe
+    from before the spider's last successful crawl that later probes are compared to
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS probes (
+                    spider TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fingerprint TEXT,
+                    probed_at REAL NOT NULL,
+                    PRIMARY KEY (spider, url)
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawled (
+                    spider TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fingerprint TEXT NOT NULL,
+                    code_version TEXT NOT NULL,
+                    crawled_at REAL NOT NULL,
+                    PRIMARY KEY (spider, url)
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def baseline(self, spider_name, url):
+        """Return the validators and fingerprint of a start page when its spider was
+        last crawled"""
+        row = self.conn.execute(
+            """
+            SELECT etag, last_modified, fingerprint FROM crawled
+            WHERE spider = ? AND url = ?
+            """,
+            (spider_name, url),
+        ).fetchone()
+        if row is None:
+            return
+        return {"etag": row[0], "last_modified": row[1], "fingerprint": row[2]}
+
+    def set_probe(self, spider_name, url, status, etag, last_modified, fingerprint):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO probes
+                (spider, url, status, etag, last_modified, fingerprint, probed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    spider_name,
+                    url,
+                    status,
+                    etag,
+                    last_modified,
+                    fingerprint,
+                    time.time(),
+                ),
+            )
+
+    def statuses(self, since):
+        """Return a dictionary mapping spider names to the status of their start
+        pages probed since a timestamp: unreachable if any page was, otherwise
+        changed if any page was"""
+        statuses = {}
+        for spider_name, status in self.conn.execute(
+            "SELECT spider, status FROM probes WHERE probed_at >= ?", (since,)
+        ):
+            current = statuses.get(spider_name, UNCHANGED)
+            if UNREACHABLE in (current, status):
+                statuses[spider_name] = UNREACHABLE
+            elif CHANGED in (current, status):
+                statuses[spider_name] = CHANGED
+            else:
+                statuses[spider_name] = UNCHANGED
+        return statuses
+
+    def last_crawled(self):
+        """Return a dictionary mapping spider names to their code version and when
+        they were last crawled after a probe"""
+        return {
+            spider_name: (code_version, crawled_at)
+            for spider_name, code_version, crawled_at in self.conn.execute(
+                """
+                SELECT spider, MAX(code_version), MIN(crawled_at) FROM crawled
+                GROUP BY spider
+                """
+            )
+        }
+
+    def mark_crawled(self, spider_name, code_version):
+        """Use a spider's latest probe as the one later probes are compared to, after
+        the spider was crawled successfully"""
+        with self.conn:
+            self.conn.execute("DELETE FROM crawled WHERE spider = ?", (spider_name,))
+            self.conn.execute(
+                """
+                INSERT INTO crawled
+                (spider, url, etag, last_modified, fingerprint, code_version,
+                 crawled_at)
+                SELECT spider, url, etag, last_modified, fingerprint, ?, ?
+                FROM probes WHERE spider = ? AND fingerprint IS NOT NULL
+                """,
+                (code_version, time.time(), spider_name),
+            )
+
+
+def select_spiders(
+    spider_names,
+    statuses,
+    last_crawled,
+    versions,
+    next_meetings,
+    upcoming_until,
+    max_age,
+    now=None,
+):
+    """
+    Split spiders into the ones that need a full crawl and the ones that don't. A
+    spider is crawled unless its start pages were probed and unchanged since it was
+    last crawled, with the same code, less than max_age seconds ago, and it has no
+    meetings before upcoming_until whose status might need to be updated.
+    """
+    now = now or datetime.now()
+    crawl, skip = [], []
+    for name in spider_names:
+        code_version, crawled_at = last_crawled.get(name, (None, 0))
+        next_meeting = next_meetings.get(name)
+        if (
+            statuses.get(name) != UNCHANGED
+            or code_version != versions.get(name)
+            or crawled_at < now.timestamp() - max_age
+            or (next_meeting and now <= next_meeting <= upcoming_until)
+        ):
+            crawl.append(name)
+        else:
+            skip.append(name)
+    return crawl, skip
+
+
+class ProbeSpider(Spider):
+    """
+    Requests the start_urls of other spiders, conditionally if they had validators
+    when those spiders were last crawled, and records whether each page is unchanged
+    (not modified or the same content fingerprint), changed or unreachable. Not in
+    the spiders module so that it isn't run with the others.
+    """
+
+    name = "probe"
+    custom_settings = {
+        **RECORD_SETTINGS,
+        "ITEM_PIPELINES": {},
+        "SPIDER_MIDDLEWARES": {},
+        "EXTENSIONS": {},
+        "CLOSESPIDER_ERRORCOUNT": 0,
+        "RETRY_TIMES": 1,
+    }
+
+    def __init__(self, targets=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.targets = targets or {}
+
+    def start_requests(self):
+        self.store = ProbeStore(probe_store_path(self.settings))
+        for spider_name, urls in sorted(self.targets.items()):
+            for url in urls:
+                baseline = self.store.baseline(spider_name, url) or {}
+                headers = {}
+                if baseline.get("etag"):
+                    headers["If-None-Match"] = baseline["etag"]
+                if baseline.get("last_modified"):
+                    headers["If-Modified-Since"] = baseline["last_modified"]
+                yield Request(
+                    url,
+                    headers=headers,
+                    callback=self.parse,
+                    errback=self.parse_error,
+                    dont_filter=True,
+                    meta={
+                        "spider_name": spider_name,
+                        "baseline": baseline,
+                        "handle_httpstatus_list": [304],
+                    },
+                )
+
+    def parse(self, response):
+        spider_name = response.meta["spider_name"]
+        baseline = response.meta["baseline"]
+        url = response.request.url
+        if response.status == 304:
+            self.store.set_probe(
+                spider_name,
+                url,
+                UNCHANGED,
+                baseline.get("etag"),
+                baseline.get("last_modified"),
+                baseline.get("fingerprint"),
+            )
+        else:
+            fingerprint = content_fingerprint(response)
+            self.store.set_probe(
+                spider_name,
+                url,
+                UNCHANGED if fingerprint == baseline.get("fingerprint") else CHANGED,
+                response.headers.get("ETag", b"").decode("latin-1") or None,
+                response.headers.get("Last-Modified", b"").decode("latin-1") or None,
+                fingerprint,
+            )
+        self.crawler.stats.inc_value(f"probe/{response.status}")
+
+    def parse_error(self, failure):
+        request = failure.request
+        self.store.set_probe(
+            request.meta["spider_name"], request.url, UNREACHABLE, None, None, None
+        )
+        self.crawler.stats.inc_value("probe/errors")
+
+    def closed(self, reason):
+        store = getattr(self, "store", None)
+        if store is not None:
+            store.close()
@@ -0,0 +1,182 @@
+import logging
+import sqlite3
+import time
+from urllib.parse import urlparse
+
+from scrapy.resolver import CachingThreadedResolver
+from scrapy.utils.project import data_path
+from twisted.internet import defer
+from twisted.internet.interfaces import IResolverSimple
+from twisted.names import client, dns, hosts, resolve
+from zope.interface.declarations import implementer
+
+logger = logging.getLogger(__name__)
+
+
+def dns_cache_path(settings):
+    """Return the DNS cache path, defaulting to .scrapy/dns.db"""
+    return settings.get("CITY_SCRAPERS_DNS_CACHE_PATH") or data_path("dns.db")
+
+
+def start_hosts(spider_cls):
+    """Return the hosts of a spider's start_urls"""
+    hosts = set()
+    for url in getattr(spider_cls, "start_urls", None) or []:
+        hostname = urlparse(url).hostname
+        if hostname:
+            hosts.add(hostname)
+    return hosts
+
+
+class DnsCacheStore:
+    """SQLite store of host addresses and when they expire, shared by every process
+    using the same file"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS hosts (
+                    name TEXT PRIMARY KEY,
+                    address TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, name):
+        """Return a host's address and when it expires if it hasn't yet"""
+        return self.conn.execute(
+            "SELECT address, expires_at FROM hosts WHERE name = ? AND expires_at > ?",
+            (name, time.time()),
+        ).fetchone()
+
+    def set(self, name, address, ttl):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO hosts (name, address, expires_at) "
+                "VALUES (?, ?, ?)",
+                (name, address, time.time() + ttl),
+            )
+
+    def prune(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM hosts WHERE expires_at <= ?", (time.time(),))
+
+
+@implementer(IResolverSimple)
+class PersistentCachingResolver(CachingThreadedResolver):
+    """
+    DNS_RESOLVER that keeps the addresses it looks up on disk for as long as their
+    DNS records' TTLs (but at least CITY_SCRAPERS_DNS_CACHE_MIN_TTL seconds), so that
+    each spider process and run doesn't resolve the same hosts again. Lookups for a
+    host that's already being resolved wait for that lookup instead of starting
+    another. Hosts that can't be looked up directly fall back to the system resolver,
+    which doesn't report TTLs, so they're kept for the minimum TTL.
+
+    The hosts in CITY_SCRAPERS_DNS_PREFETCH (set by crawlall to the start_urls hosts
+    of the spiders it runs) are resolved as soon as the reactor starts. IPv4 only,
+    like Scrapy's resolver. Enabled with CITY_SCRAPERS_DNS_CACHE_ENABLED.
+    """
+
+    def __init__(self, reactor, cache_size, timeout, store=None, min_ttl=0, hosts=()):
+        super().__init__(reactor, cache_size, timeout)
+        self.store = store
+        self.min_ttl = min_ttl
+        self.prefetch_hosts = sorted(hosts)
+        self.addresses = {}
+        self.pending = {}
+        self._names_resolver = None
+
+    @classmethod
+    def from_crawler(cls, crawler, reactor):
+        settings = crawler.settings
+        if not settings.getbool("CITY_SCRAPERS_DNS_CACHE_ENABLED"):
+            return super().from_crawler(crawler, reactor)
+        return cls(
+            reactor,
+            settings.getint("DNSCACHE_SIZE"),
+            settings.getfloat("DNS_TIMEOUT"),
+            store=DnsCacheStore(dns_cache_path(settings)),
+            min_ttl=settings.getfloat("CITY_SCRAPERS_DNS_CACHE_MIN_TTL"),
+            hosts=settings.getlist("CITY_SCRAPERS_DNS_PREFETCH"),
+        )
+
+    def install_on_reactor(self):
+        super().install_on_reactor()
+        if self.store is not None:
+            self.store.prune()
+            if self.prefetch_hosts:
+                self.reactor.callWhenRunning(self.prefetch)
+
+    def prefetch(self):
+        """Resolve every host in prefetch_hosts at once without waiting for them"""
+        logger.info("Resolving %d hosts", len(self.prefetch_hosts))
+        for name in self.prefetch_hosts:
+            self.getHostByName(name).addErrback(self._prefetch_error, name)
+
+    def _prefetch_error(self, failure, name):
+        # Spiders requesting the host will get the error themselves
+        logger.debug("Error resolving %s: %s", name, failure.value)
+
+    def getHostByName(self, name, timeout=None):
+        if self.store is None:
+            return super().getHostByName(name, timeout)
+        cached = self.addresses.get(name)
+        if cached is not None and cached[1] > time.time():
+            return defer.succeed(cached[0])
+        cached = self.store.get(name)
+        if cached is not None:
+            self.addresses[name] = cached
+            return defer.succeed(cached[0])
+        waiting = defer.Deferred()
+        if name in self.pending:
+            self.pending[name].append(waiting)
+        else:
+            self.pending[name] = [waiting]
+            self._lookup(name).addBoth(self._lookup_done, name)
+        return waiting
+
+    def _lookup(self, name):
+        """Look up a host's address and TTL, falling back to the system resolver"""
+        if self._names_resolver is None:
+            self._names_resolver = resolve.ResolverChain(
+                [
+                    hosts.Resolver(b"/etc/hosts"),
+                    client.Resolver(b"/etc/resolv.conf", reactor=self.reactor),
+                ]
+            )
+        d = self._names_resolver.lookupAddress(name, timeout=(self.timeout,))
+        d.addCallback(self._parse_answers, name)
+        d.addErrback(self._fallback, name)
+        return d
+
+    def _parse_answers(self, result, name):
+        answers = result[0]
+        addresses = [rr.payload.dottedQuad() for rr in answers if rr.type == dns.A]
+        if not addresses:
+            raise dns.DomainError(name)
+        # The shortest TTL along the chain of CNAME records to the address
+        return addresses[0], min(rr.ttl for rr in answers)
+
+    def _fallback(self, failure, name):
+        d = CachingThreadedResolver.getHostByName(self, name)
+        d.addCallback(lambda address: (address, 0))
+        return d
+
+    def _lookup_done(self, result, name):
+        waiting = self.pending.pop(name)
+        if not isinstance(result, tuple):
+            for d in waiting:
+                d.errback(result)
+            return
+        address, ttl = result
+        ttl = max(ttl, self.min_ttl)
+        self.addresses[name] = (address, time.time() + ttl)
+        self.store.set(name, address, ttl)
+        for d in waiting:
+            d.callback(address)
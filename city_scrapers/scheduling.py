@@ -0,0 +1,105 @@
+import heapq
+import math
+from datetime import datetime
+from statistics import median
+
+# Number of most recent successful runs used to estimate a spider's runtime
+RUNTIME_SAMPLE_SIZE = 5
+# Number of most recent successful runs used to set a spider's timeout
+TIMEOUT_SAMPLE_SIZE = 20
+# Estimate used for spiders without history if no other spider has any either
+DEFAULT_RUNTIME = 60.0
+
+
+def estimate_runtimes(spider_names, runtimes, default=None):
+    """
+    Estimate each spider's runtime as the median of its most recent runs. Spiders
+    without history share a default estimate: the provided default, the median
+    estimate of the spiders with history, or DEFAULT_RUNTIME if there is none.
+    """
+    estimates = {
+        name: median(runtimes[name][-RUNTIME_SAMPLE_SIZE:])
+        for name in spider_names
+        if runtimes.get(name)
+    }
+    if default is None:
+        default = median(estimates.values()) if estimates else DEFAULT_RUNTIME
+    for name in spider_names:
+        estimates.setdefault(name, default)
+    return estimates
+
+
+def lpt_shards(estimates, num_shards):
+    """
+    Split spiders into shards with longest-processing-time-first scheduling: spiders
+    are assigned in descending order of estimated runtime, each to the shard with the
+    lowest total so far. Returns a list of (estimated makespan, spider names) tuples.
+    """
+    shards = [(0.0, idx, []) for idx in range(max(num_shards, 1))]
+    heapq.heapify(shards)
+    for name in sorted(estimates, key=lambda name: (-estimates[name], name)):
+        total, idx, names = heapq.heappop(shards)
+        names.append(name)
+        heapq.heappush(shards, (total + estimates[name], idx, names))
+    return [(total, names) for total, _, names in sorted(shards, key=lambda s: s[1])]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of values"""
+    values = sorted(values)
+    return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+
+def estimate_timeouts(spider_names, runtimes, factor, minimum=0):
+    """
+    Timeout for each spider with history, set to a multiple of the 95th percentile of
+    its most recent runtimes (but at least the minimum) so that a hung site is
+    stopped without cutting off a spider that's only slower than usual
+    """
+    return {
+        name: max(
+            percentile(runtimes[name][-TIMEOUT_SAMPLE_SIZE:], 95) * factor, minimum
+        )
+        for name in spider_names
+        if runtimes.get(name)
+    }
+
+
+def prioritize(spider_names, last_finished, next_meetings, upcoming_until, now=None):
+    """
+    Order spiders by how much running them is worth: spiders with meetings coming up
+    before upcoming_until first, soonest meeting first, followed by the rest ordered
+    by how long it's been since they last finished successfully (never first).
+    """
+    now = now or datetime.now()
+
+    def upcoming(name):
+        next_meeting = next_meetings.get(name)
+        if next_meeting and now <= next_meeting <= upcoming_until:
+            return next_meeting
+
+    def key(name):
+        next_meeting = upcoming(name)
+        if next_meeting:
+            return (0, next_meeting, name)
+        return (1, last_finished.get(name) or datetime.min, name)
+
+    return sorted(spider_names, key=key)
+
+
+def fit_budget(spider_names, estimates, budget, slots):
+    """
+    Simulate running spiders in order with a number of concurrent slots, returning
+    the spiders expected to start before the budget runs out and the ones that aren't
+    """
+    slot_times = [0.0] * max(slots, 1)
+    scheduled, skipped = [], []
+    for name in spider_names:
+        start = heapq.heappop(slot_times)
+        if start < budget:
+            scheduled.append(name)
+            start += estimates[name]
+        else:
+            skipped.append(name)
+        heapq.heappush(slot_times, start)
+    return scheduled, skipped
@@ -1,3 +1,5 @@
+import os
+
 from .base import *  # noqa
 
 USER_AGENT = "City Scrapers [production mode]. Learn more and say hello at https://city-scrapers.org"  # noqa
@@ -13,4 +15,11 @@ SPIDER_MIDDLEWARES = {
 
 EXTENSIONS = {
     "scrapy.extensions.closespider.CloseSpider": None,
+    "city_scrapers.extensions.RunHistoryExtension": 200,
 }
+
+# Archive runs take hours behind a VPN that can drop, so keep their progress in the
+# .scrapy directory that's cached between workflow runs
+CITY_SCRAPERS_CRAWLALL_JOBDIR = os.getenv(
+    "CITY_SCRAPERS_CRAWLALL_JOBDIR", ".scrapy/archive_run"
+)
@@ -15,6 +15,10 @@ BOT_NAME = "city_scrapers"
 SPIDER_MODULES = ["city_scrapers.spiders"]
 NEWSPIDER_MODULE = "city_scrapers.spiders"
 
+# Load spider modules on demand using the manifest generated by `scrapy manifest`
+SPIDER_LOADER_CLASS = "city_scrapers.spider_loader.ManifestSpiderLoader"
+CITY_SCRAPERS_SPIDER_MANIFEST = os.getenv("CITY_SCRAPERS_SPIDER_MANIFEST")
+
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
 USER_AGENT = "City Scrapers [development mode]. Learn more and say hello at https://city-scrapers.org/"  # noqa
 
@@ -36,17 +40,152 @@ AUTOTHROTTLE_TARGET_CONCURRENCY = float(
 ITEM_PIPELINES = {
     "city_scrapers_core.pipelines.MeetingPipeline": 300,
     # "city_scrapers_core.pipelines.ValidationPipeline": 400,
+    "city_scrapers.pipelines.LinkHealthPipeline": 450,
+}
+
+SPIDER_MIDDLEWARES = {
+    "city_scrapers.middleware.UnchangedPageMiddleware": 950,
 }
 
-SPIDER_MIDDLEWARES = {}
+# Scrape items stored from the last run again instead of parsing start pages that
+# haven't changed, parsing them anyway once the stored items are this many days old
+CITY_SCRAPERS_UNCHANGED_ENABLED = False
+CITY_SCRAPERS_UNCHANGED_MAX_AGE = float(os.getenv("CITY_SCRAPERS_UNCHANGED_MAX_AGE", 7))
+# Store of items from unchanged pages, defaults to .scrapy/unchanged.db
+CITY_SCRAPERS_UNCHANGED_PATH = os.getenv("CITY_SCRAPERS_UNCHANGED_PATH")
 
 CITY_SCRAPERS_ARCHIVE = os.getenv("CITY_SCRAPERS_ARCHIVE") is not None
 
+# Reuse events parsed from Legistar calendar rows that haven't changed since the last
+# run, stored in .scrapy/legistar.db by default
+CITY_SCRAPERS_LEGISTAR_INCREMENTAL = False
+CITY_SCRAPERS_LEGISTAR_PATH = os.getenv("CITY_SCRAPERS_LEGISTAR_PATH")
+
 DOWNLOADER_MIDDLEWARES = {
-    "scrapy.downloadermiddlewares.robotstxt.RobotsTxtMiddleware": 543,
+    "scrapy.downloadermiddlewares.robotstxt.RobotsTxtMiddleware": None,
+    "city_scrapers.middleware.RequestCoalescingMiddleware": 520,
+    "city_scrapers.middleware.CachedRobotsTxtMiddleware": 543,
+    "city_scrapers.middleware.SharedResponseCacheMiddleware": 560,
+    "city_scrapers.middleware.DetailPageCacheMiddleware": 580,
+    "city_scrapers.middleware.ConditionalGetMiddleware": 585,
+    "city_scrapers.middleware.HostRateLimitMiddleware": 950,
+    "city_scrapers.middleware.CrawlRecorderMiddleware": 990,
 }
 
-COMMANDS_MODULE = "city_scrapers_core.commands"
+# Keep robots.txt files for this many days, and use them while they're fetched again
+# in the background for up to the max stale days
+CITY_SCRAPERS_ROBOTSTXT_CACHE_ENABLED = False
+CITY_SCRAPERS_ROBOTSTXT_CACHE_TTL = 1
+CITY_SCRAPERS_ROBOTSTXT_CACHE_MAX_STALE = 7
+# Store of robots.txt files, defaults to .scrapy/robotstxt.db
+CITY_SCRAPERS_ROBOTSTXT_CACHE_PATH = os.getenv("CITY_SCRAPERS_ROBOTSTXT_CACHE_PATH")
+
+# Cache detail pages of past meetings for their age times the TTL factor, up to the
+# max TTL in days. Pages for upcoming meetings are always fetched.
+CITY_SCRAPERS_DETAIL_CACHE_ENABLED = False
+CITY_SCRAPERS_DETAIL_CACHE_TTL_FACTOR = 0.25
+CITY_SCRAPERS_DETAIL_CACHE_MAX_TTL = 28
+# Store of cached detail pages, defaults to .scrapy/detail_cache.db
+CITY_SCRAPERS_DETAIL_CACHE_PATH = os.getenv("CITY_SCRAPERS_DETAIL_CACHE_PATH")
+
+# Download pages requested with "shared_cache" in their meta once per crawlall run,
+# sharing them between the run's spiders. The run is set by crawlall.
+CITY_SCRAPERS_SHARED_CACHE_ENABLED = False
+CITY_SCRAPERS_SHARED_CACHE_RUN = os.getenv("CITY_SCRAPERS_SHARED_CACHE_RUN")
+# Store of the run's shared pages, defaults to .scrapy/shared_cache.db
+CITY_SCRAPERS_SHARED_CACHE_PATH = os.getenv("CITY_SCRAPERS_SHARED_CACHE_PATH")
+
+# Revalidate pages from previous runs with If-None-Match and If-Modified-Since
+CITY_SCRAPERS_CONDITIONAL_GET_ENABLED = False
+# Store of responses to revalidate, defaults to .scrapy/conditional.db
+CITY_SCRAPERS_CONDITIONAL_GET_PATH = os.getenv("CITY_SCRAPERS_CONDITIONAL_GET_PATH")
+
+# Combined requests per second allowed to each host across all running spiders
+CITY_SCRAPERS_HOST_RATE_LIMIT = float(os.getenv("CITY_SCRAPERS_HOST_RATE_LIMIT", 2.0))
+CITY_SCRAPERS_HOST_RATE_BURST = 2
+# Rates for specific hosts that override CITY_SCRAPERS_HOST_RATE_LIMIT
+CITY_SCRAPERS_HOST_RATE_LIMITS = {}
+# Subdomains of these domains count against a single shared limit
+CITY_SCRAPERS_HOST_RATE_DOMAINS = ["legistar.com"]
+# SQLite file used to share limits across processes, only per process if unset
+CITY_SCRAPERS_HOST_RATE_FILE = os.getenv("CITY_SCRAPERS_HOST_RATE_FILE")
+
+# Hours that the answer to whether a link exists is kept for, and whether answers are
+# kept on disk across runs
+CITY_SCRAPERS_LINK_PROBE_TTL = 24
+CITY_SCRAPERS_LINK_PROBE_CACHE_ENABLED = False
+CITY_SCRAPERS_LINK_PROBE_PATH = os.getenv("CITY_SCRAPERS_LINK_PROBE_PATH")
+
+# Check every meeting link (once per this many days across runs, with at most this
+# many checks of a host at a time), and "annotate" links with their status or "drop"
+# dead ones
+CITY_SCRAPERS_LINK_HEALTH_ENABLED = (
+    os.getenv("CITY_SCRAPERS_LINK_HEALTH_ENABLED") is not None
+)
+CITY_SCRAPERS_LINK_HEALTH_TTL = 7
+CITY_SCRAPERS_LINK_HEALTH_HOST_CONCURRENCY = 2
+CITY_SCRAPERS_LINK_HEALTH_ACTION = os.getenv(
+    "CITY_SCRAPERS_LINK_HEALTH_ACTION", "annotate"
+)
+
+# Crawl archive to record every response to (`scrapy record`) or to serve every
+# request from (`scrapy replay`)
+CITY_SCRAPERS_RECORD_PATH = None
+CITY_SCRAPERS_REPLAY_PATH = None
+
+# Store Scrapy's HTTP cache (off unless HTTPCACHE_ENABLED is set) with each body kept
+# once, removing responses older than this many days when spiders close
+HTTPCACHE_STORAGE = "city_scrapers.httpcache.ContentAddressedCacheStorage"
+CITY_SCRAPERS_HTTPCACHE_GC_DAYS = 30
+
+# Keep resolved addresses on disk for their DNS records' TTLs (at least the min TTL
+# in seconds), resolving the hosts of the spiders crawlall runs when it starts
+DNS_RESOLVER = "city_scrapers.resolver.PersistentCachingResolver"
+CITY_SCRAPERS_DNS_CACHE_ENABLED = False
+CITY_SCRAPERS_DNS_CACHE_MIN_TTL = 300
+CITY_SCRAPERS_DNS_CACHE_PATH = os.getenv("CITY_SCRAPERS_DNS_CACHE_PATH")
+
+COMMANDS_MODULE = "city_scrapers.commands"
+
+# Maximum number of spiders the crawlall command runs at once
+CITY_SCRAPERS_CRAWLALL_CONCURRENCY = int(
+    os.getenv("CITY_SCRAPERS_CRAWLALL_CONCURRENCY", 8)
+)
+# Number of processes crawlall splits spiders across, balanced by previous runtimes
+CITY_SCRAPERS_CRAWLALL_PROCESSES = int(os.getenv("CITY_SCRAPERS_CRAWLALL_PROCESSES", 1))
+# Seconds crawlall has to run spiders in, 0 for no limit. With a budget, spiders with
+# meetings in the next CITY_SCRAPERS_UPCOMING_DAYS run first, then the ones that went
+# longest without a successful run, and each spider is stopped after
+# CITY_SCRAPERS_TIMEOUT_FACTOR times its 95th percentile runtime (but no sooner than
+# CITY_SCRAPERS_MIN_TIMEOUT seconds)
+CITY_SCRAPERS_CRAWLALL_BUDGET = float(os.getenv("CITY_SCRAPERS_CRAWLALL_BUDGET", 0))
+CITY_SCRAPERS_UPCOMING_DAYS = int(os.getenv("CITY_SCRAPERS_UPCOMING_DAYS", 14))
+CITY_SCRAPERS_TIMEOUT_FACTOR = float(os.getenv("CITY_SCRAPERS_TIMEOUT_FACTOR", 2.0))
+CITY_SCRAPERS_MIN_TIMEOUT = float(os.getenv("CITY_SCRAPERS_MIN_TIMEOUT", 300))
+# Number of times crawlall runs failed spiders again at the end of a pass, and the
+# seconds before the first retry (doubled for each one after)
+CITY_SCRAPERS_CRAWLALL_RETRIES = int(os.getenv("CITY_SCRAPERS_CRAWLALL_RETRIES", 2))
+CITY_SCRAPERS_CRAWLALL_RETRY_DELAY = float(
+    os.getenv("CITY_SCRAPERS_CRAWLALL_RETRY_DELAY", 60)
+)
+# Check the start pages of every spider before crawling and only crawl the spiders
+# whose pages or code changed, that have meetings in the next
+# CITY_SCRAPERS_UPCOMING_DAYS, or that haven't been crawled in this many days (less
+# than the days spiders' results stay in the combined feeds)
+CITY_SCRAPERS_CRAWLALL_PROBE = False
+CITY_SCRAPERS_PROBE_MAX_AGE = 1.5
+CITY_SCRAPERS_PROBE_PATH = os.getenv("CITY_SCRAPERS_PROBE_PATH")
+# Directory crawlall keeps each spider's pending requests and the spiders that have
+# finished in, so that an interrupted run resumes where it stopped instead of starting
+# over. Runs started more than CITY_SCRAPERS_CRAWLALL_RESUME_HOURS ago start over
+CITY_SCRAPERS_CRAWLALL_JOBDIR = os.getenv("CITY_SCRAPERS_CRAWLALL_JOBDIR")
+CITY_SCRAPERS_CRAWLALL_RESUME_HOURS = float(
+    os.getenv("CITY_SCRAPERS_CRAWLALL_RESUME_HOURS", 20)
+)
+# Database of stats from previous runs, defaults to .scrapy/history.db
+CITY_SCRAPERS_HISTORY_PATH = os.getenv("CITY_SCRAPERS_HISTORY_PATH")
+# Socket the worker command listens on for jobs, defaults to .scrapy/worker.sock
+CITY_SCRAPERS_WORKER_SOCKET = os.getenv("CITY_SCRAPERS_WORKER_SOCKET")
 
 EXTENSIONS = {
     "scrapy.extensions.closespider.CloseSpider": None,
@@ -8,15 +8,28 @@ USER_AGENT = "City Scrapers [production mode]. Learn more and say hello at https
 ITEM_PIPELINES = {
     "city_scrapers_core.pipelines.AzureDiffPipeline": 300,
     "city_scrapers_core.pipelines.MeetingPipeline": 400,
+    "city_scrapers.pipelines.LinkHealthPipeline": 450,
     "city_scrapers_core.pipelines.OpenCivicDataPipeline": 500,
 }
 
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 
+CITY_SCRAPERS_CONDITIONAL_GET_ENABLED = True
+CITY_SCRAPERS_DETAIL_CACHE_ENABLED = True
+CITY_SCRAPERS_DNS_CACHE_ENABLED = True
+CITY_SCRAPERS_ROBOTSTXT_CACHE_ENABLED = True
+CITY_SCRAPERS_SHARED_CACHE_ENABLED = True
+CITY_SCRAPERS_LEGISTAR_INCREMENTAL = True
+CITY_SCRAPERS_LINK_PROBE_CACHE_ENABLED = True
+CITY_SCRAPERS_UNCHANGED_ENABLED = True
+CITY_SCRAPERS_CRAWLALL_PROBE = True
+
 EXTENSIONS = {
     "scrapy_sentry_errors.extensions.Errors": 10,
     "city_scrapers_core.extensions.AzureBlobStatusExtension": 100,
     "scrapy.extensions.closespider.CloseSpider": None,
+    "city_scrapers.extensions.RunHistoryExtension": 200,
+    "city_scrapers.extensions.CombinedFeedExtension": 300,
 }
 
 FEED_EXPORTERS = {
@@ -46,3 +59,7 @@ FEED_URI = (
 )
 
 FEED_PREFIX = "%Y/%m/%d"
+
+# Directory the combined feeds are built in as spiders finish, defaults to
+# .scrapy/combined
+CITY_SCRAPERS_COMBINED_FEED_DIR = os.getenv("CITY_SCRAPERS_COMBINED_FEED_DIR")
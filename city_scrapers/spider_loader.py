@@ -0,0 +1,76 @@
+import json
+import os
+from importlib import import_module
+
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.spider import iter_spider_classes
+
+DEFAULT_MANIFEST_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "spiders", "manifest.json"
+)
+
+
+def manifest_path(settings):
+    return settings.get("CITY_SCRAPERS_SPIDER_MANIFEST") or DEFAULT_MANIFEST_PATH
+
+
+def build_manifest(settings):
+    """Import every spider module and map each spider's name to its module"""
+    spider_loader = SpiderLoader(settings)
+    return {
+        name: spider_loader.load(name).__module__
+        for name in sorted(spider_loader.list())
+    }
+
+
+def read_manifest(path):
+    """Return the manifest at a path, or None if there isn't one"""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(path, manifest):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+class ManifestSpiderLoader(SpiderLoader):
+    """
+    Spider loader that uses the manifest generated by `scrapy manifest` to find the
+    module for each spider, importing it only when that spider is loaded instead of
+    importing every spider module up front. Falls back to Scrapy's default behavior if
+    there's no manifest.
+    """
+
+    def __init__(self, settings):
+        self.manifest = read_manifest(manifest_path(settings))
+        super().__init__(settings)
+
+    def _load_all_spiders(self):
+        if self.manifest is None:
+            super()._load_all_spiders()
+
+    def load(self, spider_name):
+        if spider_name not in self._spiders and spider_name in (self.manifest or {}):
+            module = import_module(self.manifest[spider_name])
+            for spider_cls in iter_spider_classes(module):
+                self._spiders.setdefault(spider_cls.name, spider_cls)
+            if spider_name not in self._spiders:
+                raise KeyError(
+                    f"Spider not found: {spider_name} (not in {module.__name__}, "
+                    "run `scrapy manifest` to update the spider manifest)"
+                )
+        return super().load(spider_name)
+
+    def find_by_request(self, request):
+        return [
+            name for name in self.list() if self.load(name).handles_request(request)
+        ]
+
+    def list(self):
+        if self.manifest is None:
+            return super().list()
+        return list(self.manifest)
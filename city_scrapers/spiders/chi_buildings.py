@@ -66,6 +66,7 @@ class ChiBuildingsSpider(CityScrapersSpider):
                 )
                 req.meta["meeting"] = meeting
                 req.meta["category"] = item["category"]
+                req.meta["meeting_start"] = start
                 yield req
 
     def _parse_title_time(self, title):
@@ -1,5 +1,5 @@
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import scrapy
 from city_scrapers_core.constants import BOARD, COMMITTEE
@@ -24,9 +24,30 @@ class ChiCityCollegeSpider(CityScrapersSpider):
         """
         for link in response.css(".event-entry .event-title a::attr(href)").extract():
             yield scrapy.Request(
-                response.urljoin(link), callback=self.parse_event_page, dont_filter=True
+                response.urljoin(link),
+                callback=self.parse_event_page,
+                meta=self._parse_link_meta(link),
+                dont_filter=True,
             )
 
+    def _parse_link_meta(self, link):
+        """
+        Estimate the latest meeting start on an event page from the month in its link
+        (like March-2019-Board-and-Committee-Meetings.aspx) so that pages for past
+        months can be cached. The end of the month after the one in the link is used
+        in case a page lists meetings early in the next month, so the estimate is
+        never earlier than the meetings on the page.
+        """
+        month_match = re.search(r"([A-Z][a-z]+)-(\d{4})", link)
+        if not month_match:
+            return {}
+        try:
+            month_start = datetime.strptime(" ".join(month_match.groups()), "%B %Y")
+        except ValueError:
+            return {}
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        return {"meeting_start": (next_month + timedelta(days=32)).replace(day=1)}
+
     def parse_event_page(self, response):
         date_str = response.css("#formatDateA::text").extract_first()
         for item in response.css(".page-content table tr"):
@@ -6,20 +6,30 @@ from city_scrapers_core.constants import BOARD
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
 
+from city_scrapers.mixins import FanInMixin
 
-class ChiHousingAuthoritySpider(CityScrapersSpider):
+
+class ChiHousingAuthoritySpider(FanInMixin, CityScrapersSpider):
     name = "chi_housing_authority"
     agency = "Chicago Housing Authority"
     timezone = "America/Chicago"
     start_urls = [
         "http://www.thecha.org/about/board-meetings-agendas-and-resolutions/board-information-and-meetings",  # noqa
+        "http://www.thecha.org/about/board-meetings-agendas-and-resolutions/board-meeting-notices",  # noqa
+        "http://www.thecha.org/doing-business/contracting-opportunities/view-all/Board%20Meeting",  # noqa
     ]
     location = {
         "name": "CHA Corporate Offices",
         "address": "60 E Van Buren St, 7th Floor, Chicago, IL 60605",
     }
 
-    def parse(self, response):
+    def start_requests(self):
+        """Request the upcoming meetings, notices and minutes pages at once"""
+        yield from self.fan_in(
+            [scrapy.Request(url) for url in self.start_urls], self.parse
+        )
+
+    def parse(self, response, notice_response, minutes_response):
         """
         `parse` should always `yield` Meeting items.
 
@@ -30,21 +40,8 @@ class ChiHousingAuthoritySpider(CityScrapersSpider):
             raise ValueError("Meeting address has changed")
 
         self.upcoming_meetings = self._parse_upcoming(response)
-        yield scrapy.Request(
-            "http://www.thecha.org/about/board-meetings-agendas-and-resolutions/board-meeting-notices",  # noqa
-            callback=self._parse_next,
-            dont_filter=True,
-        )
-
-    def _parse_next(self, response):
-        """Chains previous requests and yields a request to combine all results"""
-        req = scrapy.Request(
-            "http://www.thecha.org/doing-business/contracting-opportunities/view-all/Board%20Meeting",  # noqa
-            callback=self._parse_combined_meetings,
-            dont_filter=True,
-        )
-        self.upcoming_meetings = self._parse_notice(response)
-        yield req
+        self.upcoming_meetings = self._parse_notice(notice_response)
+        yield from self._parse_combined_meetings(minutes_response)
 
     def _parse_upcoming(self, response):
         """
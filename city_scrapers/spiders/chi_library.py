@@ -1,13 +1,14 @@
 import datetime
 import re
 
-import requests
 from city_scrapers_core.constants import BOARD
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
 
+from city_scrapers.mixins import LinkProbeMixin
 
-class ChiLibrarySpider(CityScrapersSpider):
+
+class ChiLibrarySpider(LinkProbeMixin, CityScrapersSpider):
     name = "chi_library"
     agency = "Chicago Public Library"
     timezone = "America/Chicago"
@@ -15,15 +16,7 @@ class ChiLibrarySpider(CityScrapersSpider):
         "https://www.chipublib.org/board-of-directors/board-meeting-schedule/"
     ]
 
-    def __init__(self, *args, session=requests.Session(), **kwargs):
-        """
-        Initialize a spider with a session object to use for determining whether
-        documents exist
-        """
-        super().__init__(*args, **kwargs)
-        self.session = session
-
-    def parse(self, response):
+    async def parse(self, response):
         """
         `parse` should always `yield` Meeting items.
 
@@ -33,6 +26,7 @@ class ChiLibrarySpider(CityScrapersSpider):
         year = re.search(
             r"\d+", response.css("#content h1::text").extract_first()
         ).group()
+        meetings = []
         for item in response.css("div.entry-content p"):
             if len(item.css("strong")) == 0:
                 continue
@@ -51,6 +45,14 @@ class ChiLibrarySpider(CityScrapersSpider):
             )
             meeting["id"] = self._get_id(meeting)
             meeting["status"] = self._get_status(meeting)
+            meetings.append(meeting)
+
+        # Check every meeting's documents at once
+        existing = await self.probe_links(
+            [link for meeting in meetings for link in meeting["links"]]
+        )
+        for meeting in meetings:
+            meeting["links"] = [link for link in meeting["links"] if link in existing]
             yield meeting
 
     def _parse_location(self, item):
@@ -80,7 +82,7 @@ class ChiLibrarySpider(CityScrapersSpider):
         )
 
     def _parse_links(self, start_time):
-        """Check if agenda and minutes are valid URLs, add to documents if so"""
+        """Return agenda and minutes links, which are checked before they're added"""
         agenda_url = (
             "https://www.chipublib.org/news/board-of-directors-"
             "meeting-agenda-{}-{date.day}-{date.year}/"
@@ -89,11 +91,7 @@ class ChiLibrarySpider(CityScrapersSpider):
             date=start_time,
         )
         minutes_url = agenda_url.replace("agenda", "minutes")
-        agenda_res = self.session.get(agenda_url)
-        minutes_res = self.session.get(minutes_url)
-        documents = []
-        if agenda_res.status_code == 200:
-            documents.append({"href": agenda_url, "title": "Agenda"})
-        if minutes_res.status_code == 200:
-            documents.append({"href": minutes_url, "title": "Minutes"})
-        return documents
+        return [
+            {"href": agenda_url, "title": "Agenda"},
+            {"href": minutes_url, "title": "Minutes"},
+        ]
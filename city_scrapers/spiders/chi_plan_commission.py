@@ -86,6 +86,7 @@ class ChiPlanCommissionSpider(CityScrapersSpider):
                             detail_link,
                             callback=self._parse_detail,
                             cb_kwargs={"start": start},
+                            meta={"meeting_start": start},
                             headers=self.custom_settings["DEFAULT_REQUEST_HEADERS"],
                         )
                         continue
@@ -6,50 +6,57 @@ from city_scrapers_core.constants import BOARD, COMMITTEE, FORUM
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
 
+from city_scrapers.mixins import FanInMixin
 
-class ChiSchoolsSpider(CityScrapersSpider):
+
+class ChiSchoolsSpider(FanInMixin, CityScrapersSpider):
     name = "chi_schools"
     agency = "Chicago Public Schools"
     timezone = "America/Chicago"
     start_urls = [
-        "https://www.cpsboe.org/meetings/past-meetings",
         "https://www.cpsboe.org/meetings",
+        "https://www.cpsboe.org/meetings/past-meetings",
+        "https://www.cpsboe.org/meetings/planning-calendar",
     ]
     location = {
         "name": "CPS Loop Office, Board Room",
         "address": "42 W Madison St, Chicago, IL 60602",
     }
 
-    @classmethod
-    def from_crawler(cls, crawler, *args, **kwargs):
-        """Connect to spider_idle for when all detail pages are scraped"""
-        spider = super().from_crawler(crawler, *args, **kwargs)
-        spider.meeting_dates = []
-        crawler.signals.connect(spider.spider_idle, signal=scrapy.signals.spider_idle)
-        return spider
-
-    def spider_idle(self):
-        """Parse planning calendar after all detail pages scraped"""
-        self.crawler.signals.disconnect(
-            self.spider_idle, signal=scrapy.signals.spider_idle
+    def __init__(self, *args, **kwargs):
+        self.meeting_dates = []
+        super().__init__(*args, **kwargs)
+
+    def start_requests(self):
+        """Request the meetings, past meetings and planning calendar pages at once"""
+        yield from self.fan_in(
+            [scrapy.Request(url) for url in self.start_urls], self.parse
         )
-        self.crawler.engine.crawl(
-            scrapy.Request(
-                "https://www.cpsboe.org/meetings/planning-calendar",
-                callback=self._parse_calendar,
-            ),
-            self,
+
+    def parse(self, response, past_response, calendar_response):
+        """Request every meeting detail page at once, parsing the planning calendar
+        once they've all been scraped"""
+        detail_urls = [
+            response.urljoin(link.attrib["href"])
+            for link in response.css(".meetings dl a:not(.action)")
+        ]
+        # Only pull past 2 years of meetings
+        detail_urls.extend(
+            past_response.urljoin(link.attrib["href"])
+            for link in past_response.css(".past-meetings")[:2].css("th a")
+        )
+        yield from self.fan_in(
+            [scrapy.Request(url) for url in dict.fromkeys(detail_urls)],
+            self._parse_meetings,
+            cb_kwargs={"calendar_response": calendar_response},
+            allow_failures=True,
         )
-        raise scrapy.exceptions.DontCloseSpider
-
-    def parse(self, response):
-        if "past" in response.url:
-            # Only pull past 2 years of meetings
-            for link in response.css(".past-meetings")[:2].css("th a"):
-                yield response.follow(link.attrib["href"], callback=self._parse_detail)
-        else:
-            for link in response.css(".meetings dl a:not(.action)"):
-                yield response.follow(link.attrib["href"], callback=self._parse_detail)
+
+    def _parse_meetings(self, *detail_responses, calendar_response):
+        for detail_response in detail_responses:
+            if detail_response is not None:
+                yield from self._parse_detail(detail_response)
+        yield from self._parse_calendar(calendar_response)
 
     def _parse_detail(self, response):
         """Parse information from meeting detail pages"""
@@ -8,14 +8,19 @@ from city_scrapers_core.constants import BOARD, COMMITTEE
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
 
+from city_scrapers.mixins import FanInMixin
+
 logger = logging.getLogger(__name__)
 
 
-class ChiTeacherPensionSpider(CityScrapersSpider):
+class ChiTeacherPensionSpider(FanInMixin, CityScrapersSpider):
     name = "chi_teacherpension"
     agency = "Chicago Teachers Pension Fund"
     timezone = "America/Chicago"
-    start_urls = ["https://www.ctpf.org/board-trustees-meeting-minutes"]
+    start_urls = [
+        "https://www.ctpf.org/board-trustees-meeting-minutes",
+        "https://www.boarddocs.com/il/ctpf/board.nsf/XML-ActiveMeetings",
+    ]
     location = {
         "name": "CTPF Office",
         "address": "203 N LaSalle St, Suite 2600 Chicago, IL 60601",
@@ -26,7 +31,13 @@ class ChiTeacherPensionSpider(CityScrapersSpider):
         self.month_year_minutes = defaultdict(list)
         super().__init__(*args, **kwargs)
 
-    def parse(self, response):
+    def start_requests(self):
+        """Request the minutes page and the BoardDocs feed at once"""
+        yield from self.fan_in(
+            [scrapy.Request(url) for url in self.start_urls], self.parse
+        )
+
+    def parse(self, response, feed_response):
         """
         `parse` should always `yield` Meeting items.
 
@@ -34,11 +45,7 @@ class ChiTeacherPensionSpider(CityScrapersSpider):
         needs.
         """
         self._parse_minutes(response)
-        yield scrapy.Request(
-            "https://www.boarddocs.com/il/ctpf/board.nsf/XML-ActiveMeetings",
-            callback=self._parse_boarddocs,
-            dont_filter=True,
-        )
+        yield from self._parse_boarddocs(feed_response)
 
     def _parse_minutes(self, response):
         """Parse all past board meeting minutes, store for association to meetings"""
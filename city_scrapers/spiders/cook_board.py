@@ -1,26 +1,24 @@
 import re
-from datetime import datetime, timedelta
 
 from city_scrapers_core.constants import BOARD, COMMITTEE
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import LegistarSpider
 
+from city_scrapers.mixins import IncrementalLegistarMixin
 
-class CookBoardSpider(LegistarSpider):
+
+class CookBoardSpider(IncrementalLegistarMixin, LegistarSpider):
     name = "cook_board"
     agency = "Cook County Board of Commissioners"
     timezone = "America/Chicago"
     start_urls = ["https://cook-county.legistar.com/Calendar.aspx"]
 
     def parse_legistar(self, events):
-        three_months_ago = datetime.today() - timedelta(days=90)
+        window_start = self.legistar_window_start()
         for event in events:
             title = self._parse_title(event)
             start = self.legistar_start(event)
-            if not start or (
-                start < three_months_ago
-                and not self.settings.getbool("CITY_SCRAPERS_ARCHIVE")
-            ):
+            if not start or (window_start and start < window_start):
                 continue
             meeting = Meeting(
                 title=title,
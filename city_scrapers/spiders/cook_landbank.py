@@ -33,6 +33,8 @@ class CookLandbankSpider(CityScrapersSpider):
             self._parse_documents_page(response)
             dates_to_scrape = set([d for _, d in self.documents_map.keys()])
             for date_obj in dates_to_scrape:
+                # Each response includes the whole month, so dates in the same month
+                # share one download
                 yield scrapy.FormRequest(
                     url="http://www.cookcountylandbank.org/wp-admin/admin-ajax.php",
                     formdata={
@@ -43,6 +45,9 @@ class CookLandbankSpider(CityScrapersSpider):
                         "direction": "none",
                     },
                     callback=self._parse_form_response,
+                    meta={
+                        "coalesce_key": ("landbank-cal", date_obj.year, date_obj.month)
+                    },
                 )
 
     def _parse_home(self, response):
@@ -81,9 +86,15 @@ class CookLandbankSpider(CityScrapersSpider):
         data = json.loads(response.text)
         content = scrapy.Selector(text=data["content"])
         for meeting_link in content.css("a[itemprop='url']"):
+            # Dates in the same month link to the same events
+            meta = {"coalesce_key": ("landbank-event", meeting_link.attrib["href"])}
+            event = meeting_link.xpath("..")
+            if event.css("[itemprop='startDate']"):
+                meta["meeting_start"] = self._parse_start(event)
             yield response.follow(
                 meeting_link.attrib["href"],
                 callback=self._parse_detail,
+                meta=meta,
                 dont_filter=True,
             )
 
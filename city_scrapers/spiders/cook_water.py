@@ -1,12 +1,13 @@
 from collections import defaultdict
-from datetime import datetime, timedelta
 
 from city_scrapers_core.constants import BOARD, COMMITTEE, FORUM
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import LegistarSpider
 
+from city_scrapers.mixins import IncrementalLegistarMixin
 
-class CookWaterSpider(LegistarSpider):
+
+class CookWaterSpider(IncrementalLegistarMixin, LegistarSpider):
     name = "cook_water"
     agency = "Metropolitan Water Reclamation District of Greater Chicago"
     event_timezone = "America/Chicago"
@@ -23,17 +24,14 @@ class CookWaterSpider(LegistarSpider):
         self.legistar_keys = set()
 
     def parse_legistar(self, events):
-        three_months_ago = datetime.today() - timedelta(days=90)
+        window_start = self.legistar_window_start()
         for event in events:
             title = self._parse_title(event)
             start = self.legistar_start(event)
             if (
                 title == "Study Session"
                 or not start
-                or (
-                    start < three_months_ago
-                    and not self.settings.getbool("CITY_SCRAPERS_ARCHIVE")
-                )
+                or (window_start and start < window_start)
             ):
                 continue
             meeting = Meeting(
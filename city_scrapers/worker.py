@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import socket
+from importlib import import_module
+
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import data_path
+
+logger = logging.getLogger(__name__)
+
+# Modules imported by the worker before it accepts jobs so that they're shared with
+# the child process that runs each job
+PRELOAD_MODULES = [
+    "scrapy.core.downloader.handlers.http11",
+    "scrapy.core.engine",
+    "scrapy.core.scraper",
+    "scrapy.extensions.corestats",
+    "scrapy.extensions.logstats",
+    "scrapy.extensions.memusage",
+]
+# Settings with components to import ahead of time. Extensions and download handlers
+# aren't included because some of them (like TelnetConsole) install the reactor when
+# they're imported, and a reactor can't be shared with forked children.
+PRELOAD_COMPONENT_SETTINGS = [
+    "DOWNLOADER_MIDDLEWARES",
+    "SPIDER_MIDDLEWARES",
+    "ITEM_PIPELINES",
+]
+# Seconds to wait for a client to send its job after connecting
+JOB_READ_TIMEOUT = 10
+
+
+def worker_socket_path(settings):
+    """Return the worker socket path, defaulting to .scrapy/worker.sock"""
+    return settings.get("CITY_SCRAPERS_WORKER_SOCKET") or data_path("worker.sock")
+
+
+def send_message(conn, message):
+    conn.sendall((json.dumps(message, default=str) + "\n").encode())
+
+
+def read_messages(conn):
+    """Yield each newline-delimited JSON message received on a connection"""
+    with conn.makefile("r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def submit_job(path, spider_name, settings=None):
+    """
+    Send a job crawling a spider with optional settings to the worker listening on a
+    socket, yielding the messages streamed back until the job finishes.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(path)
+        send_message(conn, {"spider": spider_name, "settings": settings or {}})
+        yield from read_messages(conn)
+
+
+class CrawlWorker:
+    """
+    Long-lived process that imports the project once and then runs each crawl job it
+    receives on a Unix socket in a forked child, so that jobs don't pay for importing
+    Scrapy, Twisted and the spiders. A job is a JSON object on a single line with the
+    spider name and any settings to override, and the child streams JSON messages
+    back over the same connection:
+
+        {"event": "started", "spider": ..., "pid": ...}
+        {"event": "stats", "spider": ..., "stats": {...}}  (every stats_interval)
+        {"event": "finished", "spider": ..., "reason": ..., "stats": {...}}
+        {"event": "error", "message": ...}
+    """
+
+    def __init__(self, settings, spider_loader, path, max_jobs=1, stats_interval=10):
+        self.settings = settings
+        self.spider_loader = spider_loader
+        self.path = path
+        self.max_jobs = max(max_jobs, 1)
+        self.stats_interval = stats_interval
+        self.server = None
+        self.children = {}
+
+    def preload(self):
+        """Import the spiders and the modules each crawl needs"""
+        for module in PRELOAD_MODULES:
+            import_module(module)
+        for setting in PRELOAD_COMPONENT_SETTINGS:
+            for path, order in self.settings.getwithbase(setting).items():
+                if order is not None:
+                    load_object(path)
+        for spider_name in self.spider_loader.list():
+            self.spider_loader.load(spider_name)
+
+    def serve(self):
+        """Accept jobs until interrupted, running up to max_jobs at once"""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen()
+        self.server.settimeout(1)
+        logger.info("Worker listening for jobs on %s", self.path)
+        try:
+            while True:
+                self._reap(block=len(self.children) >= self.max_jobs)
+                try:
+                    conn, _ = self.server.accept()
+                except socket.timeout:
+                    continue
+                self._start_job(conn)
+        finally:
+            self.server.close()
+            os.unlink(self.path)
+
+    def _reap(self, block=False):
+        while self.children:
+            pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            if pid == 0:
+                return
+            logger.info(
+                "Job for %s finished with exit code %d",
+                self.children.pop(pid, "unknown spider"),
+                os.waitstatus_to_exitcode(status),
+            )
+            block = False
+
+    def _read_job(self, conn):
+        """Read a job from a connection, returning None if it isn't valid"""
+        conn.settimeout(JOB_READ_TIMEOUT)
+        try:
+            with conn.makefile("r") as f:
+                job = json.loads(f.readline())
+            spider_name = job["spider"]
+            self.spider_loader.load(spider_name)
+            if not isinstance(job.get("settings") or {}, dict):
+                raise ValueError("Job settings must be an object")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Rejected job: %s", e)
+            send_message(conn, {"event": "error", "message": str(e)})
+            return
+        conn.settimeout(None)
+        return job
+
+    def _start_job(self, conn):
+        job = self._read_job(conn)
+        if job is None:
+            conn.close()
+            return
+        pid = os.fork()
+        if pid == 0:
+            exitcode = 1
+            try:
+                self.server.close()
+                exitcode = self._run_job(conn, job)
+            except Exception as e:
+                logger.exception("Job for %s failed", job["spider"])
+                self._send(conn, {"event": "error", "message": str(e)})
+            finally:
+                os._exit(exitcode)
+        conn.close()
+        self.children[pid] = job["spider"]
+        logger.info("Started job for %s in process %d", job["spider"], pid)
+
+    def _run_job(self, conn, job):
+        """Run a job's crawl in the current (child) process, returning its exit code"""
+        from twisted.internet.task import LoopingCall
+
+        spider_name = job["spider"]
+        settings = self.settings.copy()
+        settings.setdict(job.get("settings") or {}, priority="cmdline")
+        process = CrawlerProcess(settings)
+        crawler = process.create_crawler(spider_name)
+        self._send(
+            conn, {"event": "started", "spider": spider_name, "pid": os.getpid()}
+        )
+
+        def send_stats():
+            self._send(
+                conn,
+                {
+                    "event": "stats",
+                    "spider": spider_name,
+                    "stats": crawler.stats.get_stats(),
+                },
+            )
+
+        stats_loop = LoopingCall(send_stats)
+
+        def start_stats():
+            stats_loop.start(self.stats_interval, now=False)
+
+        def stop_stats():
+            if stats_loop.running:
+                stats_loop.stop()
+
+        crawler.signals.connect(start_stats, signal=signals.engine_started)
+        crawler.signals.connect(stop_stats, signal=signals.spider_closed)
+        process.crawl(crawler)
+        process.start()
+
+        stats = crawler.stats.get_stats()
+        reason = stats.get("finish_reason")
+        self._send(
+            conn,
+            {
+                "event": "finished",
+                "spider": spider_name,
+                "reason": reason,
+                "stats": stats,
+            },
+        )
+        conn.close()
+        return 0 if reason == "finished" else 1
+
+    def _send(self, conn, message):
+        try:
+            send_message(conn, message)
+        except OSError:  # the client disconnected, but the crawl should still finish
+            pass
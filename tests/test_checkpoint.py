@@ -0,0 +1,56 @@
+import os
+from os.path import dirname, join
+
+from city_scrapers_core.utils import file_response
+from scrapy import Request
+from scrapy.squeues import PickleLifoDiskQueue
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.checkpoint import CrawlCheckpoint
+from city_scrapers.spiders.chi_buildings import ChiBuildingsSpider
+
+
+def test_mark_finished(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "run"))
+    os.makedirs(checkpoint.spider_jobdir("a"))
+    os.makedirs(checkpoint.spider_jobdir("b"))
+    checkpoint.mark_finished("a")
+    assert checkpoint.finished() == {"a"}
+    assert not os.path.exists(checkpoint.spider_jobdir("a"))
+    assert os.path.exists(checkpoint.spider_jobdir("b"))
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(str(tmp_path / "run"))
+    assert resumed.finished() == {"a"}
+    resumed.clear()
+    assert not os.path.exists(tmp_path / "run")
+
+
+def test_started_at_kept(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path))
+    started_at = checkpoint.started_at()
+    checkpoint.close()
+    resumed = CrawlCheckpoint(str(tmp_path))
+    assert resumed.started_at() == started_at
+    resumed.close()
+
+
+def test_pending_meeting_persisted(tmp_path):
+    crawler = get_crawler(ChiBuildingsSpider)
+    crawler.spider = crawler._create_spider()
+    response = file_response(
+        join(dirname(__file__), "files", "chi_buildings.json"),
+        url="https://www.chicago.gov/city/en/depts/bldgs.html",
+    )
+    request = next(r for r in crawler.spider.parse(response) if isinstance(r, Request))
+    queue = PickleLifoDiskQueue(crawler, str(tmp_path / "queue"))
+    queue.push(request)
+    queue.close()
+
+    queue = PickleLifoDiskQueue(crawler, str(tmp_path / "queue"))
+    resumed = queue.pop()
+    queue.close()
+    assert resumed.url == request.url
+    assert resumed.callback == crawler.spider._parse_event
+    assert dict(resumed.meta["meeting"]) == dict(request.meta["meeting"])
+    assert resumed.meta["meeting_start"] == request.meta["meeting_start"]
@@ -42,7 +42,7 @@ freezer.stop()
 
 def test_raises_location_error():
     with pytest.raises(ValueError):
-        [i for i in spider.parse(minutes_req)]
+        [i for i in spider.parse(minutes_req, notice_response, minutes_req)]
 
 
 def test_start():
@@ -1,26 +1,43 @@
 from datetime import datetime
 from os.path import dirname, join
-from unittest.mock import MagicMock
 
 import pytest
 from city_scrapers_core.constants import BOARD, TENTATIVE
 from city_scrapers_core.utils import file_response
 from freezegun import freeze_time
+from twisted.internet import defer
 
 from city_scrapers.spiders.chi_library import ChiLibrarySpider
 
+
+class FakeProber:
+    def __init__(self, status):
+        self.status = status
+        self.urls = []
+
+    def check(self, url):
+        self.urls.append(url)
+        return defer.succeed(self.status)
+
+
+def parse(spider, response):
+    async def collect():
+        return [item async for item in spider.parse(response)]
+
+    results = []
+    defer.Deferred.fromCoroutine(collect()).addCallback(results.extend)
+    return results
+
+
 freezer = freeze_time("2018-12-20")
 freezer.start()
-session = MagicMock()
-res_mock = MagicMock()
-res_mock.status_code = 200
-session.get.return_value = res_mock
 test_response = file_response(
     join(dirname(__file__), "files", "chi_library.html"),
     url="https://www.chipublib.org/board-of-directors/board-meeting-schedule/",
 )
-spider = ChiLibrarySpider(session=session)
-parsed_items = [item for item in spider.parse(test_response)]
+spider = ChiLibrarySpider()
+spider._link_prober = FakeProber(200)
+parsed_items = parse(spider, test_response)
 freezer.stop()
 
 
@@ -84,3 +101,16 @@ def test_source(item):
         item["source"]
         == "https://www.chipublib.org/board-of-directors/board-meeting-schedule/"
     )
+
+
+def test_links_checked_once():
+    assert len(spider._link_prober.urls) == len(parsed_items) * 2
+    assert len(set(spider._link_prober.urls)) == len(spider._link_prober.urls)
+
+
+def test_missing_links():
+    missing_spider = ChiLibrarySpider()
+    missing_spider._link_prober = FakeProber(404)
+    items = parse(missing_spider, test_response)
+    assert len(items) == len(parsed_items)
+    assert all(item["links"] == [] for item in items)
@@ -0,0 +1,93 @@
+from scrapy import FormRequest, Request, Spider
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred
+
+from city_scrapers.middleware import RequestCoalescingMiddleware
+
+URL = "http://www.cookcountylandbank.org/wp-admin/admin-ajax.php"
+KEY = ("landbank-cal", 2000, 1)
+
+
+def make_middleware():
+    crawler = get_crawler(Spider)
+    crawler.stats.open_spider(None)
+    return RequestCoalescingMiddleware.from_crawler(crawler), Spider("test")
+
+
+def form_request(day, key=KEY):
+    return FormRequest(
+        URL, formdata={"fc_focus_day": str(day)}, meta={"coalesce_key": key}
+    )
+
+
+def respond(request, status=200):
+    return TextResponse(URL, status=status, body=b"{}", request=request)
+
+
+def test_requests_without_key_ignored():
+    middleware, spider = make_middleware()
+    request = Request(URL)
+    assert middleware.process_request(request, spider) is None
+    assert middleware.process_request(request, spider) is None
+
+
+def test_completed_response_shared():
+    middleware, spider = make_middleware()
+    first = form_request(1)
+    assert middleware.process_request(first, spider) is None
+    middleware.process_response(first, respond(first), spider)
+    second = form_request(2)
+    response = middleware.process_request(second, spider)
+    assert response.request is second
+    assert "coalesced" in response.flags
+    assert middleware.stats.get_value("coalesce/hits") == 1
+    assert middleware.process_request(form_request(3, ("other",)), spider) is None
+
+
+def test_waits_for_pending_request():
+    middleware, spider = make_middleware()
+    first = form_request(1)
+    middleware.process_request(first, spider)
+    waiting = middleware.process_request(form_request(2), spider)
+    assert isinstance(waiting, Deferred)
+    results = []
+    waiting.addCallback(results.append)
+    assert results == []
+    middleware.process_response(first, respond(first), spider)
+    assert "coalesced" in results[0].flags
+
+
+def test_downloads_after_failure():
+    middleware, spider = make_middleware()
+    first = form_request(1)
+    middleware.process_request(first, spider)
+    second = form_request(2)
+    third = form_request(3)
+    waiting = [middleware.process_request(r, spider) for r in (second, third)]
+    results = []
+    for d in waiting:
+        d.addCallback(results.append)
+    middleware.process_exception(first, ValueError(), spider)
+    # The second request downloads the key itself and the third waits for it
+    assert results == [None]
+    assert second.meta["coalesce_owner"]
+    middleware.process_response(second, respond(second), spider)
+    assert results[1].request is third
+
+
+def test_failed_response_not_shared():
+    middleware, spider = make_middleware()
+    first = form_request(1)
+    middleware.process_request(first, spider)
+    second = form_request(2)
+    waiting = middleware.process_request(second, spider)
+    results = []
+    waiting.addCallback(results.append)
+    middleware.process_response(first, respond(first, status=500), spider)
+    # The waiting request downloads the key itself instead of getting the error
+    assert results == [None]
+    assert second.meta["coalesce_owner"]
+    assert isinstance(middleware.process_request(form_request(3), spider), Deferred)
+    middleware.process_response(second, respond(second), spider)
+    assert "coalesced" in middleware.process_request(form_request(4), spider).flags
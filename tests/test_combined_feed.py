@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.combined_feed import CombinedFeed
+from city_scrapers.extensions import CombinedFeedExtension
+
+NOW = datetime(2026, 1, 5, 8, 12)
+
+
+def meeting_lines(*starts):
+    return [json.dumps({"title": "Board", "start": start}) + "\n" for start in starts]
+
+
+def read_feed(feed, name):
+    with open(feed.path(name)) as f:
+        return [json.loads(line)["start"] for line in f if line.strip()]
+
+
+def test_add_spiders(tmp_path):
+    feed = CombinedFeed(str(tmp_path))
+    feed.add_spider("chi_ssa_1", meeting_lines("2026-01-10T10:00:00"), now=NOW)
+    feed.add_spider(
+        "chi_ssa_2",
+        meeting_lines("2025-12-01T10:00:00", "2026-01-08T10:00:00"),
+        now=NOW,
+    )
+    assert read_feed(feed, "latest.json") == [
+        "2025-12-01T10:00:00",
+        "2026-01-08T10:00:00",
+        "2026-01-10T10:00:00",
+    ]
+    assert read_feed(feed, "upcoming.json") == [
+        "2026-01-08T10:00:00",
+        "2026-01-10T10:00:00",
+    ]
+
+    feed.add_spider("chi_ssa_1", meeting_lines("2026-01-12T10:00:00"), now=NOW)
+    assert read_feed(feed, "upcoming.json") == [
+        "2026-01-08T10:00:00",
+        "2026-01-12T10:00:00",
+    ]
+    assert feed.read_manifest()["spiders"]["chi_ssa_1"]["items"] == 1
+
+
+def test_old_results_left_out(tmp_path):
+    feed = CombinedFeed(str(tmp_path), max_age_days=3)
+    feed.add_spider(
+        "chi_ssa_1", meeting_lines("2026-01-10T10:00:00"), now=datetime(2026, 1, 1)
+    )
+    assert not feed.has_current_spiders(now=NOW)
+    feed.add_spider("chi_ssa_2", meeting_lines("2026-01-08T10:00:00"), now=NOW)
+    assert read_feed(feed, "latest.json") == ["2026-01-08T10:00:00"]
+
+
+def test_seal(tmp_path):
+    feed = CombinedFeed(str(tmp_path))
+    feed.add_spider("chi_ssa_1", meeting_lines("2026-01-10T10:00:00"), now=NOW)
+    files = feed.seal(now=NOW)
+    assert sorted(files) == ["chi_ssa_1.json", "latest.json", "upcoming.json"]
+    assert feed.read_manifest()["sealed"] == NOW.isoformat()
+    # Spiders that haven't finished since the last seal aren't published again
+    assert sorted(feed.seal(now=NOW)) == ["latest.json", "upcoming.json"]
+
+
+def test_extension(tmp_path):
+    crawler = get_crawler(Spider, {"CITY_SCRAPERS_COMBINED_FEED_DIR": str(tmp_path)})
+    spider = Spider("chi_ssa_1")
+    extension = CombinedFeedExtension.from_crawler(crawler)
+    extension.spider_closed(spider, "shutdown")
+    assert "chi_ssa_1" not in extension.feed.read_manifest()["spiders"]
+
+    extension.item_scraped({"title": "Board", "start": datetime(2099, 1, 5, 18)})
+    extension.spider_closed(spider, "finished")
+    assert read_feed(extension.feed, "upcoming.json") == ["2099-01-05 18:00:00"]
@@ -0,0 +1,147 @@
+import pytest
+from scrapy import Request, Spider
+from scrapy.downloadermiddlewares.redirect import RedirectMiddleware
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse, Response
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.middleware import ConditionalGetMiddleware
+from city_scrapers.spiders.chi_plan_commission import ChiPlanCommissionSpider
+
+URL = "https://www.chicago.gov/city/en/depts/dcd/supp_info/chicago_plan_commission.html"
+OTHER_URL = "https://www.chicago.gov/city/en/depts/dcd/supp_info/cpc.html"
+BODY = b"<html><body>Meetings</body></html>"
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+def make_middleware(tmp_path, spidercls=ExampleSpider):
+    crawler = get_crawler(
+        spidercls,
+        {
+            "CITY_SCRAPERS_CONDITIONAL_GET_ENABLED": True,
+            "CITY_SCRAPERS_CONDITIONAL_GET_PATH": str(tmp_path / "conditional.db"),
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    return ConditionalGetMiddleware.from_crawler(crawler), spider
+
+
+def fetch(mw, spider, request, response):
+    assert mw.process_request(request, spider) is None
+    return mw.process_response(request, response, spider)
+
+
+def test_disabled():
+    with pytest.raises(NotConfigured):
+        ConditionalGetMiddleware.from_crawler(get_crawler(Spider))
+
+
+def test_revalidates_stored_response(tmp_path):
+    mw, spider = make_middleware(tmp_path, ChiPlanCommissionSpider)
+    first = HtmlResponse(
+        URL,
+        body=BODY,
+        headers={"ETag": '"abc"', "Last-Modified": "Mon, 05 Jan 2026 08:00:00 GMT"},
+    )
+    assert fetch(mw, spider, Request(URL), first) is first
+
+    request = Request(URL, headers=spider.custom_settings["DEFAULT_REQUEST_HEADERS"])
+    mw.process_request(request, spider)
+    assert request.headers["If-None-Match"] == b'"abc"'
+    assert request.headers["If-Modified-Since"] == b"Mon, 05 Jan 2026 08:00:00 GMT"
+    assert request.headers["Accept-Language"] == b"en-US,en;q=0.9"
+    response = mw.process_response(
+        request, Response(URL, status=304, headers={"ETag": '"abc"'}), spider
+    )
+    assert isinstance(response, HtmlResponse)
+    assert response.status == 200
+    assert response.body == BODY
+    assert response.request is request
+    assert "revalidated" in response.flags
+
+    stats = mw.stats.get_stats(spider)
+    assert stats["conditional_get/requests"] == 1
+    assert stats["conditional_get/hits/www.chicago.gov"] == 1
+    assert stats["conditional_get/bytes_saved"] == len(BODY)
+    mw.spider_closed(spider)
+    assert mw.stats.get_value("conditional_get/hit_rate", spider=spider) == 1
+
+
+def test_changed_response_replaces_stored(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    fetch(mw, spider, Request(URL), HtmlResponse(URL, body=BODY, headers={"ETag": "1"}))
+    changed = HtmlResponse(URL, body=b"<html>New</html>", headers={"ETag": "2"})
+    assert fetch(mw, spider, Request(URL), changed) is changed
+    request = Request(URL)
+    mw.process_request(request, spider)
+    assert request.headers["If-None-Match"] == b"2"
+
+    fetch(mw, spider, Request(URL), HtmlResponse(URL, body=BODY))
+    request = Request(URL)
+    mw.process_request(request, spider)
+    assert b"If-None-Match" not in request.headers
+
+
+def test_skips_requests(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    fetch(mw, spider, Request(URL), HtmlResponse(URL, body=BODY, headers={"ETag": "1"}))
+    for request in [
+        Request(URL, method="POST"),
+        Request(URL, meta={"dont_cache": True}),
+        Request(URL, headers={"If-None-Match": "0"}),
+    ]:
+        mw.process_request(request, spider)
+        assert request.headers.get("If-None-Match") in [None, b"0"]
+        assert "conditional_get_cached" not in request.meta
+
+
+def test_redirect_drops_validators(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    redirect_mw = RedirectMiddleware.from_crawler(mw.crawler)
+    fetch(mw, spider, Request(URL), HtmlResponse(URL, body=BODY, headers={"ETag": "1"}))
+    request = Request(URL)
+    mw.process_request(request, spider)
+    redirected = redirect_mw.process_response(
+        request, Response(URL, status=301, headers={"Location": OTHER_URL}), spider
+    )
+    assert redirected.url == OTHER_URL
+    assert mw.process_request(redirected, spider) is None
+    assert b"If-None-Match" not in redirected.headers
+    assert "conditional_get_cached" not in redirected.meta
+    response = Response(OTHER_URL, status=304)
+    assert mw.process_response(redirected, response, spider) is response
+
+    # Pages stored for the new URL are still revalidated
+    fetch(
+        mw,
+        spider,
+        Request(OTHER_URL),
+        HtmlResponse(OTHER_URL, body=BODY, headers={"ETag": "2"}),
+    )
+    request = Request(URL)
+    mw.process_request(request, spider)
+    redirected = redirect_mw.process_response(
+        request, Response(URL, status=301, headers={"Location": OTHER_URL}), spider
+    )
+    mw.process_request(redirected, spider)
+    assert redirected.headers["If-None-Match"] == b"2"
+    assert redirected.meta["conditional_get_cached"]["url"] == OTHER_URL
+
+
+def test_cached_response_not_stored(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    fetch(mw, spider, Request(URL), HtmlResponse(URL, body=BODY, headers={"ETag": "1"}))
+    # Detail page cache hits skip process_request but go through process_response
+    request = Request(URL)
+    cached = HtmlResponse(
+        URL, body=b"<html>Old</html>", headers={"ETag": "0"}, flags=["cached"]
+    )
+    assert mw.process_response(request, cached, spider) is cached
+    request = Request(URL)
+    mw.process_request(request, spider)
+    assert request.headers["If-None-Match"] == b"1"
+    assert request.meta["conditional_get_cached"]["body"] == BODY
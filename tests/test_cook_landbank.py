@@ -40,6 +40,7 @@ freezer.stop()
 def test_count():
     assert len(parsed_items) == 9
     assert len(parsed_form) == 1
+    assert parsed_form[0].meta["meeting_start"] == datetime(2019, 9, 13, 10)
     assert len(list(spider.documents_map.keys())) == 22
 
 
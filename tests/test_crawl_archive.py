@@ -0,0 +1,108 @@
+import json
+from os.path import dirname, join
+
+import pytest
+from scrapy import Request, Spider
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse, Response
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.crawl_archive import CrawlArchive, ReplayDownloadHandler
+from city_scrapers.middleware import CrawlRecorderMiddleware
+
+URL = "https://www.example.com/meetings"
+BODY = b"<html><body>Meetings</body></html>"
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+def make_crawler(settings):
+    crawler = get_crawler(ExampleSpider, settings)
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    return crawler, spider
+
+
+def download(handler, request, spider):
+    results = []
+    handler.download_request(request, spider).addBoth(results.append)
+    return results[0]
+
+
+def test_archive_dedupes_bodies(tmp_path):
+    archive = CrawlArchive(str(tmp_path / "crawl.db"))
+    archive.add(Request(URL), HtmlResponse(URL, body=BODY))
+    archive.add(Request(URL + "?page=2"), HtmlResponse(URL + "?page=2", body=BODY))
+    archive.add(Request(URL, method="POST", body=b"a=1"), Response(URL, status=500))
+
+    stats = archive.stats()
+    assert stats["records"] == 3
+    assert stats["contents"] == 2
+    assert stats["raw_size"] == 2 * len(BODY)
+    assert [r["status"] for r in archive.get(Request(URL))] == [200]
+    assert [
+        r["status"] for r in archive.get(Request(URL, method="POST", body=b"a=1"))
+    ] == [500]
+    assert archive.get(Request(URL, method="POST")) == []
+
+
+def test_recorder_disabled():
+    with pytest.raises(NotConfigured):
+        CrawlRecorderMiddleware.from_crawler(get_crawler(Spider))
+
+
+def test_records_and_replays(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    crawler, spider = make_crawler({"CITY_SCRAPERS_RECORD_PATH": path})
+    recorder = CrawlRecorderMiddleware.from_crawler(crawler)
+    first = HtmlResponse(URL, body=BODY, headers={"Content-Type": "text/html"})
+    second = HtmlResponse(URL, body=BODY + b"<p>Updated</p>")
+    assert recorder.process_response(Request(URL), first, spider) is first
+    recorder.process_response(Request(URL), second, spider)
+    recorder.spider_closed(spider)
+    assert crawler.stats.get_value("record/responses") == 2
+
+    crawler, spider = make_crawler({"CITY_SCRAPERS_REPLAY_PATH": path})
+    handler = ReplayDownloadHandler.from_crawler(crawler)
+    responses = [download(handler, Request(URL), spider) for _ in range(3)]
+    assert [response.body for response in responses] == [
+        first.body,
+        second.body,
+        second.body,
+    ]
+    assert isinstance(responses[0], HtmlResponse)
+    assert responses[0].headers["Content-Type"] == b"text/html"
+    assert "replayed" in responses[0].flags
+
+    missing = download(handler, Request(URL + "/missing"), spider)
+    assert missing.check(IgnoreRequest)
+    assert crawler.stats.get_value("replay/responses") == 3
+    assert crawler.stats.get_value("replay/missing") == 1
+    handler.close()
+
+
+def test_replay_requires_archive(tmp_path):
+    with pytest.raises(NotConfigured):
+        ReplayDownloadHandler.from_crawler(get_crawler(Spider))
+    with pytest.raises(NotConfigured):
+        ReplayDownloadHandler.from_crawler(
+            get_crawler(
+                Spider, {"CITY_SCRAPERS_REPLAY_PATH": str(tmp_path / "missing.db")}
+            )
+        )
+
+
+def test_archive_from_fixtures(tmp_path):
+    fixture_dir = join(dirname(__file__), "files", "chi_northwest_home_equity")
+    with open(join(fixture_dir, "url_to_local.json")) as f:
+        url_to_local = json.load(f)
+    archive = CrawlArchive(str(tmp_path / "crawl.db"))
+    for url, filename in url_to_local.items():
+        archive.add_file(Request(url), join(fixture_dir, filename))
+
+    assert archive.stats()["records"] == len(url_to_local)
+    url, filename = next(iter(url_to_local.items()))
+    with open(join(fixture_dir, filename), "rb") as f:
+        assert archive.get(Request(url))[0]["body"] == f.read()
@@ -0,0 +1,285 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+from scrapy import Spider
+from scrapy.crawler import Crawler
+from scrapy.exceptions import UsageError
+from scrapy.http import HtmlResponse
+from scrapy.settings import Settings
+
+from city_scrapers.checkpoint import CrawlCheckpoint
+from city_scrapers.commands.crawlall import Command, uses_playwright
+from city_scrapers.middleware.shared_cache import SharedResponseStore
+from city_scrapers.spiders.chi_transit import ChiTransitSpider
+
+ASYNCIO_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
+
+
+class PlainSpider(Spider):
+    name = "plain"
+
+
+class AsyncioSpider(Spider):
+    name = "asyncio"
+    custom_settings = {"TWISTED_REACTOR": ASYNCIO_REACTOR}
+
+
+def make_command(settings=None):
+    command = Command()
+    command.settings = Settings(settings)
+    return command
+
+
+def test_select_all_spiders():
+    command = make_command()
+    assert command._select_spiders([], ["b", "a"]) == ["a", "b"]
+
+
+def test_select_listed_spiders():
+    command = make_command()
+    assert command._select_spiders(["b", "a", "b"], ["a", "b", "c"]) == ["b", "a"]
+
+
+def test_select_unknown_spider():
+    command = make_command()
+    with pytest.raises(UsageError):
+        command._select_spiders(["d"], ["a", "b"])
+
+
+def test_set_reactor_from_spiders():
+    command = make_command()
+    command._set_reactor([PlainSpider, AsyncioSpider])
+    assert command.settings.get("TWISTED_REACTOR") == ASYNCIO_REACTOR
+
+
+def test_set_reactor_no_requests():
+    command = make_command({"TWISTED_REACTOR": None})
+    command._set_reactor([PlainSpider])
+    assert command.settings.get("TWISTED_REACTOR") is None
+
+
+def test_set_reactor_keeps_project_setting():
+    reactor = "twisted.internet.epollreactor.EPollReactor"
+    command = make_command({"TWISTED_REACTOR": reactor})
+    command._set_reactor([AsyncioSpider])
+    assert command.settings.get("TWISTED_REACTOR") == reactor
+
+
+def test_uses_playwright():
+    assert uses_playwright(ChiTransitSpider)
+    assert not uses_playwright(PlainSpider)
+    assert not uses_playwright(AsyncioSpider)
+
+
+def test_set_timeout():
+    command = make_command(
+        {
+            "EXTENSIONS": {
+                "scrapy.extensions.closespider.CloseSpider": None,
+                "city_scrapers.extensions.RunHistoryExtension": 200,
+                "city_scrapers.extensions.CombinedFeedExtension": 300,
+            }
+        }
+    )
+    command.deadline = time.time() + 600
+    command.timeouts = {"plain": 120}
+    crawler = Crawler(PlainSpider, command.settings)
+    command._set_timeout(crawler)
+    assert crawler.settings.getint("CLOSESPIDER_TIMEOUT") == 120
+    assert crawler.settings.getint("CLOSESPIDER_ERRORCOUNT") == 0
+    assert crawler.settings.getdict("EXTENSIONS") == {
+        "scrapy.extensions.closespider.CloseSpider": 0,
+        "city_scrapers.extensions.RunHistoryExtension": 200,
+        "city_scrapers.extensions.CombinedFeedExtension": 300,
+    }
+
+    command.timeouts = {}
+    crawler = Crawler(PlainSpider)
+    command._set_timeout(crawler)
+    assert 590 < crawler.settings.getint("CLOSESPIDER_TIMEOUT") <= 600
+
+
+def test_set_timeout_keeps_prod_extensions():
+    settings = Settings()
+    settings.setmodule("city_scrapers.settings.prod", priority="project")
+    command = make_command(settings)
+    command.deadline = time.time() + 600
+    command.timeouts = {}
+    crawler = Crawler(PlainSpider, command.settings)
+    command._set_timeout(crawler)
+    extensions = crawler.settings.getwithbase("EXTENSIONS")
+    for name in settings.getdict("EXTENSIONS"):
+        if name != "scrapy.extensions.closespider.CloseSpider":
+            assert name in extensions
+    assert extensions["scrapy.extensions.closespider.CloseSpider"] == 0
+
+
+def crawl_result(**kwargs):
+    result = {
+        "failed": False,
+        "skipped": False,
+        "reason": "finished",
+        "items": 0,
+        "errors": 0,
+        "elapsed": 10,
+        "attempts": 1,
+    }
+    result.update(kwargs)
+    return result
+
+
+def test_should_retry():
+    command = make_command()
+    assert command._should_retry(crawl_result(failed=True, reason="DNSLookupError"))
+    assert command._should_retry(crawl_result(errors=2))
+    assert not command._should_retry(crawl_result(errors=2, items=5))
+    assert not command._should_retry(crawl_result(items=5))
+    assert not command._should_retry(crawl_result(failed=True, reason="shutdown"))
+    assert not command._should_retry(
+        crawl_result(failed=True, reason="closespider_timeout")
+    )
+    assert not command._should_retry(crawl_result(skipped=True, reason="out of time"))
+
+
+def test_retry_failed_limits():
+    command = make_command(
+        {"CITY_SCRAPERS_CRAWLALL_RETRIES": 2, "CITY_SCRAPERS_CRAWLALL_RETRY_DELAY": 60}
+    )
+    command.deadline = None
+    command.results = {"a": crawl_result(failed=True), "b": crawl_result(items=3)}
+    assert command._retry_failed(3) is None
+
+    command.deadline = time.time() + 100
+    assert command._retry_failed(2) is None
+
+    retry = command._retry_failed(1)
+    assert retry is not None
+    retry.cancel()
+    retry.addErrback(lambda _: None)
+
+
+def test_save_progress(tmp_path):
+    command = make_command()
+    command.checkpoint = CrawlCheckpoint(str(tmp_path))
+    for name in ["done", "retry", "stopped"]:
+        os.makedirs(command.checkpoint.spider_jobdir(name))
+    command._save_progress("done", crawl_result(items=3))
+    command._save_progress("retry", crawl_result(errors=2))
+    command._save_progress("stopped", crawl_result(failed=True, reason="shutdown"))
+    assert command.checkpoint.finished() == {"done"}
+    assert not os.path.exists(command.checkpoint.spider_jobdir("done"))
+    assert not os.path.exists(command.checkpoint.spider_jobdir("retry"))
+    assert os.path.exists(command.checkpoint.spider_jobdir("stopped"))
+    command.checkpoint.close()
+
+
+def run_command(tmp_path, spider_names, lane, finish=()):
+    command = make_command(
+        {
+            "CITY_SCRAPERS_CRAWLALL_JOBDIR": str(tmp_path / "run"),
+            "CITY_SCRAPERS_CRAWLALL_RESUME_HOURS": 20,
+            "CITY_SCRAPERS_HISTORY_PATH": str(tmp_path / "history.db"),
+        }
+    )
+    command.crawler_process = SimpleNamespace(
+        spider_loader=SimpleNamespace(
+            list=lambda: ["a", "b"], load=lambda name: PlainSpider
+        )
+    )
+
+    def run_lanes(lanes, opts):
+        checkpoint = CrawlCheckpoint(str(tmp_path / "run"))
+        for name in finish:
+            checkpoint.mark_finished(name)
+        checkpoint.close()
+
+    command._run_lanes = run_lanes
+    opts = SimpleNamespace(lane=lane, plan=False, playwright_lane=False)
+    command.run(spider_names, opts)
+
+
+def test_lane_does_not_clear_checkpoint(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path / "run"))
+    os.makedirs(checkpoint.spider_jobdir("b"))
+    checkpoint.close()
+    # The first lane to finish leaves the other lane's progress alone
+    run_command(tmp_path, ["a"], lane=True, finish=["a"])
+    assert os.path.exists(CrawlCheckpoint(str(tmp_path / "run")).spider_jobdir("b"))
+    run_command(tmp_path, ["b"], lane=True, finish=["b"])
+    assert CrawlCheckpoint(str(tmp_path / "run")).finished() == {"a", "b"}
+    # The process that started the run clears it once every lane has finished
+    run_command(tmp_path, [], lane=False)
+    assert not os.path.exists(tmp_path / "run")
+
+
+def test_lane_does_not_probe(tmp_path):
+    command = make_command(
+        {
+            "CITY_SCRAPERS_CRAWLALL_PROBE": True,
+            "CITY_SCRAPERS_HISTORY_PATH": str(tmp_path / "history.db"),
+        }
+    )
+    command.crawler_process = SimpleNamespace(
+        spider_loader=SimpleNamespace(
+            list=lambda: ["a", "b"], load=lambda name: PlainSpider
+        )
+    )
+    probed = []
+    command._probe = lambda spider_names, opts: probed.append(spider_names) or []
+    command._run_lanes = lambda lanes, opts: None
+    opts = SimpleNamespace(
+        lane=False,
+        plan=False,
+        playwright_lane=False,
+        set=[],
+        loglevel=None,
+        nolog=False,
+        concurrency=None,
+    )
+    command.run(["a", "b"], opts)
+    assert probed == [["a", "b"]]
+
+    lane_args = command._lane_args({"args": [], "spiders": ["a"]}, opts)
+    assert "--lane" in lane_args
+    opts.lane = True
+    command.run(["a"], opts)
+    assert probed == [["a", "b"]]
+
+
+def test_open_checkpoint_starts_over(tmp_path):
+    command = make_command(
+        {
+            "CITY_SCRAPERS_CRAWLALL_JOBDIR": str(tmp_path),
+            "CITY_SCRAPERS_CRAWLALL_RESUME_HOURS": 20,
+        }
+    )
+    checkpoint = command._open_checkpoint()
+    checkpoint.mark_finished("a")
+    checkpoint.close()
+    checkpoint = command._open_checkpoint()
+    assert checkpoint.finished() == {"a"}
+    with checkpoint.conn:
+        checkpoint.conn.execute("UPDATE run SET started_at = started_at - 86400")
+    checkpoint.close()
+    checkpoint = command._open_checkpoint()
+    assert checkpoint.finished() == set()
+    checkpoint.close()
+
+
+def test_start_shared_cache(tmp_path):
+    path = str(tmp_path / "shared_cache.db")
+    store = SharedResponseStore(path)
+    store.set("old", "abc", HtmlResponse("https://rpba.org/", body=b""))
+    store.close()
+    command = make_command({"CITY_SCRAPERS_SHARED_CACHE_PATH": path})
+    command._start_shared_cache()
+    run = command.settings.get("CITY_SCRAPERS_SHARED_CACHE_RUN")
+    assert run
+    store = SharedResponseStore(path)
+    assert store.get("old", "abc") is None
+    store.close()
+    # Lanes keep the run they're started with
+    command._start_shared_cache()
+    assert command.settings.get("CITY_SCRAPERS_SHARED_CACHE_RUN") == run
@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from scrapy import Request, Spider
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.middleware import DetailPageCacheMiddleware
+from city_scrapers.middleware.detail_cache import meeting_cache_ttl
+
+URL = "https://www.pbcchicago.com/events/board-meeting/"
+BODY = b"<html><body>Board Meeting</body></html>"
+DAY = 86400
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+def make_middleware(tmp_path):
+    crawler = get_crawler(
+        ExampleSpider,
+        {
+            "CITY_SCRAPERS_DETAIL_CACHE_ENABLED": True,
+            "CITY_SCRAPERS_DETAIL_CACHE_PATH": str(tmp_path / "detail_cache.db"),
+            "CITY_SCRAPERS_DETAIL_CACHE_TTL_FACTOR": 0.25,
+            "CITY_SCRAPERS_DETAIL_CACHE_MAX_TTL": 28,
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    return DetailPageCacheMiddleware.from_crawler(crawler), spider
+
+
+def fetch(mw, spider, request):
+    response = mw.process_request(request, spider)
+    if response is None:
+        response = HtmlResponse(request.url, body=BODY, request=request)
+    return mw.process_response(request, response, spider)
+
+
+def test_disabled():
+    with pytest.raises(NotConfigured):
+        DetailPageCacheMiddleware.from_crawler(get_crawler(Spider))
+
+
+def test_meeting_cache_ttl():
+    now = datetime(2024, 6, 1, 12)
+    assert meeting_cache_ttl(now + timedelta(days=1), now, 0.25, 28 * DAY) == 0
+    assert meeting_cache_ttl(now - timedelta(days=4), now, 0.25, 28 * DAY) == DAY
+    assert meeting_cache_ttl(date(2024, 5, 4), now, 0.25, 28 * DAY) == pytest.approx(
+        7.125 * DAY
+    )
+    assert meeting_cache_ttl(now - timedelta(days=365), now, 0.25, 28 * DAY) == (
+        28 * DAY
+    )
+
+
+def test_caches_past_meeting(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    start = datetime.now() - timedelta(days=60)
+    first = fetch(mw, spider, Request(URL, meta={"meeting_start": start}))
+    assert "cached" not in first.flags
+
+    request = Request(URL, meta={"meeting_start": start}, dont_filter=True)
+    response = mw.process_request(request, spider)
+    assert isinstance(response, HtmlResponse)
+    assert response.body == BODY
+    assert response.request is request
+    assert "cached" in response.flags
+    assert mw.process_response(request, response, spider) is response
+
+    stats = mw.stats.get_stats(spider)
+    assert stats["detail_cache/stored"] == 1
+    assert stats["detail_cache/hits"] == 1
+
+
+def test_refetches_expired_page(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    start = datetime.now() - timedelta(days=8)
+    fetch(mw, spider, Request(URL, meta={"meeting_start": start}))
+    with mw.store.conn:
+        mw.store.conn.execute("UPDATE pages SET stored_at = stored_at - ?", (3 * DAY,))
+    assert mw.process_request(Request(URL, meta={"meeting_start": start}), spider) is (
+        None
+    )
+    assert mw.stats.get_value("detail_cache/misses", spider=spider) == 2
+
+
+def test_fetches_upcoming_and_uncached(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    upcoming = datetime.now() + timedelta(days=7)
+    fetch(mw, spider, Request(URL, meta={"meeting_start": upcoming}))
+    assert mw.process_request(
+        Request(URL, meta={"meeting_start": upcoming}), spider
+    ) is (None)
+
+    past = {"meeting_start": datetime.now() - timedelta(days=60)}
+    fetch(mw, spider, Request(URL + "?no-cache", meta={**past, "dont_cache": True}))
+    assert mw.process_request(Request(URL + "?no-cache", meta=past), spider) is None
+    fetch(mw, spider, Request(URL + "?no-start"))
+    assert mw.process_request(Request(URL + "?no-start", meta=past), spider) is None
+
+
+def test_prunes_old_pages(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    start = datetime.now() - timedelta(days=365)
+    fetch(mw, spider, Request(URL, meta={"meeting_start": start}))
+    with mw.store.conn:
+        mw.store.conn.execute("UPDATE pages SET stored_at = stored_at - ?", (30 * DAY,))
+    mw.store.prune(mw.max_ttl)
+    assert mw.process_request(Request(URL, meta={"meeting_start": start}), spider) is (
+        None
+    )
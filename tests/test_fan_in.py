@@ -0,0 +1,111 @@
+from city_scrapers_core.spiders import CityScrapersSpider
+from scrapy import Request, signals
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+
+from city_scrapers.mixins import FanInMixin
+
+URLS = ["https://www.example.com/a", "https://www.example.com/b"]
+
+
+class ExampleSpider(FanInMixin, CityScrapersSpider):
+    name = "example"
+    agency = "Example Agency"
+    timezone = "America/Chicago"
+
+    def merge(self, *responses, label=None):
+        yield {"label": label, "responses": responses}
+
+
+def respond(request):
+    return HtmlResponse(request.url, body=b"<html></html>", request=request)
+
+
+def fail(request):
+    failure = Failure(ValueError("error"))
+    failure.request = request
+    return failure
+
+
+def test_fan_in_requests():
+    spider = ExampleSpider()
+    requests = spider.fan_in([Request(url) for url in URLS], spider.merge)
+    assert [request.url for request in requests] == URLS
+    assert all(request.dont_filter for request in requests)
+    assert all(request.callback == spider._fan_in_response for request in requests)
+    assert [request.meta["fan_in"][1] for request in requests] == [0, 1]
+
+
+def test_merges_once_all_finished():
+    spider = ExampleSpider()
+    first, second = spider.fan_in(
+        [Request(url) for url in URLS], spider.merge, cb_kwargs={"label": "x"}
+    )
+    second_response = respond(second)
+    assert list(spider._fan_in_response(second_response)) == []
+    first_response = respond(first)
+    output = list(spider._fan_in_response(first_response))
+    assert output == [{"label": "x", "responses": (first_response, second_response)}]
+    assert spider._fan_ins == {}
+
+
+def test_skips_merge_when_requests_fail():
+    spider = ExampleSpider()
+    first, second = spider.fan_in([Request(url) for url in URLS], spider.merge)
+    assert list(spider._fan_in_response(respond(first))) == []
+    assert list(spider._fan_in_error(fail(second))) == []
+
+
+def test_allow_failures():
+    spider = ExampleSpider()
+    first, second = spider.fan_in(
+        [Request(url) for url in URLS], spider.merge, allow_failures=True
+    )
+    first_response = respond(first)
+    spider._fan_in_response(first_response)
+    output = list(spider._fan_in_error(fail(second)))
+    assert output[0]["responses"] == (first_response, None)
+
+
+def test_no_requests_merges_immediately():
+    spider = ExampleSpider()
+    output = list(spider.fan_in([], spider.merge, cb_kwargs={"label": "x"}))
+    assert output == [{"label": "x", "responses": ()}]
+
+
+def test_drops_unknown_join():
+    spider = ExampleSpider()
+    request = Request(URLS[0], meta={"fan_in": ("unknown", 0)})
+    assert list(spider._fan_in_response(respond(request))) == []
+
+
+def test_dropped_request_fails_join(caplog):
+    crawler = get_crawler(ExampleSpider)
+    spider = crawler._create_spider()
+    first, second, third = spider.fan_in(
+        [Request(url) for url in URLS + ["https://www.example.com/c"]],
+        spider.merge,
+        allow_failures=True,
+    )
+    crawler.signals.send_catch_log(
+        signals.request_dropped, request=first, spider=spider
+    )
+    output = list(spider._fan_in_response(respond(second)))
+    assert output == []
+    crawler.signals.send_catch_log(
+        signals.request_dropped, request=third, spider=spider
+    )
+    assert spider._fan_ins == {}
+    assert "Skipping merge since the last of its requests was dropped" in caplog.text
+
+
+def test_logs_unfinished_joins(caplog):
+    crawler = get_crawler(ExampleSpider)
+    spider = crawler._create_spider()
+    first, _ = spider.fan_in([Request(url) for url in URLS], spider.merge)
+    spider._fan_in_response(respond(first))
+    crawler.signals.send_catch_log(
+        signals.spider_closed, spider=spider, reason="finished"
+    )
+    assert "Skipping merge since 1 of 2 requests never finished" in caplog.text
@@ -0,0 +1,64 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from scrapy.settings import Settings
+from scrapy_playwright.handler import Config
+
+from city_scrapers import handlers
+from city_scrapers.handlers import SharedBrowserPool, SharedBrowserProvider
+
+
+def mock_playwright(monkeypatch):
+    playwright = MagicMock()
+    playwright.firefox.launch = AsyncMock(
+        side_effect=lambda **kwargs: MagicMock(close=AsyncMock())
+    )
+    playwright.stop = AsyncMock()
+    start = AsyncMock(return_value=playwright)
+    monkeypatch.setattr(handlers, "async_playwright", lambda: MagicMock(start=start))
+    return playwright, start
+
+
+def test_shared_browser_pool(monkeypatch):
+    playwright, _ = mock_playwright(monkeypatch)
+    pool = SharedBrowserPool()
+
+    async def get_browsers():
+        first = await pool.get_browser("firefox", {})
+        second = await pool.get_browser("firefox", {})
+        assert first is second
+        first.is_connected.return_value = False
+        third = await pool.get_browser("firefox", {})
+        assert third is not first
+        await pool.close()
+
+    asyncio.run(get_browsers())
+    assert playwright.firefox.launch.await_count == 2
+    playwright.stop.assert_awaited_once()
+
+
+def test_shared_browser_provider(monkeypatch):
+    playwright, start = mock_playwright(monkeypatch)
+    monkeypatch.setattr(handlers, "shared_browsers", SharedBrowserPool())
+    config = Config.from_settings(Settings({"PLAYWRIGHT_BROWSER_TYPE": "firefox"}))
+
+    async def crawl():
+        browsers = []
+        for _ in range(2):
+            provider = SharedBrowserProvider(config)
+            await provider.start()
+            browser = await provider.launch_browser()
+            callback = MagicMock()
+            browser.on("disconnected", callback)
+            await browser.close()
+            await provider.close()
+            browser.browser.remove_listener.assert_called_with("disconnected", callback)
+            browsers.append(browser.browser)
+        return browsers
+
+    first, second = asyncio.run(crawl())
+    # One driver and browser for both crawlers, which are left running
+    assert first is second
+    start.assert_awaited_once()
+    first.close.assert_not_awaited()
+    playwright.stop.assert_not_awaited()
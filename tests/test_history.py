@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.commands.history import Command
+from city_scrapers.extensions import RunHistoryExtension
+from city_scrapers.history import RunHistory
+
+START = datetime(2026, 1, 5, 8, 12, tzinfo=timezone.utc)
+
+
+def run_stats(start, elapsed, reason="finished"):
+    return {
+        "start_time": start,
+        "finish_time": start + timedelta(seconds=elapsed),
+        "elapsed_time_seconds": elapsed,
+        "downloader/request_count": 12,
+        "downloader/response_bytes": 34567,
+        "item_scraped_count": 8,
+        "finish_reason": reason,
+        "memusage/max": 104857600,
+    }
+
+
+def test_record_and_query(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    history.record("chi_schools", run_stats(START, 120))
+    history.record("chi_schools", run_stats(START + timedelta(days=1), 130))
+    history.record("chi_schools", run_stats(START + timedelta(days=2), 5, "shutdown"))
+    history.record("chi_transit", run_stats(START, 40))
+
+    runs = history.runs("chi_schools")
+    assert [run["wall_time"] for run in runs] == [5, 130, 120]
+    assert runs[0] == {
+        "id": 3,
+        "spider": "chi_schools",
+        "start_time": "2026-01-07T08:12:00+00:00",
+        "finish_time": "2026-01-07T08:12:05+00:00",
+        "wall_time": 5,
+        "request_count": 12,
+        "response_bytes": 34567,
+        "item_count": 8,
+        "error_count": None,
+        "finish_reason": "shutdown",
+        "peak_memory": 104857600,
+        "next_meeting": None,
+        "attempt": 1,
+    }
+    assert len(history.runs(limit=2)) == 2
+    assert history.runtimes() == {"chi_schools": [120, 130], "chi_transit": [40]}
+
+
+def test_scheduling_queries(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    history.record("chi_schools", run_stats(START, 120), datetime(2026, 1, 20, 17))
+    history.record("chi_schools", run_stats(START + timedelta(days=1), 5, "shutdown"))
+    history.record("chi_transit", run_stats(START, 40, "shutdown"))
+    assert history.last_finished() == {"chi_schools": datetime(2026, 1, 5, 8, 14)}
+    assert history.next_meetings() == {"chi_schools": datetime(2026, 1, 20, 17)}
+
+
+def test_wall_time_without_elapsed(tmp_path):
+    history = RunHistory(str(tmp_path / "history.db"))
+    stats = run_stats(START, 75)
+    del stats["elapsed_time_seconds"]
+    history.record("chi_schools", stats)
+    assert history.runs()[0]["wall_time"] == 75
+
+
+def test_extension_records_run(tmp_path):
+    path = str(tmp_path / "history.db")
+    crawler = get_crawler(
+        Spider, {"CITY_SCRAPERS_HISTORY_PATH": path, "CITY_SCRAPERS_CRAWL_ATTEMPT": 2}
+    )
+    spider = Spider("chi_schools")
+    crawler.stats.open_spider(spider)
+    crawler.stats.set_value("start_time", START)
+    crawler.stats.set_value("log_count/ERROR", 2)
+    extension = RunHistoryExtension.from_crawler(crawler)
+    next_meeting = datetime.now().replace(microsecond=0) + timedelta(days=3)
+    for start in [next_meeting + timedelta(days=7), next_meeting, datetime(2020, 1, 1)]:
+        extension.item_scraped({"title": "Board", "start": start})
+    extension.spider_closed(spider, "closespider_errorcount")
+
+    run = RunHistory(path).runs()[0]
+    assert run["spider"] == "chi_schools"
+    assert run["error_count"] == 2
+    assert run["finish_reason"] == "closespider_errorcount"
+    assert run["peak_memory"] > 0
+    assert run["next_meeting"] == next_meeting.isoformat()
+    assert run["attempt"] == 2
+    assert "finish_reason" not in crawler.stats.get_stats()
+
+
+def test_slower_command(tmp_path, capsys):
+    history = RunHistory(str(tmp_path / "history.db"))
+    for idx, elapsed in enumerate([100, 110, 90, 250]):
+        history.record("chi_schools", run_stats(START + timedelta(days=idx), elapsed))
+    for idx, elapsed in enumerate([40, 45]):
+        history.record("chi_transit", run_stats(START + timedelta(days=idx), elapsed))
+    Command()._print_slower(history, 2)
+    assert capsys.readouterr().out == (
+        "chi_schools: 250.0s, 2.5x the median of 100.0s\n"
+    )
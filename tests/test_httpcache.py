@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+from scrapy import Request, Spider
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.httpcache import ContentAddressedCacheStorage
+
+URL = "https://www.chicago.gov/city/en/depts/dcd/supp_info/meetings.html"
+BODY = b"<html><body>" + b"Meetings " * 100 + b"</body></html>"
+DAY = 86400
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+def make_storage(tmp_path, **settings):
+    crawler = get_crawler(
+        ExampleSpider,
+        {
+            "HTTPCACHE_DIR": str(tmp_path / "httpcache"),
+            "CITY_SCRAPERS_HTTPCACHE_GC_DAYS": 30,
+            **settings,
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    storage = ContentAddressedCacheStorage(crawler.settings)
+    storage.open_spider(spider)
+    return storage, spider
+
+
+def age_responses(storage, days):
+    with storage.conn:
+        storage.conn.execute(
+            "UPDATE responses SET stored_at = stored_at - ?", (days * DAY,)
+        )
+        storage.conn.execute(
+            "UPDATE bodies SET last_used = last_used - ?", (days * DAY,)
+        )
+
+
+def test_stores_bodies_once(tmp_path):
+    storage, spider = make_storage(tmp_path)
+    response = HtmlResponse(URL, body=BODY, headers={"Content-Type": "text/html"})
+    storage.store_response(spider, Request(URL), response)
+    storage.store_response(spider, Request(URL + "?page=2"), response)
+
+    cached = storage.retrieve_response(spider, Request(URL))
+    assert isinstance(cached, HtmlResponse)
+    assert cached.body == BODY
+    assert cached.headers["Content-Type"] == b"text/html"
+    assert storage.retrieve_response(spider, Request(URL + "?page=3")) is None
+
+    stats = storage.stats()
+    assert stats["responses"] == 2
+    assert stats["bodies"] == 1
+    assert stats["dedupe_ratio"] == 2
+    assert stats["stored_size"] < stats["unique_size"] == len(BODY)
+    assert len(os.listdir(tmp_path / "httpcache" / "bodies")) == 1
+
+
+def test_serves_latest_response(tmp_path):
+    storage, spider = make_storage(tmp_path, HTTPCACHE_EXPIRATION_SECS=DAY)
+    storage.store_response(spider, Request(URL), HtmlResponse(URL, body=b"old"))
+    age_responses(storage, 2)
+    assert storage.retrieve_response(spider, Request(URL)) is None
+    storage.store_response(spider, Request(URL), HtmlResponse(URL, body=b"new"))
+    assert storage.retrieve_response(spider, Request(URL)).body == b"new"
+
+
+def test_gc_removes_old_responses_and_bodies(tmp_path):
+    storage, spider = make_storage(tmp_path)
+    storage.store_response(spider, Request(URL), HtmlResponse(URL, body=b"old"))
+    storage.store_response(spider, Request(URL + "?a"), HtmlResponse(URL, body=BODY))
+    age_responses(storage, 40)
+    storage.store_response(spider, Request(URL + "?b"), HtmlResponse(URL, body=BODY))
+    old_path = storage.body_path(hashlib.sha256(b"old").hexdigest())
+
+    storage.close_spider(spider)
+    assert not os.path.exists(old_path)
+    stats = spider.crawler.stats
+    assert stats.get_value("httpcache/storage/responses", spider=spider) == 1
+    assert stats.get_value("httpcache/storage/bodies", spider=spider) == 1
+
+    storage.open_spider(spider)
+    assert storage.retrieve_response(spider, Request(URL)) is None
+    assert storage.retrieve_response(spider, Request(URL + "?b")).body == BODY
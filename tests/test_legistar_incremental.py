@@ -0,0 +1,114 @@
+from city_scrapers_core.spiders import LegistarSpider
+from freezegun import freeze_time
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.mixins import IncrementalLegistarMixin
+
+URL = "https://example.legistar.com/Calendar.aspx"
+PAGE = """
+<html><body>
+<input name="__VIEWSTATE" value="state">
+<table class="rgMasterTable">
+<thead><tr>
+<th class="rgHeader">Name</th><th class="rgHeader">Meeting Date</th>
+<th class="rgHeader">Meeting Time</th><th class="rgHeader">Agenda</th>
+<th class="rgHeader"><input value="ics"></th>
+</tr></thead>
+<tbody>{}</tbody>
+</table>
+</body></html>
+"""
+ROW = """
+<tr class="rgRow">
+<td><a href="MeetingDetail.aspx?ID={id}">{name}</a></td><td>{date}</td>
+<td>9:30 AM</td><td>{agenda}</td>
+<td><a href="View.ashx?M=IC&amp;ID={id}">Export</a></td>
+</tr>
+"""
+
+
+class ExampleLegistarSpider(IncrementalLegistarMixin, LegistarSpider):
+    name = "example_legistar"
+    start_urls = [URL]
+
+    def parse_legistar(self, events):
+        yield from events
+
+
+def make_spider(tmp_path, **settings):
+    crawler = get_crawler(
+        ExampleLegistarSpider,
+        {
+            "CITY_SCRAPERS_LEGISTAR_INCREMENTAL": True,
+            "CITY_SCRAPERS_LEGISTAR_PATH": str(tmp_path / "legistar.db"),
+            **settings,
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    return spider
+
+
+def make_response(*rows):
+    body = PAGE.format("".join(ROW.format(**row) for row in rows))
+    return HtmlResponse(URL, body=body, encoding="utf-8")
+
+
+BOARD = {"id": 1, "name": "Board", "date": "6/5/2024", "agenda": "Not available"}
+COMMITTEE = {"id": 2, "name": "Committee", "date": "6/6/2024", "agenda": ""}
+
+
+def parse_page(spider, response):
+    return [
+        event
+        for event in spider._parse_legistar_events_page(response)
+        if isinstance(event, dict)
+    ]
+
+
+@freeze_time("2024-06-01")
+def test_requests_window_years(tmp_path):
+    spider = make_spider(tmp_path)
+    assert len(list(spider.parse(make_response()))) == 1
+
+    spider = make_spider(tmp_path, CITY_SCRAPERS_ARCHIVE=True)
+    assert len(list(spider.parse(make_response()))) == 2
+
+
+@freeze_time("2024-02-01")
+def test_requests_previous_year_in_window(tmp_path):
+    spider = make_spider(tmp_path)
+    assert len(list(spider.parse(make_response()))) == 2
+
+
+def test_reuses_unchanged_rows(tmp_path):
+    spider = make_spider(tmp_path)
+    events = parse_page(spider, make_response(BOARD, COMMITTEE))
+    assert [event["Name"]["label"] for event in events] == ["Board", "Committee"]
+    assert events[0]["iCalendar"]["url"] == (
+        "https://example.legistar.com/View.ashx?M=IC&ID=1"
+    )
+    assert spider.crawler.stats.get_value("legistar/parsed_events") == 2
+    spider.closed("finished")
+
+    spider = make_spider(tmp_path)
+    updated = {**COMMITTEE, "agenda": '<a href="View.ashx?M=A&amp;ID=2">Agenda</a>'}
+    reused_events = parse_page(spider, make_response(BOARD, updated))
+    assert reused_events[0] == events[0]
+    assert reused_events[1]["Agenda"]["url"] == (
+        "https://example.legistar.com/View.ashx?M=A&ID=2"
+    )
+    stats = spider.crawler.stats
+    assert stats.get_value("legistar/reused_events") == 1
+    assert stats.get_value("legistar/parsed_events") == 1
+
+    # Events on more than one page are only returned once
+    assert parse_page(spider, make_response(BOARD)) == []
+    spider.closed("finished")
+
+
+def test_not_incremental(tmp_path):
+    spider = make_spider(tmp_path, CITY_SCRAPERS_LEGISTAR_INCREMENTAL=False)
+    assert len(parse_page(spider, make_response(BOARD, COMMITTEE))) == 2
+    assert not (tmp_path / "legistar.db").exists()
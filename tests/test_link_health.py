@@ -0,0 +1,160 @@
+import pytest
+from city_scrapers_core.items import Meeting
+from scrapy import Spider
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Response
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred
+
+from city_scrapers.pipelines import LinkHealthPipeline
+from city_scrapers.pipelines.link_health import SHARED_CHECKS
+
+AGENDA = "https://www.example.com/agenda.pdf"
+MINUTES = "https://www.example.com/minutes.pdf"
+OTHER = "https://docs.example.org/video"
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_checks():
+    for checks in SHARED_CHECKS.values():
+        checks.clear()
+    yield
+    for checks in SHARED_CHECKS.values():
+        checks.clear()
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+class FakeEngine:
+    def __init__(self):
+        self.downloads = []
+
+    def download(self, request):
+        self.downloads.append((request, Deferred()))
+        return self.downloads[-1][1]
+
+
+def make_pipeline(tmp_path, **settings):
+    crawler = get_crawler(
+        ExampleSpider,
+        {
+            "CITY_SCRAPERS_LINK_HEALTH_ENABLED": True,
+            "CITY_SCRAPERS_LINK_HEALTH_TTL": 7,
+            "CITY_SCRAPERS_LINK_HEALTH_HOST_CONCURRENCY": 1,
+            "CITY_SCRAPERS_LINK_PROBE_PATH": str(tmp_path / "links.db"),
+            **settings,
+        },
+    )
+    crawler.engine = FakeEngine()
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    return LinkHealthPipeline.from_crawler(crawler), spider
+
+
+def meeting(*hrefs):
+    return Meeting(
+        title="Board", links=[{"href": href, "title": "Doc"} for href in hrefs]
+    )
+
+
+def respond(pipeline, url, status):
+    for request, d in pipeline.crawler.engine.downloads:
+        if request.url == url and not d.called:
+            d.callback(Response(url, status=status, request=request))
+            return
+
+
+def process(pipeline, spider, item):
+    results = []
+    pipeline.process_item(item, spider).addCallback(results.append)
+    return results
+
+
+def test_annotate(tmp_path):
+    pipeline, spider = make_pipeline(tmp_path)
+    first = process(pipeline, spider, meeting(AGENDA, MINUTES, OTHER, "mailto:a@b"))
+    second = process(pipeline, spider, meeting(AGENDA))
+    # One check of www.example.com at a time
+    assert [r.url for r, _ in pipeline.crawler.engine.downloads] == [AGENDA, OTHER]
+    respond(pipeline, AGENDA, 200)
+    respond(pipeline, OTHER, 200)
+    respond(pipeline, MINUTES, 404)
+    assert first[0]["links"] == [
+        {"href": AGENDA, "title": "Doc", "status": 200},
+        {"href": MINUTES, "title": "Doc", "status": 404},
+        {"href": OTHER, "title": "Doc", "status": 200},
+        {"href": "mailto:a@b", "title": "Doc"},
+    ]
+    assert second[0]["links"] == [{"href": AGENDA, "title": "Doc", "status": 200}]
+    stats = pipeline.crawler.stats
+    assert stats.get_value("link_health/checked") == 3
+    assert stats.get_value("link_health/ok") == 2
+    assert stats.get_value("link_health/dead") == 1
+    assert stats.get_value("link_health/dead_links") == 1
+    pipeline.prober.spider_closed(spider)
+
+    pipeline, spider = make_pipeline(tmp_path)
+    assert process(pipeline, spider, meeting(AGENDA, MINUTES))[0]["links"] == [
+        {"href": AGENDA, "title": "Doc", "status": 200},
+        {"href": MINUTES, "title": "Doc", "status": 404},
+    ]
+    assert pipeline.crawler.engine.downloads == []
+    pipeline.prober.spider_closed(spider)
+
+
+def test_drop(tmp_path):
+    pipeline, spider = make_pipeline(tmp_path, CITY_SCRAPERS_LINK_HEALTH_ACTION="drop")
+    result = process(pipeline, spider, meeting(AGENDA, OTHER))
+    respond(pipeline, AGENDA, 410)
+    respond(pipeline, OTHER, 200)
+    assert result[0]["links"] == [{"href": OTHER, "title": "Doc", "status": 200}]
+    assert pipeline.crawler.stats.get_value("link_health/dropped") == 1
+    pipeline.prober.spider_closed(spider)
+
+
+def test_unreachable_kept(tmp_path):
+    pipeline, spider = make_pipeline(tmp_path, CITY_SCRAPERS_LINK_HEALTH_ACTION="drop")
+    result = process(pipeline, spider, meeting(AGENDA))
+    pipeline.crawler.engine.downloads[0][1].errback(ConnectionError())
+    pipeline.crawler.engine.downloads[1][1].errback(ConnectionError())
+    assert result[0]["links"] == [{"href": AGENDA, "title": "Doc", "status": None}]
+    stats = pipeline.crawler.stats
+    assert stats.get_value("link_health/unreachable") == 1
+    assert stats.get_value("link_health/dropped") is None
+    assert pipeline.prober.store.get(AGENDA) is None
+    # Checked again instead of remembering the failure
+    process(pipeline, spider, meeting(AGENDA))
+    assert len(pipeline.crawler.engine.downloads) == 3
+    pipeline.prober.spider_closed(spider)
+
+
+def test_shared_between_spiders(tmp_path):
+    first, first_spider = make_pipeline(tmp_path)
+    second, second_spider = make_pipeline(tmp_path)
+    first_result = process(first, first_spider, meeting(AGENDA))
+    second_result = process(second, second_spider, meeting(AGENDA, MINUTES))
+    # MINUTES waits for the check of AGENDA on the same host from the first spider
+    assert [r.url for r, _ in first.crawler.engine.downloads] == [AGENDA]
+    assert second.crawler.engine.downloads == []
+    respond(first, AGENDA, 200)
+    assert [r.url for r, _ in second.crawler.engine.downloads] == [MINUTES]
+    respond(second, MINUTES, 200)
+    assert first_result[0]["links"][0]["status"] == 200
+    assert [link["status"] for link in second_result[0]["links"]] == [200, 200]
+    assert second.crawler.stats.get_value("link_health/checked") == 2
+    first.prober.spider_closed(first_spider)
+    second.prober.spider_closed(second_spider)
+
+
+def test_no_links(tmp_path):
+    pipeline, spider = make_pipeline(tmp_path)
+    item = meeting()
+    assert pipeline.process_item(item, spider) is item
+    pipeline.prober.spider_closed(spider)
+
+
+def test_disabled():
+    with pytest.raises(NotConfigured):
+        LinkHealthPipeline.from_crawler(get_crawler(ExampleSpider))
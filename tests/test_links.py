@@ -0,0 +1,127 @@
+from scrapy import Spider
+from scrapy.http import Response
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred
+
+from city_scrapers.links import LinkProber, link_exists, link_missing
+
+URL = "https://www.chipublib.org/news/board-of-directors-meeting-agenda/"
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+class FakeEngine:
+    def __init__(self):
+        self.downloads = []
+
+    def download(self, request):
+        self.downloads.append((request, Deferred()))
+        return self.downloads[-1][1]
+
+
+def make_prober(tmp_path, cache=True):
+    crawler = get_crawler(
+        ExampleSpider,
+        {
+            "CITY_SCRAPERS_LINK_PROBE_TTL": 24,
+            "CITY_SCRAPERS_LINK_PROBE_CACHE_ENABLED": cache,
+            "CITY_SCRAPERS_LINK_PROBE_PATH": str(tmp_path / "links.db"),
+        },
+    )
+    crawler.engine = FakeEngine()
+    return LinkProber.from_crawler(crawler)
+
+
+def check(prober, url=URL):
+    results = []
+    prober.check(url).addCallback(results.append)
+    return results
+
+
+def respond(prober, index, status):
+    request, d = prober.crawler.engine.downloads[index]
+    d.callback(Response(request.url, status=status, request=request))
+
+
+def test_head(tmp_path):
+    prober = make_prober(tmp_path)
+    first = check(prober)
+    second = check(prober)
+    assert [r.method for r, _ in prober.crawler.engine.downloads] == ["HEAD"]
+    respond(prober, 0, 200)
+    assert first == second == [200]
+    assert check(prober) == [200]
+    assert len(prober.crawler.engine.downloads) == 1
+
+
+def test_get_after_head_fails(tmp_path):
+    prober = make_prober(tmp_path)
+    result = check(prober)
+    respond(prober, 0, 405)
+    assert prober.crawler.engine.downloads[1][0].method == "GET"
+    respond(prober, 1, 200)
+    assert result == [200]
+
+    result = check(prober, URL + "missing/")
+    respond(prober, 2, 404)
+    assert result == [404]
+    assert len(prober.crawler.engine.downloads) == 3
+
+    result = check(prober, URL + "error/")
+    prober.crawler.engine.downloads[3][1].errback(ConnectionError())
+    prober.crawler.engine.downloads[4][1].errback(ConnectionError())
+    assert result == [None]
+
+
+def test_cached_across_runs(tmp_path):
+    prober = make_prober(tmp_path)
+    check(prober)
+    respond(prober, 0, 404)
+    prober.spider_closed(None)
+
+    prober = make_prober(tmp_path)
+    assert check(prober) == [404]
+    assert prober.crawler.engine.downloads == []
+    with prober.store.conn:
+        prober.store.conn.execute("UPDATE links SET checked_at = checked_at - 86400")
+    prober.statuses = {}
+    assert check(prober) == []
+    assert len(prober.crawler.engine.downloads) == 1
+    prober.spider_closed(None)
+
+
+def test_transient_not_kept(tmp_path):
+    prober = make_prober(tmp_path)
+    check(prober)
+    respond(prober, 0, 503)
+    respond(prober, 1, 503)
+    assert prober.store.get(URL) is None
+    check(prober)
+    assert len(prober.crawler.engine.downloads) == 3
+    prober.spider_closed(None)
+
+
+def test_shared_checks_released_on_close(tmp_path):
+    statuses, pending = {}, {}
+    first = make_prober(tmp_path, cache=False)
+    second = make_prober(tmp_path, cache=False)
+    first.statuses = second.statuses = statuses
+    first.pending = second.pending = pending
+    check(first)
+    result = check(second)
+    assert second.crawler.engine.downloads == []
+    first.spider_closed(None)
+    assert result == [None]
+    respond(first, 0, 200)
+    assert statuses == {}
+
+
+def test_link_exists():
+    assert link_exists(200)
+    assert not link_exists(404)
+    assert not link_exists(None)
+    assert link_missing(410)
+    assert not link_missing(None)
+    assert not link_missing(500)
@@ -0,0 +1,113 @@
+import time
+from datetime import datetime, timedelta
+
+from scrapy.http import HtmlResponse, Response
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
+
+from city_scrapers.probe import (
+    CHANGED,
+    UNCHANGED,
+    UNREACHABLE,
+    ProbeSpider,
+    ProbeStore,
+    select_spiders,
+)
+
+URL = "https://example.com/meetings"
+BODY = b"<html><body><p>Meetings</p></body></html>"
+
+
+def make_spider(tmp_path):
+    crawler = get_crawler(
+        ProbeSpider, {"CITY_SCRAPERS_PROBE_PATH": str(tmp_path / "probe.db")}
+    )
+    spider = crawler._create_spider(targets={"example": [URL]})
+    return spider, list(spider.start_requests())
+
+
+def probe(spider, request, status=200, body=BODY, headers=None):
+    response_cls = Response if status == 304 else HtmlResponse
+    spider.parse(
+        response_cls(
+            URL, status=status, body=body, headers=headers or {}, request=request
+        )
+    )
+    return spider.store.statuses(0)["example"]
+
+
+def test_probe_compares_to_last_crawl(tmp_path):
+    spider, [request] = make_spider(tmp_path)
+    assert "If-None-Match" not in request.headers
+    assert probe(spider, request, headers={"ETag": '"v1"'}) == CHANGED
+    spider.store.mark_crawled("example", "version")
+    spider.closed("finished")
+
+    spider, [request] = make_spider(tmp_path)
+    assert request.headers["If-None-Match"] == b'"v1"'
+    assert probe(spider, request, status=304) == UNCHANGED
+    assert probe(spider, request, body=BODY.replace(b"<p>", b"\n <p>")) == UNCHANGED
+    assert probe(spider, request, body=BODY.replace(b"Meetings", b"Other")) == CHANGED
+
+    request_failure = Failure(ValueError("error"))
+    request_failure.request = request
+    spider.parse_error(request_failure)
+    assert spider.store.statuses(0)["example"] == UNREACHABLE
+    spider.closed("finished")
+
+
+def test_statuses(tmp_path):
+    store = ProbeStore(str(tmp_path / "probe.db"))
+    store.set_probe("a", URL, UNCHANGED, None, None, "fp")
+    store.set_probe("a", URL + "/2", CHANGED, None, None, "fp")
+    store.set_probe("b", URL, UNREACHABLE, None, None, None)
+    store.set_probe("b", URL + "/2", CHANGED, None, None, "fp")
+    store.set_probe("c", URL, UNCHANGED, None, None, "fp")
+    assert store.statuses(0) == {"a": CHANGED, "b": UNREACHABLE, "c": UNCHANGED}
+    assert store.statuses(time.time() + 1) == {}
+
+    store.mark_crawled("b", "version")
+    assert list(store.last_crawled()) == ["b"]
+    assert store.baseline("b", URL) is None
+    assert store.baseline("b", URL + "/2")["fingerprint"] == "fp"
+    store.close()
+
+
+def test_select_spiders():
+    now = datetime(2000, 1, 10)
+    crawled_at = (now - timedelta(hours=1)).timestamp()
+    statuses = {
+        "unchanged": UNCHANGED,
+        "changed": CHANGED,
+        "unreachable": UNREACHABLE,
+        "new_code": UNCHANGED,
+        "old": UNCHANGED,
+        "upcoming": UNCHANGED,
+    }
+    last_crawled = {name: ("v1", crawled_at) for name in statuses}
+    last_crawled["old"] = ("v1", crawled_at - 86400 * 2)
+    versions = {name: "v1" for name in statuses}
+    versions["new_code"] = "v2"
+    next_meetings = {
+        "unchanged": now - timedelta(days=1),
+        "upcoming": now + timedelta(days=3),
+    }
+    crawl, skip = select_spiders(
+        list(statuses) + ["not_probed"],
+        statuses,
+        last_crawled,
+        versions,
+        next_meetings,
+        now + timedelta(days=14),
+        86400,
+        now=now,
+    )
+    assert skip == ["unchanged"]
+    assert crawl == [
+        "changed",
+        "unreachable",
+        "new_code",
+        "old",
+        "upcoming",
+        "not_probed",
+    ]
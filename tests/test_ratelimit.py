@@ -0,0 +1,88 @@
+import pytest
+from scrapy import Request, Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred
+
+from city_scrapers.middleware.ratelimit import (
+    HostRateLimiter,
+    HostRateLimitMiddleware,
+    SharedHostRateLimiter,
+)
+
+
+def test_limiter_burst_then_rate():
+    limiter = HostRateLimiter()
+    delays = [limiter.reserve("www.chicago.gov", 2, 2, now=100) for _ in range(4)]
+    assert delays == [0, 0, 0.5, 1.0]
+    assert limiter.reserve("rpba.org", 2, 2, now=100) == 0
+
+
+def test_limiter_refills():
+    limiter = HostRateLimiter()
+    limiter.reserve("www.chicago.gov", 1, 1, now=100)
+    assert limiter.reserve("www.chicago.gov", 1, 1, now=100.25) == 0.75
+    assert limiter.reserve("www.chicago.gov", 1, 1, now=110) == 0
+
+
+def test_shared_limiter(tmp_path):
+    path = str(tmp_path / "host_rate.db")
+    first = SharedHostRateLimiter(path)
+    second = SharedHostRateLimiter(path)
+    assert first.reserve("www.chicago.gov", 1, 1, now=100) == 0
+    assert second.reserve("www.chicago.gov", 1, 1, now=100) == 1
+    assert first.reserve("www.chicago.gov", 1, 1, now=100) == 2
+
+
+def test_shared_limiter_failed_reservation(tmp_path):
+    path = str(tmp_path / "host_rate.db")
+    first = SharedHostRateLimiter(path)
+    first.reserve("www.chicago.gov", 1, 1, now=100)
+    with pytest.raises(ZeroDivisionError):
+        first.reserve("www.chicago.gov", 0, 1, now=100)
+    assert not first.conn.in_transaction
+    second = SharedHostRateLimiter(path)
+    assert second.reserve("www.chicago.gov", 1, 1, now=100) == 1
+
+
+def make_middleware(settings=None):
+    crawler = get_crawler(
+        Spider,
+        {
+            "CITY_SCRAPERS_HOST_RATE_LIMIT": 1,
+            "CITY_SCRAPERS_HOST_RATE_DOMAINS": ["legistar.com"],
+            **(settings or {}),
+        },
+    )
+    crawler.stats.open_spider(None)
+    return HostRateLimitMiddleware(crawler, HostRateLimiter())
+
+
+def test_get_host():
+    middleware = make_middleware()
+    assert (
+        middleware.get_host(Request("https://cook-county.legistar.com/Calendar.aspx"))
+        == "legistar.com"
+    )
+    assert (
+        middleware.get_host(Request("https://WWW.chicago.gov/city/en.html"))
+        == "www.chicago.gov"
+    )
+
+
+def test_process_request_delays():
+    middleware = make_middleware()
+    spider = Spider("test")
+    request = Request("https://www.chicago.gov/city/en.html")
+    assert middleware.process_request(request, spider) is None
+    delayed = middleware.process_request(request, spider)
+    assert isinstance(delayed, Deferred)
+    delayed.cancel()
+    delayed.addErrback(lambda _: None)
+    assert middleware.crawler.stats.get_value("host_rate/delayed_count") == 1
+
+
+def test_process_request_host_override():
+    middleware = make_middleware({"CITY_SCRAPERS_HOST_RATE_LIMITS": {"rpba.org": 0}})
+    spider = Spider("test")
+    for _ in range(3):
+        assert middleware.process_request(Request("https://rpba.org/"), spider) is None
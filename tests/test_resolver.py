@@ -0,0 +1,103 @@
+from scrapy import Spider
+from scrapy.resolver import CachingThreadedResolver
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer
+from twisted.names import dns
+
+from city_scrapers.resolver import DnsCacheStore, PersistentCachingResolver, start_hosts
+from city_scrapers.spiders.chi_buildings import ChiBuildingsSpider
+
+
+class FakeNamesResolver:
+    def __init__(self, answers):
+        self.answers = answers
+        self.lookups = []
+        self.pending = []
+
+    def lookupAddress(self, name, timeout=None):
+        self.lookups.append(name)
+        d = defer.Deferred()
+        self.pending.append((d, (self.answers, [], [])))
+        return d
+
+    def finish(self):
+        for d, result in self.pending:
+            d.callback(result)
+        self.pending = []
+
+
+def a_record(address, ttl):
+    return dns.RRHeader(
+        "example.com", type=dns.A, ttl=ttl, payload=dns.Record_A(address, ttl)
+    )
+
+
+def make_resolver(tmp_path, answers, min_ttl=0):
+    resolver = PersistentCachingResolver(
+        None,
+        100,
+        60,
+        store=DnsCacheStore(str(tmp_path / "dns.db")),
+        min_ttl=min_ttl,
+    )
+    resolver._names_resolver = FakeNamesResolver(answers)
+    return resolver
+
+
+def resolved(d):
+    results = []
+    d.addBoth(results.append)
+    return results[0]
+
+
+def test_lookup_persisted(tmp_path):
+    resolver = make_resolver(tmp_path, [a_record("10.0.0.1", 600)])
+    first = resolver.getHostByName("example.com")
+    second = resolver.getHostByName("example.com")
+    resolver._names_resolver.finish()
+    assert resolved(first) == "10.0.0.1"
+    assert resolved(second) == "10.0.0.1"
+    assert resolver._names_resolver.lookups == ["example.com"]
+    address, expires_at = resolver.store.get("example.com")
+    assert address == "10.0.0.1"
+
+    other = make_resolver(tmp_path, [])
+    assert resolved(other.getHostByName("example.com")) == "10.0.0.1"
+    assert other._names_resolver.lookups == []
+
+
+def test_min_ttl(tmp_path):
+    resolver = make_resolver(tmp_path, [a_record("10.0.0.1", 0)])
+    d = resolver.getHostByName("example.com")
+    resolver._names_resolver.finish()
+    assert resolved(d) == "10.0.0.1"
+    assert resolver.store.get("example.com") is None
+
+    resolver = make_resolver(tmp_path, [a_record("10.0.0.1", 0)], min_ttl=300)
+    d = resolver.getHostByName("example.com")
+    resolver._names_resolver.finish()
+    assert resolver.store.get("example.com")[0] == "10.0.0.1"
+
+
+def test_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        CachingThreadedResolver,
+        "getHostByName",
+        lambda self, name, timeout=None: defer.succeed("10.0.0.2"),
+    )
+    resolver = make_resolver(tmp_path, [], min_ttl=300)
+    d = resolver.getHostByName("example.com")
+    resolver._names_resolver.finish()
+    assert resolved(d) == "10.0.0.2"
+    assert resolver.store.get("example.com")[0] == "10.0.0.2"
+
+
+def test_disabled():
+    crawler = get_crawler(Spider, {"CITY_SCRAPERS_DNS_CACHE_ENABLED": False})
+    resolver = PersistentCachingResolver.from_crawler(crawler, None)
+    assert resolver.store is None
+
+
+def test_start_hosts():
+    assert start_hosts(ChiBuildingsSpider) == {"www.pbcchicago.com"}
+    assert start_hosts(Spider) == set()
@@ -0,0 +1,116 @@
+from scrapy import Request, Spider
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred
+
+from city_scrapers.middleware import CachedRobotsTxtMiddleware
+
+ROBOTS_URL = "https://www.chicago.gov/robots.txt"
+ROBOTS = b"User-agent: *\nDisallow: /private\n"
+DAY = 86400
+
+
+class ExampleSpider(Spider):
+    name = "example"
+
+
+class FakeEngine:
+    def __init__(self):
+        self.downloads = []
+
+    def download(self, request):
+        self.downloads.append((request, Deferred()))
+        return self.downloads[-1][1]
+
+
+def make_middleware(tmp_path, enabled=True):
+    crawler = get_crawler(
+        ExampleSpider,
+        {
+            "ROBOTSTXT_OBEY": True,
+            "CITY_SCRAPERS_ROBOTSTXT_CACHE_ENABLED": enabled,
+            "CITY_SCRAPERS_ROBOTSTXT_CACHE_PATH": str(tmp_path / "robotstxt.db"),
+            "CITY_SCRAPERS_ROBOTSTXT_CACHE_TTL": 1,
+            "CITY_SCRAPERS_ROBOTSTXT_CACHE_MAX_STALE": 7,
+        },
+    )
+    crawler.engine = FakeEngine()
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    return CachedRobotsTxtMiddleware.from_crawler(crawler), spider
+
+
+def check(mw, spider, url):
+    """Return whether a request is allowed, or None if it's still waiting"""
+    results = []
+    d = mw.process_request(Request(url), spider)
+    d.addCallbacks(lambda _: results.append(True), lambda _: results.append(False))
+    return results[0] if results else None
+
+
+def respond(mw, index=0, body=ROBOTS, status=200):
+    request, d = mw.crawler.engine.downloads[index]
+    d.callback(TextResponse(request.url, body=body, status=status, request=request))
+
+
+def age_cache(mw, days):
+    with mw.store.conn:
+        mw.store.conn.execute(
+            "UPDATE robots SET fetched_at = fetched_at - ?", (days * DAY,)
+        )
+
+
+def test_disabled_fetches_robots(tmp_path):
+    mw, spider = make_middleware(tmp_path, enabled=False)
+    assert mw.store is None
+    assert check(mw, spider, "https://www.chicago.gov/private/page") is None
+    respond(mw)
+    assert check(mw, spider, "https://www.chicago.gov/private/page") is False
+    assert not (tmp_path / "robotstxt.db").exists()
+
+
+def test_shares_cached_robots(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    assert check(mw, spider, "https://www.chicago.gov/page") is None
+    assert mw.crawler.engine.downloads[0][0].url == ROBOTS_URL
+    respond(mw)
+
+    other_mw, other_spider = make_middleware(tmp_path)
+    assert check(other_mw, other_spider, "https://www.chicago.gov/page") is True
+    assert check(other_mw, other_spider, "https://www.chicago.gov/private/1") is False
+    assert other_mw.crawler.engine.downloads == []
+    assert other_mw.crawler.stats.get_value("robotstxt/cache_hits") == 1
+
+
+def test_server_errors_not_cached(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    check(mw, spider, "https://www.chicago.gov/page")
+    respond(mw, body=b"", status=503)
+    assert mw.store.get("www.chicago.gov") is None
+
+
+def test_refreshes_stale_robots_in_background(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    mw.store.set("www.chicago.gov", ROBOTS)
+    age_cache(mw, 2)
+
+    assert check(mw, spider, "https://www.chicago.gov/private/1") is False
+    assert len(mw.crawler.engine.downloads) == 1
+    # Another spider uses the stale file without refreshing it again
+    other_mw, other_spider = make_middleware(tmp_path)
+    assert check(other_mw, other_spider, "https://www.chicago.gov/private/1") is False
+    assert other_mw.crawler.engine.downloads == []
+
+    respond(mw, body=b"User-agent: *\nDisallow:\n")
+    assert check(mw, spider, "https://www.chicago.gov/private/1") is True
+    assert mw.store.get("www.chicago.gov")["body"] == b"User-agent: *\nDisallow:\n"
+    assert mw.crawler.stats.get_value("robotstxt/refresh_count") == 1
+
+
+def test_fetches_expired_robots_first(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    mw.store.set("www.chicago.gov", ROBOTS)
+    age_cache(mw, 8)
+    assert check(mw, spider, "https://www.chicago.gov/page") is None
+    respond(mw)
+    assert check(mw, spider, "https://www.chicago.gov/page") is True
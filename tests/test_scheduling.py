@@ -0,0 +1,70 @@
+from datetime import datetime
+
+from city_scrapers.scheduling import (
+    DEFAULT_RUNTIME,
+    estimate_runtimes,
+    estimate_timeouts,
+    fit_budget,
+    lpt_shards,
+    percentile,
+    prioritize,
+)
+
+
+def test_estimate_runtimes():
+    runtimes = {"a": [1000, 10, 20, 30, 40, 50], "b": [5]}
+    assert estimate_runtimes(["a", "b", "c"], runtimes) == {"a": 30, "b": 5, "c": 17.5}
+
+
+def test_estimate_runtimes_default():
+    assert estimate_runtimes(["a"], {}) == {"a": DEFAULT_RUNTIME}
+    assert estimate_runtimes(["a", "b"], {"b": [5]}, default=1) == {"a": 1, "b": 5}
+
+
+def test_lpt_shards():
+    estimates = {"a": 90, "b": 60, "c": 50, "d": 40, "e": 10}
+    assert lpt_shards(estimates, 2) == [(130, ["a", "d"]), (120, ["b", "c", "e"])]
+
+
+def test_lpt_shards_more_shards_than_spiders():
+    assert lpt_shards({"a": 1}, 3) == [(1, ["a"]), (0, []), (0, [])]
+
+
+def test_percentile():
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([3, 1, 2], 95) == 3
+    assert percentile([7], 95) == 7
+
+
+def test_estimate_timeouts():
+    runtimes = {"a": [10] * 19 + [100], "b": [1]}
+    assert estimate_timeouts(["a", "b", "c"], runtimes, 2, minimum=5) == {
+        "a": 20,
+        "b": 5,
+    }
+
+
+def test_prioritize():
+    now = datetime(2026, 1, 5)
+    last_finished = {"a": datetime(2026, 1, 4), "b": datetime(2026, 1, 1)}
+    next_meetings = {
+        "c": datetime(2026, 1, 9),
+        "d": datetime(2026, 1, 7),
+        "e": datetime(2026, 3, 1),
+        "f": datetime(2026, 1, 1),
+    }
+    assert prioritize(
+        ["a", "b", "c", "d", "e", "f"],
+        last_finished,
+        next_meetings,
+        datetime(2026, 1, 19),
+        now=now,
+    ) == ["d", "c", "e", "f", "b", "a"]
+
+
+def test_fit_budget():
+    estimates = {"a": 50, "b": 40, "c": 30, "d": 10, "e": 10}
+    assert fit_budget(["a", "b", "c", "d", "e"], estimates, 45, 2) == (
+        ["a", "b", "c"],
+        ["d", "e"],
+    )
@@ -0,0 +1,111 @@
+import pytest
+from scrapy import Request, Spider
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred
+
+from city_scrapers.middleware import SharedResponseCacheMiddleware
+from city_scrapers.middleware.shared_cache import RUN_CACHES, SharedResponseStore
+
+URL = "https://business.rpba.org/events/calendar/2000-01-01/"
+BODY = b"<html><body>Calendar</body></html>"
+
+
+@pytest.fixture(autouse=True)
+def clear_run_caches():
+    RUN_CACHES.clear()
+    yield
+    RUN_CACHES.clear()
+
+
+def make_middleware(tmp_path, run="run"):
+    crawler = get_crawler(
+        Spider,
+        {
+            "CITY_SCRAPERS_SHARED_CACHE_ENABLED": True,
+            "CITY_SCRAPERS_SHARED_CACHE_RUN": run,
+            "CITY_SCRAPERS_SHARED_CACHE_PATH": str(tmp_path / "shared_cache.db"),
+        },
+    )
+    crawler.stats.open_spider(None)
+    return SharedResponseCacheMiddleware.from_crawler(crawler), Spider("test")
+
+
+def shared_request(url=URL):
+    return Request(url, meta={"shared_cache": True})
+
+
+def respond(request, status=200):
+    return HtmlResponse(request.url, status=status, body=BODY, request=request)
+
+
+def download(middleware, spider, request, status=200):
+    assert middleware.process_request(request, spider) is None
+    middleware.process_response(request, respond(request, status), spider)
+
+
+def test_requires_run(tmp_path):
+    with pytest.raises(NotConfigured):
+        make_middleware(tmp_path, run=None)
+
+
+def test_only_shared_requests(tmp_path):
+    middleware, spider = make_middleware(tmp_path)
+    download(middleware, spider, Request(URL))
+    assert middleware.process_request(Request(URL), spider) is None
+
+
+def test_shared_between_spiders(tmp_path):
+    first, spider = make_middleware(tmp_path)
+    second, _ = make_middleware(tmp_path)
+    download(first, spider, shared_request())
+    request = shared_request()
+    response = second.process_request(request, spider)
+    assert response.body == BODY
+    assert response.request is request
+    assert "shared" in response.flags
+
+
+def test_shared_between_processes(tmp_path):
+    first, spider = make_middleware(tmp_path)
+    download(first, spider, shared_request())
+    first.spider_closed(spider)
+    RUN_CACHES.clear()
+    second, _ = make_middleware(tmp_path)
+    assert second.process_request(shared_request(), spider).body == BODY
+    other_run, _ = make_middleware(tmp_path, run="other")
+    assert other_run.process_request(shared_request(), spider) is None
+
+
+def test_failed_response_not_shared(tmp_path):
+    first, spider = make_middleware(tmp_path)
+    second, _ = make_middleware(tmp_path)
+    download(first, spider, shared_request(), status=500)
+    assert second.process_request(shared_request(), spider) is None
+
+
+def test_waiting_released_when_spider_closes(tmp_path):
+    first, spider = make_middleware(tmp_path)
+    second, _ = make_middleware(tmp_path)
+    first.process_request(shared_request(), spider)
+    request = shared_request()
+    waiting = second.process_request(request, spider)
+    assert isinstance(waiting, Deferred)
+    results = []
+    waiting.addCallback(results.append)
+    first.spider_closed(spider)
+    # Downloads the page itself now that nothing else is
+    assert results == [None]
+    assert request.meta["shared_cache_owner"]
+
+
+def test_store_prune(tmp_path):
+    store = SharedResponseStore(str(tmp_path / "shared_cache.db"))
+    response = respond(Request(URL))
+    store.set("old", "abc", response)
+    store.set("new", "abc", response)
+    store.prune("new")
+    assert store.get("old", "abc") is None
+    assert store.get("new", "abc").body == BODY
+    store.close()
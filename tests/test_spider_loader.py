@@ -0,0 +1,48 @@
+import sys
+
+import pytest
+from scrapy.utils.project import get_project_settings
+
+from city_scrapers.spider_loader import (
+    ManifestSpiderLoader,
+    build_manifest,
+    manifest_path,
+    read_manifest,
+    write_manifest,
+)
+
+
+def test_manifest_in_sync():
+    settings = get_project_settings()
+    assert read_manifest(manifest_path(settings)) == build_manifest(
+        settings
+    ), "Spider manifest is out of date, run `scrapy manifest` to update it"
+
+
+def test_load_imports_only_spider_module(monkeypatch):
+    monkeypatch.delitem(sys.modules, "city_scrapers.spiders.chi_ssa_1", raising=False)
+    monkeypatch.delitem(sys.modules, "city_scrapers.spiders.chi_ssa_2", raising=False)
+    spider_loader = ManifestSpiderLoader(get_project_settings())
+    assert "chi_ssa_2" in spider_loader.list()
+    assert "city_scrapers.spiders.chi_ssa_2" not in sys.modules
+    assert spider_loader.load("chi_ssa_1").name == "chi_ssa_1"
+    assert "city_scrapers.spiders.chi_ssa_1" in sys.modules
+    assert "city_scrapers.spiders.chi_ssa_2" not in sys.modules
+
+
+def test_stale_manifest(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    write_manifest(path, {"chi_ssa_1": "city_scrapers.spiders.chi_ssa_2"})
+    settings = get_project_settings()
+    settings.set("CITY_SCRAPERS_SPIDER_MANIFEST", path)
+    spider_loader = ManifestSpiderLoader(settings)
+    assert spider_loader.list() == ["chi_ssa_1"]
+    with pytest.raises(KeyError, match="scrapy manifest"):
+        spider_loader.load("chi_ssa_1")
+
+
+def test_missing_manifest(tmp_path):
+    settings = get_project_settings()
+    settings.set("CITY_SCRAPERS_SPIDER_MANIFEST", str(tmp_path / "manifest.json"))
+    spider_loader = ManifestSpiderLoader(settings)
+    assert sorted(spider_loader.list()) == sorted(build_manifest(settings))
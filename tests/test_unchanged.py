@@ -0,0 +1,168 @@
+from datetime import datetime
+
+from city_scrapers_core.constants import PASSED, TENTATIVE
+from city_scrapers_core.items import Meeting
+from city_scrapers_core.spiders import CityScrapersSpider
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer
+
+from city_scrapers.middleware import UnchangedPageMiddleware
+from city_scrapers.middleware.unchanged import content_fingerprint
+
+URL = "https://www.example.com/meetings"
+DETAIL_URL = "https://www.example.com/meetings/1"
+BODY = b"<html><body><p>Board meeting</p></body></html>"
+
+
+class ExampleSpider(CityScrapersSpider):
+    name = "example"
+    agency = "Example Agency"
+    timezone = "America/Chicago"
+
+
+def make_middleware(tmp_path):
+    crawler = get_crawler(
+        ExampleSpider,
+        {
+            "CITY_SCRAPERS_UNCHANGED_ENABLED": True,
+            "CITY_SCRAPERS_UNCHANGED_MAX_AGE": 7,
+            "CITY_SCRAPERS_UNCHANGED_PATH": str(tmp_path / "unchanged.db"),
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.spider = spider
+    crawler.stats.open_spider(spider)
+    return UnchangedPageMiddleware.from_crawler(crawler), spider
+
+
+def start_response(body=BODY):
+    return HtmlResponse(URL, body=body, request=Request(URL))
+
+
+def parse_start():
+    yield Meeting(title="Board", start=datetime(2000, 1, 1), status=TENTATIVE)
+    yield Request(DETAIL_URL)
+
+
+def parse_detail():
+    yield Meeting(title="Board", start=datetime(2000, 2, 1), status=TENTATIVE)
+
+
+def not_called():
+    raise AssertionError("callback shouldn't run")
+    yield
+
+
+def crawl_first_run(tmp_path, finish_detail=True):
+    mw, spider = make_middleware(tmp_path)
+    output = list(mw.process_spider_output(start_response(), parse_start(), spider))
+    detail_request = output[1]
+    assert detail_request.meta["unchanged_root"]
+    if finish_detail:
+        detail_response = HtmlResponse(
+            DETAIL_URL, body=b"<html></html>", request=detail_request
+        )
+        list(mw.process_spider_output(detail_response, parse_detail(), spider))
+    mw.spider_closed(spider, "finished")
+
+
+def test_replays_unchanged_page(tmp_path):
+    crawl_first_run(tmp_path)
+    mw, spider = make_middleware(tmp_path)
+    body = BODY.replace(b"<p>", b"<!-- updated --><script>var t = 1;</script>\n<p>")
+    items = list(mw.process_spider_output(start_response(body), not_called(), spider))
+    assert [item["start"] for item in items] == [
+        datetime(2000, 1, 1),
+        datetime(2000, 2, 1),
+    ]
+    assert all(item["status"] == PASSED for item in items)
+    assert mw.stats.get_value("unchanged/replayed_items", spider=spider) == 2
+
+
+def test_parses_changed_page(tmp_path):
+    crawl_first_run(tmp_path)
+    mw, spider = make_middleware(tmp_path)
+    body = BODY.replace(b"Board", b"Committee")
+    output = list(mw.process_spider_output(start_response(body), parse_start(), spider))
+    assert len(output) == 2
+    assert mw.stats.get_value("unchanged/parsed_pages", spider=spider) == 1
+
+
+def test_incomplete_crawl_not_stored(tmp_path, caplog):
+    crawl_first_run(tmp_path, finish_detail=False)
+    assert f"Not storing items from {URL} since 1 of its requests" in caplog.text
+    mw, spider = make_middleware(tmp_path)
+    output = list(mw.process_spider_output(start_response(), parse_start(), spider))
+    assert len(output) == 2
+
+
+def test_dropped_request_not_waited_for(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    output = list(mw.process_spider_output(start_response(), parse_start(), spider))
+    mw.request_dropped(output[1], spider)
+    mw.spider_closed(spider, "finished")
+    mw, spider = make_middleware(tmp_path)
+    items = list(mw.process_spider_output(start_response(), not_called(), spider))
+    assert len(items) == 1
+
+
+async def parse_start_async():
+    for output in parse_start():
+        yield output
+
+
+async def not_called_async():
+    raise AssertionError("callback shouldn't run")
+    yield
+
+
+def collect_async(mw, response, result, spider):
+    async def collect():
+        return [
+            output
+            async for output in mw.process_spider_output_async(response, result, spider)
+        ]
+
+    outputs = []
+    defer.Deferred.fromCoroutine(collect()).addCallback(outputs.extend)
+    return outputs
+
+
+def test_async_callback(tmp_path):
+    mw, spider = make_middleware(tmp_path)
+    output = collect_async(mw, start_response(), parse_start_async(), spider)
+    assert len(output) == 2
+    detail_request = output[1]
+    assert detail_request.meta["unchanged_root"]
+    detail_response = HtmlResponse(
+        DETAIL_URL, body=b"<html></html>", request=detail_request
+    )
+    list(mw.process_spider_output(detail_response, parse_detail(), spider))
+    mw.spider_closed(spider, "finished")
+
+    mw, spider = make_middleware(tmp_path)
+    items = collect_async(mw, start_response(), not_called_async(), spider)
+    assert [item["start"] for item in items] == [
+        datetime(2000, 1, 1),
+        datetime(2000, 2, 1),
+    ]
+
+
+def test_joined_page_not_replayed(tmp_path):
+    for _ in range(2):
+        mw, spider = make_middleware(tmp_path)
+        response = HtmlResponse(
+            URL, body=BODY, request=Request(URL, meta={"fan_in": ("key", 0)})
+        )
+        output = list(mw.process_spider_output(response, parse_detail(), spider))
+        assert len(output) == 1
+        mw.spider_closed(spider, "finished")
+    assert mw.stats.get_value("unchanged/parsed_pages", spider=spider) == 1
+
+
+def test_content_fingerprint_ignores_whitespace():
+    assert content_fingerprint(start_response()) == content_fingerprint(
+        start_response(BODY.replace(b"<p>", b"\n  <p>"))
+    )
@@ -0,0 +1,59 @@
+import socket
+import subprocess
+import sys
+
+from scrapy.utils.project import get_project_settings
+
+from city_scrapers.spider_loader import ManifestSpiderLoader
+from city_scrapers.worker import CrawlWorker, read_messages, send_message
+
+
+def get_worker():
+    settings = get_project_settings()
+    return CrawlWorker(settings, ManifestSpiderLoader(settings), "worker.sock")
+
+
+def test_messages_roundtrip():
+    client, server = socket.socketpair()
+    send_message(server, {"event": "started", "spider": "chi_ssa_1", "pid": 1})
+    send_message(server, {"event": "stats", "stats": {"item_scraped_count": 3}})
+    server.close()
+    assert list(read_messages(client)) == [
+        {"event": "started", "spider": "chi_ssa_1", "pid": 1},
+        {"event": "stats", "stats": {"item_scraped_count": 3}},
+    ]
+
+
+def test_read_job():
+    worker = get_worker()
+    client, server = socket.socketpair()
+    send_message(client, {"spider": "chi_ssa_1", "settings": {"LOG_LEVEL": "INFO"}})
+    assert worker._read_job(server) == {
+        "spider": "chi_ssa_1",
+        "settings": {"LOG_LEVEL": "INFO"},
+    }
+
+
+def test_read_job_rejected():
+    worker = get_worker()
+    client, server = socket.socketpair()
+    send_message(client, {"spider": "not_a_spider"})
+    assert worker._read_job(server) is None
+    server.close()
+    assert list(read_messages(client)) == [
+        {"event": "error", "message": "'Spider not found: not_a_spider'"}
+    ]
+
+
+def test_preload_leaves_reactor_uninstalled():
+    # Run in a separate process since other tests install the reactor
+    script = "\n".join(
+        [
+            "import sys",
+            "from tests.test_worker import get_worker",
+            "get_worker().preload()",
+            "assert 'city_scrapers.spiders.chi_ssa_1' in sys.modules",
+            "assert 'twisted.internet.reactor' not in sys.modules",
+        ]
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)